@@ -41,6 +41,31 @@ SUPPORTED_LANGUAGES = {
     'ja': 'japanese'
 }
 
+# TTS inference settings
+TTS_BATCH_SIZE = 4  # Sentences decoded per SynthesizerTrn.infer call
+TTS_MAX_BATCH_TOKENS = 2048  # Padded phone budget per batch (None for no limit)
+TTS_PHONE_BUDGET = None  # Split text into chunks of about this many phones instead of sentences (None to disable)
+TTS_SEED = 0  # Fixed sampling seed so repeated prompts can be served from the cache
+TTS_CACHE_MAX_BYTES = 256 * 1024 * 1024  # In-memory synthesis cache budget (audio bytes)
+TTS_CACHE_DIR = None  # Directory for the on-disk cache tier (None to disable)
+TTS_CACHE_MAX_DISK_BYTES = 1024 * 1024 * 1024  # Size kept in the cache directory, shared by all workers (None for no limit)
+TTS_G2P_CACHE_PATH = None  # SQLite file of predicted English pronunciations shared by all workers (None to disable)
+TTS_ENCODER_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Per-language cache of text encoder outputs, reused across speeds (None to disable)
+TTS_SCHEDULER_ENABLED = True  # Batch sentences across concurrent requests per language
+TTS_SCHEDULER_WAIT_MS = 20  # Latency window for collecting a batch
+TTS_MAX_RESIDENT_LANGUAGES = 2  # TTS models kept loaded besides the pinned ones (None for no limit)
+TTS_IDLE_TIMEOUT = 600  # Seconds before an unused TTS model is unloaded (None to keep it)
+TTS_PINNED_LANGUAGES = ['en']  # Loaded at startup and never unloaded
+TTS_QUANTIZE = None  # 'int8' for dynamic int8 quantization (CPU only)
+TTS_COMPILE = False  # torch.compile the flow and vocoder, warmed up at load time
+TTS_COMPILE_CACHE_DIR = None  # Directory for compiled artifacts shared across restarts (None to disable)
+
+# Model worker processes
+MODEL_WORKERS_ENABLED = False  # Host each TTS language and Whisper in its own process
+TTS_WORKER_THREADS = 2  # torch threads per TTS worker
+WHISPER_WORKER_THREADS = 4  # torch threads for the Whisper worker
+MODEL_WORKER_PIN_CPUS = True  # Pin workers to disjoint CPU sets when enough cores are available
+
 # SSL Configuration
 SSL_CERT_PATH = 'cert.pem'
 SSL_KEY_PATH = 'key.pem'
@@ -1,6 +1,8 @@
 import os
 import re
 import json
+import asyncio
+import itertools
 import torch
 import librosa
 import soundfile
@@ -13,9 +15,14 @@ import torch
 from . import utils
 from . import commons
 from .models import SynthesizerTrn
-from .split_utils import split_sentence
+from .split_utils import split_sentence, split_sentence_by_phones
+from .text import get_bert_extractor
+from .quantization import quantize_synthesizer
+from .synthesis_cache import file_fingerprint
+from .compilation import WARMUP_LENGTHS, compile_synthesizer, compile_cache_path, load_compile_cache, save_compile_cache
+from .text.cleaner import preload_languages
 from .mel_processing import spectrogram_torch, spectrogram_torch_conv
-from .download_utils import load_or_download_config, load_or_download_model
+from .download_utils import load_or_download_config, load_or_download_model, get_model_path
 
 class TTS(nn.Module):
     def __init__(self, 
@@ -23,45 +30,205 @@ class TTS(nn.Module):
                 device='auto',
                 use_hf=True,
                 config_path=None,
-                ckpt_path=None):
+                ckpt_path=None,
+                cache=None,
+                quantize=None,
+                backend='torch',
+                onnx_dir=None,
+                encoder_cache=None):
         super().__init__()
+        if backend not in ('torch', 'onnxruntime'):
+            raise ValueError(f"Unsupported backend: {backend}")
+        if backend == 'onnxruntime':
+            # graphs exported by melo.onnx_export run on CPU; BERT stays on torch
+            if onnx_dir is None:
+                raise ValueError("The onnxruntime backend needs the onnx_dir of an exported model")
+            if quantize is not None:
+                raise ValueError("Quantization is not supported by the onnxruntime backend")
+            if device == 'auto':
+                device = 'cpu'
+            if device != 'cpu':
+                raise ValueError("The onnxruntime backend runs on CPU only")
+            if encoder_cache is not None:
+                raise ValueError("The encoder cache is not supported by the onnxruntime backend")
         if device == 'auto':
             device = 'cpu'
             if torch.cuda.is_available(): device = 'cuda'
             if torch.backends.mps.is_available(): device = 'mps'
         if 'cuda' in device:
             assert torch.cuda.is_available()
+        if quantize not in (None, 'int8'):
+            raise ValueError(f"Unsupported quantization: {quantize}")
+        if quantize is not None and device != 'cpu':
+            raise ValueError("int8 dynamic quantization runs on CPU only")
 
         # config_path = 
+        if backend == 'onnxruntime' and config_path is None:
+            config_path = os.path.join(onnx_dir, 'config.json')
         hps = load_or_download_config(language, use_hf=use_hf, config_path=config_path)
 
         num_languages = hps.num_languages
         num_tones = hps.num_tones
         symbols = hps.symbols
 
-        model = SynthesizerTrn(
-            len(symbols),
-            hps.data.filter_length // 2 + 1,
-            hps.train.segment_size // hps.data.hop_length,
-            n_speakers=hps.data.n_speakers,
-            num_tones=num_tones,
-            num_languages=num_languages,
-            **hps.model,
-        ).to(device)
-
-        model.eval()
-        self.model = model
         self.symbol_to_id = {s: i for i, s in enumerate(symbols)}
         self.id_to_symbol = {i: s for s, i in self.symbol_to_id.items()}
         self.hps = hps
         self.device = device
-    
-        # load state_dict
-        checkpoint_dict = load_or_download_model(language, device, use_hf=use_hf, ckpt_path=ckpt_path)
-        self.model.load_state_dict(checkpoint_dict['model'], strict=True)
+        self.backend = backend
+        self.quantize = quantize
+        self.inference_options = None
+
+        if backend == 'onnxruntime':
+            from .onnx_backend import OnnxSynthesizer
+            from .onnx_export import ENCODER_FILE, FLOW_FILE, DECODER_FILE
+            # same infer() signature as SynthesizerTrn
+            self.model = OnnxSynthesizer(onnx_dir)
+            weight_files = [os.path.join(onnx_dir, f) for f in (ENCODER_FILE, FLOW_FILE, DECODER_FILE)]
+        else:
+            model = SynthesizerTrn(
+                len(symbols),
+                hps.data.filter_length // 2 + 1,
+                hps.train.segment_size // hps.data.hop_length,
+                n_speakers=hps.data.n_speakers,
+                num_tones=num_tones,
+                num_languages=num_languages,
+                **hps.model,
+            ).to(device)
+
+            model.eval()
+            self.model = model
+
+            # load state_dict
+            ckpt_path = get_model_path(language, use_hf=use_hf, ckpt_path=ckpt_path)
+            checkpoint_dict = load_or_download_model(language, device, ckpt_path=ckpt_path)
+            weight_files = [ckpt_path]
+            self._load_checkpoint(checkpoint_dict)
+            # int8 weights for the text encoder, duration predictors and flow; the vocoder stays in float
+            if quantize == 'int8':
+                quantize_synthesizer(self.model)
+        # identifies the loaded weights in SynthesisCache keys
+        self.weights_id = file_fingerprint(weight_files)
         
         language = language.split('_')[0]
         self.language = 'ZH_MIX_EN' if language == 'ZH' else language # we support a ZH_MIX_EN model
+        # text frontends are imported lazily; load this model's one now rather than on the first request
+        preload_languages([self.language])
+        # BERT encoder shared with other TTS instances of the language; loaded on first use
+        self.bert_extractor = None
+        if not getattr(hps.data, "disable_bert", False):
+            self.bert_extractor = get_bert_extractor(self.language, device, acquire=True, quantize=quantize)
+
+        # optional SynthesisCache shared by tts_to_file_with_timing calls with an explicit seed
+        self.cache = cache
+        # optional EncoderCache of per-sentence frontend and text encoder outputs, so new speeds
+        # and noise scales for a known sentence start from the duration predictors
+        self.encoder_cache = encoder_cache
+        # optional InferenceScheduler that batches sentences across concurrent requests
+        self.scheduler = None
+
+    def close(self):
+        """Stop the scheduler and release this model's reference to the shared BERT extractor."""
+        if self.scheduler is not None:
+            self.scheduler.close()
+            self.scheduler = None
+        if self.bert_extractor is not None:
+            self.bert_extractor.release()
+            self.bert_extractor = None
+
+    def _load_checkpoint(self, checkpoint_dict):
+        """Load the weights of a training or inference checkpoint into ``self.model``."""
+        # inference checkpoints hold the weights of an already optimized model
+        self.inference_options = checkpoint_dict.get('inference')
+        if self.inference_options is not None:
+            self.model.optimize_for_inference(**self.inference_options)
+        self.model.load_state_dict(checkpoint_dict['model'], strict=True)
+
+    def cache_identity(self):
+        """What decides the audio besides the request: the weight files, backend, quantization and
+        inference-time optimization. Part of ``SynthesisCache`` keys, so entries written by another
+        checkpoint or configuration are not served."""
+        return {
+            'weights': self.weights_id,
+            'backend': self.backend,
+            'quantize': self.quantize,
+            'inference': self.inference_options,
+        }
+
+    def optimize_for_inference(self, duration_predictor=None):
+        """Fold weight norm and drop training-only modules; see ``SynthesizerTrn.optimize_for_inference``.
+
+        With ``duration_predictor="dp"`` (``sdp_ratio`` 0) or ``"sdp"`` (``sdp_ratio`` 1) the other
+        duration predictor is dropped as well. Outputs are unchanged.
+
+        A model is optimized once: calling again with the same options (for example on a model
+        loaded from an inference checkpoint) does nothing, and other options raise ``ValueError``.
+        """
+        if self.backend != 'torch':
+            raise ValueError("optimize_for_inference applies to the torch backend only")
+        options = {'duration_predictor': duration_predictor}
+        if self.inference_options is not None:
+            if options != self.inference_options:
+                raise ValueError(
+                    f"The model is already optimized with {self.inference_options} and cannot be "
+                    f"optimized again with {options}"
+                )
+            return self
+        self.model.optimize_for_inference(duration_predictor)
+        self.inference_options = options
+        return self
+
+    def save_inference_checkpoint(self, path):
+        """Save the optimized weights; ``TTS(..., ckpt_path=path)`` loads them without re-optimizing."""
+        if self.inference_options is None:
+            raise ValueError("Call optimize_for_inference() before saving an inference checkpoint")
+        if self.quantize is not None:
+            raise ValueError("Inference checkpoints hold float weights; save from an unquantized model")
+        torch.save({'model': self.model.state_dict(), 'inference': self.inference_options}, path)
+
+    def compile_for_inference(self, cache_dir=None, warmup_lengths=WARMUP_LENGTHS, batch_sizes=(1,)):
+        """Opt-in ``torch.compile`` of the flow and vocoder with dynamic sequence lengths.
+
+        The modules are compiled by a ``warmup`` over ``warmup_lengths`` and ``batch_sizes``, and
+        fall back to eager mode if compilation fails. With ``cache_dir``, artifacts saved by an
+        earlier process are loaded first and the warm-up's are saved, so later workers start
+        without recompiling.
+        """
+        if self.backend != 'torch':
+            raise ValueError("compile_for_inference applies to the torch backend only")
+        cache_path = None
+        if cache_dir is not None:
+            cache_path = compile_cache_path(cache_dir, f"{self.language}-{self.quantize or 'fp32'}-{self.device}")
+            load_compile_cache(cache_path)
+        if not compile_synthesizer(self.model):
+            return self
+        self.warmup(warmup_lengths, batch_sizes)
+        if cache_path is not None:
+            save_compile_cache(cache_path)
+        return self
+
+    def warmup(self, lengths=WARMUP_LENGTHS, batch_sizes=(1,)):
+        """Run ``infer`` on dummy sentences of each phone count in ``lengths`` and each batch size,
+        so compilation and allocator growth happen before the first request."""
+        enc_p = self.model.enc_p
+        for n in batch_sizes:
+            for length in lengths:
+                x = torch.ones(n, length, dtype=torch.long, device=self.device)
+                with torch.no_grad():
+                    self.model.infer(
+                        x,
+                        torch.full((n,), length, dtype=torch.long, device=self.device),
+                        torch.zeros(n, dtype=torch.long, device=self.device),
+                        torch.zeros_like(x),
+                        torch.zeros_like(x),
+                        torch.zeros(n, enc_p.bert_proj.in_channels, length, device=self.device),
+                        torch.zeros(n, enc_p.ja_bert_proj.in_channels, length, device=self.device),
+                        sdp_ratio=0.2,
+                        noise_scale=0.6,
+                        noise_scale_w=0.8,
+                        return_durations=True,
+                        generator=[self._make_generator(i) for i in range(n)],
+                    )
 
     @staticmethod
     def audio_numpy_concat(segment_data_list, sr, speed=1.):
@@ -97,136 +264,466 @@ class TTS(nn.Module):
             print(" > ===========================")
         return texts
 
-    def get_word_timings_from_attention(self, attn, phones, audio_duration, speed=1.0):
-        """Calculate word timings based on attention alignments."""
-        # Convert phone IDs to symbols
-        phone_symbols = [self.id_to_symbol[pid] for pid in phones]
-        
-        # Get word boundaries from phones
-        word_boundaries = []
-        current_word = []
-        current_word_text = []
-        current_start_idx = 0
-        
-        for i, phone in enumerate(phone_symbols):
-            if phone in ['|', '#']:  # Word boundary tokens
-                if current_word:
-                    word_boundaries.append({
-                        'word': ''.join(current_word_text),
-                        'start_idx': current_start_idx,
-                        'end_idx': i
-                    })
-                    current_word = []
-                    current_word_text = []
-                    current_start_idx = i + 1
-            else:
-                current_word.append(phone)
-                # Only add to text if it's a visible character
-                if not phone.startswith('@') and not phone.startswith('#'):
-                    current_word_text.append(phone)
-        
-        # Add last word if exists
-        if current_word:
-            word_boundaries.append({
-                'word': ''.join(current_word_text),
-                'start_idx': current_start_idx,
-                'end_idx': len(phone_symbols)
-            })
-        
-        # Convert attention to numpy for easier processing
-        attn_numpy = attn.squeeze().cpu().numpy()
-        
-        # Calculate time per output frame
-        time_per_frame = audio_duration / attn_numpy.shape[0]
-        
-        # Get word timings from attention
-        word_timings = []
-        for i, boundary in enumerate(word_boundaries):
-            # Get attention for this word's phones
-            word_attn = attn_numpy[:, boundary['start_idx']:boundary['end_idx']]
-            
-            # Find start and end frames where attention is highest
-            word_frames = word_attn.sum(axis=1)
-            active_frames = np.where(word_frames > word_frames.max() * 0.1)[0]
-            
-            if len(active_frames) > 0:
-                start_frame = active_frames[0]
-                end_frame = active_frames[-1]
-                
-                # Add a small buffer between words
-                if i > 0:
-                    start_frame = max(0, start_frame - 1)
-                if i < len(word_boundaries) - 1:
-                    end_frame = min(attn_numpy.shape[0] - 1, end_frame + 1)
-                
-                word_timings.append({
-                    'word': boundary['word'],
-                    'start': start_frame * time_per_frame,
-                    'end': (end_frame + 1) * time_per_frame,
-                    'index': i
-                })
-        
-        return word_timings
+    def split_sentences_by_phones(self, text, phone_budget, quiet=False):
+        """Split ``text`` into chunks of at most about ``phone_budget`` model phones (after blank
+        interspersing, the unit of ``max_batch_tokens``); see ``split_sentence_by_phones``.
 
-    def tts_to_file_with_timing(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False):
-        language = self.language
-        texts = self.split_sentences_into_pieces(text, language, quiet)
-        audio_list = []
-        
-        if pbar:
-            tx = pbar(texts)
-        else:
-            if position:
-                tx = tqdm(texts, position=position)
-            elif quiet:
-                tx = texts
+        Returns ``(texts, order)``: the chunks in text order, and their indices in the order to
+        synthesize them, bucket by bucket so that batches need little padding.
+        """
+        max_phones = (phone_budget - 1) // 2 if self.hps.data.add_blank else phone_budget
+        buckets = split_sentence_by_phones(text, language_str=self.language, max_phones=max_phones)
+        order = [index for bucket in buckets for index, _ in bucket]
+        texts = [None] * len(order)
+        for bucket in buckets:
+            for index, chunk in bucket:
+                texts[index] = chunk
+        if not quiet:
+            print(" > Text split to chunks.")
+            print('\n'.join(texts))
+            print(" > ===========================")
+        return texts, order
+
+    def _tokenize(self, norm_text):
+        """BERT tokens of ``norm_text`` as seen by the language frontend, or None if unavailable."""
+        from .text.cleaner import language_module_map
+        tokenizer = getattr(language_module_map.get(self.language), 'tokenizer', None)
+        if tokenizer is None:
+            return None
+        return tokenizer.tokenize(norm_text)
+
+    def get_word_spans(self, norm_text, word2ph):
+        """Group phones into words as a list of ``(word, start_phone, end_phone)``.
+
+        ``word2ph`` has one entry per BERT token of ``norm_text`` plus the start/end pads.
+        Word-piece continuations (``##``) join the previous token; for space-delimited languages
+        tokens are merged up to the next whitespace. Punctuation does not extend a word's start
+        or end, and punctuation-only words are dropped.
+        """
+        bounds = np.cumsum([0] + list(word2ph))
+        if len(word2ph) <= 2:
+            return []
+        tokens = self._tokenize(norm_text)
+        if tokens is None or len(tokens) != len(word2ph) - 2:
+            return [(norm_text.strip(), int(bounds[1]), int(bounds[-2]))]
+
+        space_delimited = self.language in ['EN', 'FR', 'ES', 'SP', 'KR']
+        lowered = norm_text.lower()
+        cursor = 0
+        words = []  # [pieces, start_phone, end_phone, spoken]
+        for i, token in enumerate(tokens):
+            continuation = token.startswith('##')
+            piece = token[2:] if continuation else token
+            new_word = not words or not continuation
+            if space_delimited:
+                pos = lowered.find(piece.lower(), cursor)
+                if pos >= 0:
+                    new_word = not words or any(c.isspace() for c in lowered[cursor:pos])
+                    cursor = pos + len(piece)
+            spoken = any(c.isalnum() for c in piece)
+            start, end = int(bounds[i + 1]), int(bounds[i + 2])
+            if new_word:
+                words.append([[piece], start, end, spoken])
             else:
-                tx = tqdm(texts)
-                
-        for t in tx:
-            if language in ['EN', 'ZH_MIX_EN']:
-                t = re.sub(r'([a-z])([A-Z])', r'\1 \2', t)
-            
-            device = self.device
-            bert, ja_bert, phones, tones, lang_ids = utils.get_text_for_tts_infer(t, language, self.hps, device, self.symbol_to_id)
-            
-            with torch.no_grad():
-                x_tst = phones.to(device).unsqueeze(0)
-                tones = tones.to(device).unsqueeze(0)
-                lang_ids = lang_ids.to(device).unsqueeze(0)
-                bert = bert.to(device).unsqueeze(0)
-                ja_bert = ja_bert.to(device).unsqueeze(0)
-                x_tst_lengths = torch.LongTensor([phones.size(0)]).to(device)
-                speakers = torch.LongTensor([speaker_id]).to(device)
-                
-                # Generate audio with attention alignments
-                audio, attn, _, _ = self.model.infer(
-                    x_tst,
-                    x_tst_lengths,
-                    speakers,
-                    tones,
-                    lang_ids,
-                    bert,
-                    ja_bert,
+                word = words[-1]
+                word[0].append(piece)
+                if spoken:
+                    if not word[3]:
+                        word[1] = start
+                    word[2] = end
+                    word[3] = True
+        return [(''.join(pieces), start, end) for pieces, start, end, spoken in words if spoken]
+
+    def get_word_timings_from_durations(self, durations, word_spans):
+        """Calculate word timings from per-phone frame durations."""
+        if not word_spans:
+            return []
+        frame_time = self.hps.data.hop_length / self.hps.data.sampling_rate
+        frame_ends = np.concatenate([[0], np.cumsum(np.asarray(durations, dtype=np.int64))])
+        times = frame_ends[np.asarray([(start, end) for _, start, end in word_spans])] * frame_time
+        return [
+            {'word': word, 'start': float(start), 'end': float(end), 'index': i}
+            for i, ((word, _, _), (start, end)) in enumerate(zip(word_spans, times))
+        ]
+
+    @staticmethod
+    def _batch_is_full(batch, next_len, batch_size, max_batch_tokens):
+        """Whether ``batch`` must be flushed before adding a sentence of ``next_len`` phones."""
+        if not batch:
+            return False
+        if batch_size is not None and len(batch) >= batch_size:
+            return True
+        if max_batch_tokens is not None:
+            max_len = max([item[2].size(0) for item in batch] + [next_len])
+            if max_len * (len(batch) + 1) > max_batch_tokens:
+                return True
+        return False
+
+    @staticmethod
+    def _pad_batch(batch):
+        """Zero-pad the frontend outputs of ``batch`` to its longest sentence.
+
+        Returns ``(phones, tones, lang_ids, bert, ja_bert)`` batch tensors on the CPU.
+        """
+        lengths = [item[2].size(0) for item in batch]
+        max_len = max(lengths)
+        n = len(batch)
+
+        x_tst = torch.zeros(n, max_len, dtype=torch.long)
+        tones = torch.zeros(n, max_len, dtype=torch.long)
+        lang_ids = torch.zeros(n, max_len, dtype=torch.long)
+        bert = torch.zeros(n, batch[0][0].size(0), max_len)
+        ja_bert = torch.zeros(n, batch[0][1].size(0), max_len)
+        for i, (b, jb, ph, tn, lg, _) in enumerate(batch):
+            x_tst[i, :lengths[i]] = ph
+            tones[i, :lengths[i]] = tn
+            lang_ids[i, :lengths[i]] = lg
+            bert[i, :, :lengths[i]] = b
+            ja_bert[i, :, :lengths[i]] = jb
+        return x_tst, tones, lang_ids, bert, ja_bert
+
+    def _infer_batch(self, batch, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed, generators=None):
+        """Run ``SynthesizerTrn.infer`` once over a padded batch of sentences.
+
+        ``batch`` is a list of ``(bert, ja_bert, phones, tones, lang_ids, (norm_text, word2ph))``
+        as returned by ``utils.get_text_for_tts_infer``. ``speaker_id`` is a single id or one per
+        sentence, and ``generators`` optionally holds one seeded ``torch.Generator`` (or None) per
+        sentence. Returns a list of ``(audio, word_timings)``, one per sentence.
+        """
+        device = self.device
+        lengths = [item[2].size(0) for item in batch]
+        n = len(batch)
+
+        with torch.no_grad():
+            speaker_ids = speaker_id if isinstance(speaker_id, (list, tuple)) else [speaker_id] * n
+            if generators is not None and all(g is None for g in generators):
+                generators = None
+
+            if self.encoder_cache is None:
+                x_tst, tones, lang_ids, bert, ja_bert = self._pad_batch(batch)
+                # Generate audio with per-phone durations
+                audio, durations, y_mask, _ = self.model.infer(
+                    x_tst.to(device),
+                    torch.LongTensor(lengths).to(device),
+                    torch.LongTensor(speaker_ids).to(device),
+                    tones.to(device),
+                    lang_ids.to(device),
+                    bert.to(device),
+                    ja_bert.to(device),
                     sdp_ratio=sdp_ratio,
                     noise_scale=noise_scale,
                     noise_scale_w=noise_scale_w,
                     length_scale=1. / speed,
+                    return_durations=True,
+                    generator=generators,
                 )
-                audio = audio[0, 0].data.cpu().float().numpy()
-                
-                # Calculate word timings using attention
-                audio_duration = len(audio) / self.hps.data.sampling_rate
-                word_timings = self.get_word_timings_from_attention(attn, phones.tolist(), audio_duration, speed)
-                
-                audio_list.append((audio, word_timings))
-                
-                del x_tst, tones, lang_ids, bert, ja_bert, x_tst_lengths, speakers
-                
+                del x_tst, tones, lang_ids, bert, ja_bert
+            else:
+                # the same stages as infer, with the text encoder outputs taken from the cache
+                z, y_mask, w_ceil, g, _ = self.model.sample_latent(
+                    *self._infer_durations(batch, speaker_ids, sdp_ratio, noise_scale_w, speed, generators),
+                    noise_scale=noise_scale,
+                    generator=generators,
+                )
+                audio = self.model.dec(z * y_mask, g=g, x_mask=y_mask)
+                durations = w_ceil.squeeze(1)
+            y_lengths = y_mask.sum([1, 2]).long().cpu().tolist()
+            hop_length = self.hps.data.hop_length
+
+            results = []
+            for i in range(n):
+                # Trim the padded frames of shorter sentences
+                seg = audio[i, 0, :y_lengths[i] * hop_length].data.cpu().float().numpy()
+
+                # Calculate word timings from the predicted durations
+                word_spans = self.get_word_spans(*batch[i][5])
+                seg_durations = durations[i, :lengths[i]].cpu().numpy()
+                word_timings = self.get_word_timings_from_durations(seg_durations, word_spans)
+                results.append((seg, word_timings))
+
+            del audio, durations
+        return results
+
+    def _iter_segments(self, texts, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed, batch_size=1, max_batch_tokens=None, seed=None, indices=None):
+        """Yield ``(audio, word_timings)`` for each sentence of ``texts`` as soon as its batch is decoded.
+
+        ``indices`` holds each sentence's position in the text, which offsets its ``seed``, when
+        ``texts`` are not in text order. When ``self.scheduler`` is set, sentences are handed to it instead so they can share
+        batches with other requests; ``batch_size`` and ``max_batch_tokens`` are then the
+        scheduler's.
+        """
+        scheduler = self.scheduler
+        batch = []
+        generators = []
+        pending = []
+        for i, item in enumerate(self._iter_text_items(texts, batch_size)):
+            # each sentence gets its own noise stream so results do not depend on batching
+            if indices is not None:
+                i = indices[i]
+            generator = self._make_generator(None if seed is None else seed + i)
+            if scheduler is not None:
+                pending.append(scheduler.submit(item, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed, generator))
+                while pending and pending[0].done():
+                    yield pending.pop(0).result()
+                continue
+            if self._batch_is_full(batch, item[2].size(0), batch_size, max_batch_tokens):
+                yield from self._infer_batch(batch, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed, generators)
+                batch = []
+                generators = []
+            batch.append(item)
+            generators.append(generator)
+        if batch:
+            yield from self._infer_batch(batch, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed, generators)
+        for future in pending:
+            yield future.result()
+
+    def _iter_segment_chunks(self, texts, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed, chunk_frames, seed=None):
+        """Like ``_iter_segments`` but decode every sentence in vocoder windows of ``chunk_frames``
+        frames, yielding ``(audio, word_timings, last)`` per window. The first window of a sentence
+        carries its word timings and ``last`` marks its final window."""
+        if self.backend != 'torch':
+            raise ValueError("Chunked decoding applies to the torch backend only")
+        for i, item in enumerate(self._iter_text_items(texts, 1)):
+            bert, ja_bert, phones, tones, lang_ids, (norm_text, word2ph) = item
+            generator = self._make_generator(None if seed is None else seed + i)
+            with torch.no_grad():
+                # the same sampling as a one-sentence batch in _infer_batch
+                generators = None if generator is None else [generator]
+                z, y_mask, durations, g, _ = self.model.sample_latent(
+                    *self._infer_durations([item], [speaker_id], sdp_ratio, noise_scale_w, speed, generators),
+                    noise_scale=noise_scale,
+                    generator=generators,
+                )
+                word_timings = self.get_word_timings_from_durations(
+                    durations[0, 0].cpu().numpy(), self.get_word_spans(norm_text, word2ph)
+                )
+                chunks = self.model.dec.iter_chunks(z * y_mask, g=g, chunk_frames=chunk_frames)
+                chunk = next(chunks)
+            # grad mode is thread-local and atts_iter resumes this generator on any executor
+            # thread, so no_grad covers each window's compute and is never held across a yield
+            while chunk is not None:
+                with torch.no_grad():
+                    next_chunk = next(chunks, None)
+                yield chunk[0, 0].cpu().float().numpy(), word_timings, next_chunk is None
+                chunk, word_timings = next_chunk, []
+
+    def _iter_text_items(self, texts, batch_size):
+        """Run the text frontend over ``texts``, ``batch_size`` sentences per BERT forward pass."""
+        language = self.language
+        texts = iter(texts)
+        while True:
+            chunk = list(itertools.islice(texts, batch_size))
+            if not chunk:
+                break
+            if language in ['EN', 'ZH_MIX_EN']:
+                chunk = [re.sub(r'([a-z])([A-Z])', r'\1 \2', t) for t in chunk]
+            if self.encoder_cache is None:
+                yield from self._run_frontend(chunk)
+                continue
+            keys = [('frontend', language, text) for text in chunk]
+            items = [self.encoder_cache.get(key) for key in keys]
+            missing = [i for i, item in enumerate(items) if item is None]
+            if missing:
+                for i, item in zip(missing, self._run_frontend([chunk[i] for i in missing])):
+                    self.encoder_cache.put(keys[i], item)
+                    items[i] = item
+            yield from items
+
+    def _run_frontend(self, texts):
+        return utils.get_texts_for_tts_infer(
+            texts, self.language, self.hps, self.device, self.symbol_to_id, return_word2ph=True,
+            bert_extractor=self.bert_extractor,
+        )
+
+    def _infer_durations(self, batch, speaker_ids, sdp_ratio, noise_scale_w, speed, generators):
+        """``SynthesizerTrn.infer_durations`` over a padded batch of frontend items, returning
+        ``(w_ceil, m_p, logs_p, x_mask, g)``. With ``self.encoder_cache`` the text encoder only
+        runs for the sentences it does not hold yet."""
+        device = self.device
+        if self.encoder_cache is None:
+            x_tst, tones, lang_ids, bert, ja_bert = self._pad_batch(batch)
+            return self.model.infer_durations(
+                x_tst.to(device),
+                torch.LongTensor([item[2].size(0) for item in batch]).to(device),
+                torch.LongTensor(speaker_ids).to(device),
+                tones.to(device),
+                lang_ids.to(device),
+                bert.to(device),
+                ja_bert.to(device),
+                length_scale=1. / speed,
+                noise_scale_w=noise_scale_w,
+                sdp_ratio=sdp_ratio,
+                generator=generators,
+            )
+        x, m_p, logs_p, x_mask, g, dp_logw = self._encode_cached(batch, speaker_ids)
+        logw = self.model.log_durations(
+            x, x_mask, g, noise_scale_w=noise_scale_w, sdp_ratio=sdp_ratio, generator=generators,
+            dp_logw=dp_logw,
+        )
+        w_ceil = torch.ceil(torch.exp(logw) * x_mask * (1. / speed))
+        return w_ceil, m_p, logs_p, x_mask, g
+
+    def _encode_cached(self, batch, speaker_ids):
+        """Padded ``(x, m_p, logs_p, x_mask, g, dp_logw)`` for ``batch``, running
+        ``SynthesizerTrn.encode_text`` and the deterministic duration predictor only for sentences
+        missing from ``self.encoder_cache``."""
+        device = self.device
+        keys = [('encoder', self.language, int(sid), item[5][0]) for item, sid in zip(batch, speaker_ids)]
+        entries = [self.encoder_cache.get(key) for key in keys]
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing:
+            items = [batch[i] for i in missing]
+            lengths = [item[2].size(0) for item in items]
+            x_tst, tones, lang_ids, bert, ja_bert = self._pad_batch(items)
+            x, m_p, logs_p, x_mask, g = self.model.encode_text(
+                x_tst.to(device),
+                torch.LongTensor(lengths).to(device),
+                torch.LongTensor([speaker_ids[i] for i in missing]).to(device),
+                tones.to(device),
+                lang_ids.to(device),
+                bert.to(device),
+                ja_bert.to(device),
+            )
+            dp_logw = None if self.model.dp is None else self.model.dp(x, x_mask, g=g)
+            for j, i in enumerate(missing):
+                # copies, so an entry does not keep the whole padded batch alive
+                n = lengths[j]
+                entry = (
+                    x[j, :, :n].clone(), m_p[j, :, :n].clone(), logs_p[j, :, :n].clone(), g[j].clone(),
+                    None if dp_logw is None else dp_logw[j, :, :n].clone(),
+                )
+                self.encoder_cache.put(keys[i], entry)
+                entries[i] = entry
+
+        lengths = [entry[0].size(1) for entry in entries]
+        max_len = max(lengths)
+
+        def pad(tensors):
+            padded = tensors[0].new_zeros(len(tensors), tensors[0].size(0), max_len)
+            for i, t in enumerate(tensors):
+                padded[i, :, :t.size(1)] = t
+            return padded
+
+        x, m_p, logs_p = (pad([entry[k] for entry in entries]) for k in range(3))
+        x_mask = commons.sequence_mask(torch.LongTensor(lengths).to(device), max_len).unsqueeze(1).to(x.dtype)
+        g = torch.stack([entry[3] for entry in entries])
+        dp_logw = None if entries[0][4] is None else pad([entry[4] for entry in entries])
+        return x, m_p, logs_p, x_mask, g, dp_logw
+
+    def _make_generator(self, seed):
+        """A seeded ``torch.Generator`` on the model device, or None to use the global RNG."""
+        if seed is None:
+            return None
+        return torch.Generator(device=self.device).manual_seed(seed)
+
+    def tts_iter(self, text, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, quiet=True, batch_size=1, max_batch_tokens=None, seed=None, chunk_frames=None):
+        """Stream synthesis sentence by sentence.
+
+        Yields ``(chunk, word_timings)`` where ``chunk`` is float32 audio for one sentence followed
+        by the inter-sentence silence, and ``word_timings`` carry absolute offsets from the start
+        of the stream. Concatenating all chunks gives the audio of ``tts_to_file_with_timing``.
+
+        With ``chunk_frames`` each sentence is decoded by the vocoder in overlapping windows of
+        that many frames (see ``Generator.iter_chunks``) and every window is yielded as soon as it
+        is ready; a sentence's word timings come with its first window. Sentences are then not
+        batched.
+        """
+        texts = self.split_sentences_into_pieces(text, self.language, quiet)
+        sr = self.hps.data.sampling_rate
+        silence = np.zeros(int((sr * 0.05) / speed), dtype=np.float32)
+        current_time = 0
+        if chunk_frames is None:
+            segments = (
+                (audio, word_timings, True) for audio, word_timings in self._iter_segments(
+                    texts, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed, batch_size, max_batch_tokens, seed
+                )
+            )
+        else:
+            segments = self._iter_segment_chunks(
+                texts, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed, chunk_frames, seed
+            )
+        for audio, word_timings, sentence_end in segments:
+            for timing in word_timings:
+                timing['start'] += current_time
+                timing['end'] += current_time
+            chunk = audio.astype(np.float32)
+            if sentence_end:
+                chunk = np.concatenate([chunk, silence])
+            current_time += len(chunk) / sr
+            yield chunk, word_timings
         torch.cuda.empty_cache()
-        
-        # Concatenate audio segments and merge timing information
-        audio, timing_info = self.audio_numpy_concat(audio_list, sr=self.hps.data.sampling_rate, speed=speed)
+
+    async def atts_iter(self, text, speaker_id, **kwargs):
+        """Async variant of ``tts_iter``; each sentence is synthesized in the default executor."""
+        loop = asyncio.get_running_loop()
+        chunks = self.tts_iter(text, speaker_id, **kwargs)
+        while True:
+            item = await loop.run_in_executor(None, next, chunks, None)
+            if item is None:
+                break
+            yield item
+
+    def tts_to_file_with_timing(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False, batch_size=1, max_batch_tokens=None, seed=None, phone_budget=None):
+        """Synthesize ``text`` and return ``(audio, word_timings)``.
+
+        Sentences are padded into batches and decoded with a single ``infer`` call per batch.
+        ``batch_size`` caps the number of sentences per batch and ``max_batch_tokens`` caps the
+        padded phone count (sentences x longest sentence); ``None`` disables a limit. The default
+        ``batch_size=1`` decodes one sentence at a time.
+
+        With ``phone_budget`` the text is split into chunks of about that many phones instead of
+        sentences (see ``split_sentences_by_phones``), and chunks of similar length are batched
+        together.
+
+        With an explicit ``seed`` sampling is deterministic, and results are served from and
+        stored in ``self.cache`` when one is configured.
+        """
+        language = self.language
+        cached = None
+        cache_key = None
+        if self.cache is not None and seed is not None:
+            # batching does not change the audio, so batch_size and max_batch_tokens are not keyed
+            cache_key = self.cache.make_key(
+                language, speaker_id, text, speed, sdp_ratio, noise_scale, noise_scale_w, seed,
+                phone_budget=phone_budget, **self.cache_identity(),
+            )
+            cached = self.cache.get(cache_key)
+
+        if cached is not None:
+            audio, timing_info = cached
+        else:
+            order = None
+            if phone_budget is None:
+                texts = self.split_sentences_into_pieces(text, language, quiet)
+            else:
+                chunks, order = self.split_sentences_by_phones(text, phone_budget, quiet)
+                texts = [chunks[i] for i in order]
+
+            if pbar:
+                tx = pbar(texts)
+            else:
+                if position:
+                    tx = tqdm(texts, position=position)
+                elif quiet:
+                    tx = texts
+                else:
+                    tx = tqdm(texts)
+
+            audio_list = list(self._iter_segments(
+                tx, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed, batch_size, max_batch_tokens, seed, order
+            ))
+            torch.cuda.empty_cache()
+            if order is not None:
+                # back to text order
+                segments = audio_list
+                audio_list = [None] * len(segments)
+                for index, segment in zip(order, segments):
+                    audio_list[index] = segment
+
+            # Concatenate audio segments and merge timing information
+            audio, timing_info = self.audio_numpy_concat(audio_list, sr=self.hps.data.sampling_rate, speed=speed)
+            if cache_key is not None:
+                self.cache.put(cache_key, audio, timing_info)
 
         if output_path is None:
             return audio, timing_info
@@ -237,10 +734,68 @@ class TTS(nn.Module):
                 soundfile.write(output_path, audio, self.hps.data.sampling_rate)
             return audio, timing_info
 
-    def tts_to_file(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False):
+    def predict_durations(self, text, speaker_id, speed=1.0, sdp_ratio=0.2, noise_scale_w=0.8, quiet=True, batch_size=8, seed=None):
+        """Predict how long ``text`` will take to speak without running the flow or the vocoder.
+
+        Runs the text frontend, the text encoder and the duration predictors over batches of
+        ``batch_size`` sentences. With the same ``seed`` and sampling arguments the durations
+        are those ``tts_to_file_with_timing`` would produce. Returns a dict with the total
+        ``seconds`` (including the pauses between sentences), the total ``frames`` and, per
+        sentence, its ``text``, ``phones``, per-phone ``phone_frames`` and ``words`` with
+        absolute ``start``/``end`` seconds and ``frames``.
+        """
+        texts = self.split_sentences_into_pieces(text, self.language, quiet)
+        sr = self.hps.data.sampling_rate
+        frame_time = self.hps.data.hop_length / sr
+        silence = int((sr * 0.05) / speed) / sr
+        sentences = []
+        items = self._iter_text_items(texts, batch_size)
+        index = 0
+        current_time = 0
+        while True:
+            batch = list(itertools.islice(items, batch_size))
+            if not batch:
+                break
+            lengths = [item[2].size(0) for item in batch]
+            generators = None
+            if seed is not None:
+                generators = [self._make_generator(seed + index + i) for i in range(len(batch))]
+            index += len(batch)
+            with torch.no_grad():
+                durations = self._infer_durations(
+                    batch, [speaker_id] * len(batch), sdp_ratio, noise_scale_w, speed, generators
+                )[0][:, 0].long().cpu().numpy()
+
+            for i, item in enumerate(batch):
+                norm_text, word2ph = item[5]
+                phone_frames = durations[i, :lengths[i]]
+                frames = max(int(phone_frames.sum()), 1)
+                word_spans = self.get_word_spans(norm_text, word2ph)
+                words = self.get_word_timings_from_durations(phone_frames, word_spans)
+                for word, (_, start, end) in zip(words, word_spans):
+                    word['start'] += current_time
+                    word['end'] += current_time
+                    word['frames'] = int(phone_frames[start:end].sum())
+                sentences.append({
+                    'text': norm_text,
+                    'phones': [self.id_to_symbol[int(p)] for p in item[2]],
+                    'phone_frames': phone_frames.tolist(),
+                    'frames': frames,
+                    'words': words,
+                })
+                current_time += frames * frame_time + silence
+
+        return {
+            'seconds': current_time,
+            'frames': sum(sentence['frames'] for sentence in sentences),
+            'sentences': sentences,
+        }
+
+    def tts_to_file(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False, batch_size=1, max_batch_tokens=None, seed=None, phone_budget=None):
         """Legacy method for backward compatibility"""
         audio, _ = self.tts_to_file_with_timing(
             text, speaker_id, output_path, sdp_ratio, noise_scale, 
-            noise_scale_w, speed, pbar, format, position, quiet
+            noise_scale_w, speed, pbar, format, position, quiet,
+            batch_size=batch_size, max_batch_tokens=max_batch_tokens, seed=seed, phone_budget=phone_budget
         )
         return audio
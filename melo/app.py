@@ -8,6 +8,7 @@ import io
 import tempfile
 import click
 from melo.api import TTS
+from melo.model_registry import ModelRegistry
 from tqdm import tqdm
 
 print("Make sure you've downloaded unidic (python -m unidic download) for this WebUI to work.")
@@ -16,18 +17,20 @@ print("Make sure you've downloaded unidic (python -m unidic download) for this W
 DEVICE = 'auto'
 SUPPORTED_LANGUAGES = ['EN', 'ES', 'FR', 'ZH', 'JP', 'KR']
 
-# Initialize TTS models with error handling
-def init_models() -> Dict[str, TTS]:
-    models = {}
-    for lang in SUPPORTED_LANGUAGES:
-        try:
-            models[lang] = TTS(language=lang, device=DEVICE)
-        except Exception as e:
-            print(f"Failed to load {lang} model: {str(e)}")
+MAX_RESIDENT_LANGUAGES = 2
+IDLE_TIMEOUT = 600
+
+# TTS models are loaded on first use; EN is pinned since the UI starts on it
+def init_models() -> ModelRegistry:
+    models = ModelRegistry(device=DEVICE, max_resident=MAX_RESIDENT_LANGUAGES, idle_timeout=IDLE_TIMEOUT)
+    try:
+        models.pin('EN')
+    except Exception as e:
+        print(f"Failed to load EN model: {str(e)}")
     return models
 
 models = init_models()
-speaker_ids = models['EN'].hps.data.spk2id if 'EN' in models else {}
+speaker_ids = models.get('EN').hps.data.spk2id if 'EN' in models else {}
 
 default_text_dict = {
     'EN': 'The field of text-to-speech has seen rapid development recently.',
@@ -56,20 +59,21 @@ def synthesize(
     Returns:
         The path to the synthesized audio file
     """
-    if language not in models:
+    if language not in SUPPORTED_LANGUAGES:
         raise ValueError(f"Language {language} not supported")
     
     # Create a temporary file
     temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
     temp_file.close()
     
-    models[language].tts_to_file(
-        text,
-        models[language].hps.data.spk2id[speaker],
-        temp_file.name,
-        speed=speed,
-        pbar=tqdm
-    )
+    with models.lease(language) as model:
+        model.tts_to_file(
+            text,
+            model.hps.data.spk2id[speaker],
+            temp_file.name,
+            speed=speed,
+            pbar=tqdm
+        )
     return temp_file.name
 
 def load_speakers(
@@ -86,14 +90,15 @@ def load_speakers(
     Returns:
         Tuple containing speaker update and new text
     """
-    if language not in models:
+    if language not in SUPPORTED_LANGUAGES:
         raise ValueError(f"Language {language} not supported")
     
     newtext = default_text_dict[language] if text in default_text_dict.values() else text
+    spk2id = models.get(language).hps.data.spk2id
     return (
         gr.update(
-            value=list(models[language].hps.data.spk2id.keys())[0],
-            choices=list(models[language].hps.data.spk2id.keys())
+            value=list(spk2id.keys())[0],
+            choices=list(spk2id.keys())
         ),
         newtext
     )
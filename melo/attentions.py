@@ -227,6 +227,8 @@ class MultiHeadAttention(nn.Module):
         self.proximal_bias = proximal_bias
         self.proximal_init = proximal_init
         self.attn = None
+        # set to store the attention probabilities in attn on the fused path too
+        self.keep_attn = False
 
         self.k_channels = channels // n_heads
         self.conv_q = nn.Conv1d(channels, channels, 1)
@@ -256,6 +258,14 @@ class MultiHeadAttention(nn.Module):
                 self.conv_k.bias.copy_(self.conv_q.bias)
 
     def forward(self, x, c, attn_mask=None):
+        """
+        x: [b, channels, t_t], c: [b, channels, t_s]
+        ret: [b, out_channels, t_t]
+
+        Stores the attention probabilities [b, n_h, t_t, t_s] in ``attn``. On the fused path
+        (no relative window, proximal bias or block length) ``attn`` is None unless ``keep_attn``
+        is set.
+        """
         q = self.conv_q(x)
         k = self.conv_k(c)
         v = self.conv_v(c)
@@ -272,17 +282,21 @@ class MultiHeadAttention(nn.Module):
         key = key.view(b, self.n_heads, self.k_channels, t_s).transpose(2, 3)
         value = value.view(b, self.n_heads, self.k_channels, t_s).transpose(2, 3)
 
+        fused = self.window_size is None and not self.proximal_bias and self.block_length is None
+        if fused and not self.keep_attn:
+            # content term only: the fused kernel never materializes the probabilities
+            output = self._fused_attention(query, key, value, mask)
+            return output.transpose(2, 3).contiguous().view(b, d, t_t), None
+
         scores = torch.matmul(query / math.sqrt(self.k_channels), key.transpose(-2, -1))
         if self.window_size is not None:
             assert (
                 t_s == t_t
             ), "Relative attention is only available for self-attention."
-            key_relative_embeddings = self._get_relative_embeddings(self.emb_rel_k, t_s)
             rel_logits = self._matmul_with_relative_keys(
-                query / math.sqrt(self.k_channels), key_relative_embeddings
+                query / math.sqrt(self.k_channels), self.emb_rel_k
             )
-            scores_local = self._relative_position_to_absolute_position(rel_logits)
-            scores = scores + scores_local
+            scores = self._add_relative_band(scores, rel_logits)
         if self.proximal_bias:
             assert t_s == t_t, "Proximal bias is only available for self-attention."
             scores = scores + self._attention_bias_proximal(t_s).to(
@@ -304,18 +318,33 @@ class MultiHeadAttention(nn.Module):
         p_attn = self.drop(p_attn)
         output = torch.matmul(p_attn, value)
         if self.window_size is not None:
-            relative_weights = self._absolute_position_to_relative_position(p_attn)
-            value_relative_embeddings = self._get_relative_embeddings(
-                self.emb_rel_v, t_s
-            )
+            relative_weights = self._relative_band(p_attn)
             output = output + self._matmul_with_relative_values(
-                relative_weights, value_relative_embeddings
+                relative_weights, self.emb_rel_v
             )
         output = (
             output.transpose(2, 3).contiguous().view(b, d, t_t)
         )  # [b, n_h, t_t, d_k] -> [b, d, t_t]
         return output, p_attn
 
+    def _fused_attention(self, query, key, value, mask=None):
+        """
+        query, key, value: [b, h, t, d_k]
+        ret: [b, h, t_t, d_k]
+        """
+        attn_bias = None
+        if mask is not None:
+            # additive, so fully masked (padding) rows stay finite like with masked_fill
+            attn_bias = torch.zeros(mask.shape, device=query.device, dtype=query.dtype)
+            attn_bias = attn_bias.masked_fill(mask == 0, -1e4)
+        return F.scaled_dot_product_attention(
+            query,
+            key,
+            value,
+            attn_mask=attn_bias,
+            dropout_p=self.p_dropout if self.training else 0.0,
+        )
+
     def _matmul_with_relative_values(self, x, y):
         """
         x: [b, h, l, m]
@@ -334,60 +363,37 @@ class MultiHeadAttention(nn.Module):
         ret = torch.matmul(x, y.unsqueeze(0).transpose(-2, -1))
         return ret
 
-    def _get_relative_embeddings(self, relative_embeddings, length):
-        2 * self.window_size + 1
-        # Pad first before slice to avoid using cond ops.
-        pad_length = max(length - (self.window_size + 1), 0)
-        slice_start_position = max((self.window_size + 1) - length, 0)
-        slice_end_position = slice_start_position + 2 * length - 1
-        if pad_length > 0:
-            padded_relative_embeddings = F.pad(
-                relative_embeddings,
-                commons.convert_pad_shape([[0, 0], [pad_length, pad_length], [0, 0]]),
-            )
-        else:
-            padded_relative_embeddings = relative_embeddings
-        used_relative_embeddings = padded_relative_embeddings[
-            :, slice_start_position:slice_end_position
-        ]
-        return used_relative_embeddings
-
-    def _relative_position_to_absolute_position(self, x):
+    def _band_index(self, x):
         """
-        x: [b, h, l, 2*l-1]
-        ret: [b, h, l, l]
+        x: [b, h, l, l]
+        ret: [b, h, l, 2*window_size+1], the position of key i + k - window_size of row i in
+        the last dim of x padded by window_size on both sides. Built from tensor ops only, so a
+        traced graph stays valid for any length, including ones shorter than the window.
         """
-        batch, heads, length, _ = x.size()
-        # Concat columns of pad to shift from relative to absolute indexing.
-        x = F.pad(x, commons.convert_pad_shape([[0, 0], [0, 0], [0, 0], [0, 1]]))
-
-        # Concat extra elements so to add up to shape (len+1, 2*len-1).
-        x_flat = x.view([batch, heads, length * 2 * length])
-        x_flat = F.pad(
-            x_flat, commons.convert_pad_shape([[0, 0], [0, 0], [0, length - 1]])
-        )
+        width = 2 * self.window_size + 1
+        rows = torch.arange(x.size(-2), device=x.device).unsqueeze(1)
+        index = rows + torch.arange(width, device=x.device).unsqueeze(0)
+        return index.expand(*x.shape[:-1], width)
 
-        # Reshape and slice out the padded elements.
-        x_final = x_flat.view([batch, heads, length + 1, 2 * length - 1])[
-            :, :, :length, length - 1 :
-        ]
-        return x_final
+    def _add_relative_band(self, scores, rel_logits):
+        """
+        scores: [b, h, l, l]
+        rel_logits: [b, h, l, 2*window_size+1]
+        ret: scores[..., i, i + k] += rel_logits[..., i, window_size + k] for |k| <= window_size
+        """
+        # offsets past either end of a row land in the padding and are dropped
+        padded = F.pad(scores, [self.window_size, self.window_size])
+        padded = padded.scatter_add(-1, self._band_index(scores), rel_logits)
+        return padded[..., self.window_size : self.window_size + scores.size(-1)]
 
-    def _absolute_position_to_relative_position(self, x):
+    def _relative_band(self, x):
         """
         x: [b, h, l, l]
-        ret: [b, h, l, 2*l-1]
+        ret: [b, h, l, 2*window_size+1] with ret[..., i, window_size + k] = x[..., i, i + k],
+        zero where i + k is out of range
         """
-        batch, heads, length, _ = x.size()
-        # pad along column
-        x = F.pad(
-            x, commons.convert_pad_shape([[0, 0], [0, 0], [0, 0], [0, length - 1]])
-        )
-        x_flat = x.view([batch, heads, length**2 + length * (length - 1)])
-        # add 0's in the beginning that will skew the elements after reshape
-        x_flat = F.pad(x_flat, commons.convert_pad_shape([[0, 0], [0, 0], [length, 0]]))
-        x_final = x_flat.view([batch, heads, length, 2 * length])[:, :, :, 1:]
-        return x_final
+        padded = F.pad(x, [self.window_size, self.window_size])
+        return padded.gather(-1, self._band_index(x))
 
     def _attention_bias_proximal(self, length):
         """Bias for self-attention to encourage attention to close positions.
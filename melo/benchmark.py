@@ -0,0 +1,76 @@
+import time
+import click
+import librosa
+import numpy as np
+import torch
+
+from melo.api import TTS
+
+DEFAULT_TEXTS = {
+    'EN': 'The field of text-to-speech has seen rapid development recently.',
+    'ES': 'El campo de la conversión de texto a voz ha experimentado un rápido desarrollo recientemente.',
+    'FR': 'Le domaine de la synthèse vocale a connu un développement rapide récemment',
+    'ZH': 'text-to-speech 领域近年来发展迅速',
+    'JP': 'テキスト読み上げの分野は最近急速な発展を遂げています',
+    'KR': '최근 텍스트 음성 변환 분야가 급속도로 발전하고 있습니다.',
+}
+
+
+def synthesize(model, text, runs, seed=0):
+    """Return the audio and real-time factor (synthesis time / audio duration) of ``text``."""
+    speaker_id = list(model.hps.data.spk2id.values())[0]
+    # warm-up run also loads BERT and fills allocator caches
+    audio, _ = model.tts_to_file_with_timing(text, speaker_id, quiet=True, seed=seed)
+    start = time.perf_counter()
+    for _ in range(runs):
+        audio, _ = model.tts_to_file_with_timing(text, speaker_id, quiet=True, seed=seed)
+    elapsed = (time.perf_counter() - start) / runs
+    return audio, elapsed / (len(audio) / model.hps.data.sampling_rate)
+
+
+def spectral_distance(reference, audio, sr, n_mels=80):
+    """Log-mel spectral distance in dB between two renditions of the same text.
+
+    Durations may differ slightly between model variants, so frames are aligned with DTW
+    before the per-frame RMS difference is averaged.
+    """
+    def log_mel(y):
+        mel = librosa.feature.melspectrogram(y=y.astype(np.float32), sr=sr, n_mels=n_mels)
+        return librosa.power_to_db(mel, ref=1.0, amin=1e-10)
+
+    ref, test = log_mel(reference), log_mel(audio)
+    _, path = librosa.sequence.dtw(X=ref, Y=test, metric='euclidean')
+    diff = ref[:, path[:, 0]] - test[:, path[:, 1]]
+    return float(np.sqrt((diff ** 2).mean(axis=0)).mean())
+
+
+@click.command()
+@click.option('--language', '-l', 'languages', multiple=True, default=['EN'], help="Languages to benchmark, repeatable")
+@click.option('--text', '-t', type=str, default=None, help="Text to synthesize instead of the per-language default")
+@click.option('--quantize', '-q', type=click.Choice(['int8']), default='int8', help="Quantization mode compared against fp32")
+@click.option('--runs', '-n', type=int, default=3, help="Timed runs per model")
+@click.option('--threads', type=int, default=None, help="torch CPU threads")
+def main(languages, text, quantize, runs, threads):
+    """Compare real-time factor and quality of a quantized TTS model against fp32 on CPU."""
+    if threads is not None:
+        torch.set_num_threads(threads)
+
+    print(f"{'language':<10}{'fp32 RTF':>10}{quantize + ' RTF':>10}{'speedup':>9}{'LSD (dB)':>10}")
+    for language in languages:
+        language = language.upper()
+        sample = text or DEFAULT_TEXTS[language]
+
+        model = TTS(language=language, device='cpu')
+        reference, base_rtf = synthesize(model, sample, runs)
+        model.close()
+
+        model = TTS(language=language, device='cpu', quantize=quantize)
+        audio, rtf = synthesize(model, sample, runs)
+        distance = spectral_distance(reference, audio, model.hps.data.sampling_rate)
+        model.close()
+
+        print(f"{language:<10}{base_rtf:>10.3f}{rtf:>10.3f}{base_rtf / rtf:>8.2f}x{distance:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
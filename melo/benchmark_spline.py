@@ -0,0 +1,64 @@
+import time
+import click
+import torch
+
+from melo.transforms import (
+    piecewise_rational_quadratic_transform,
+    unconstrained_rational_quadratic_spline_inverse,
+)
+
+
+def spline_inputs(batch, length, num_bins=10, tail_bound=5.0, seed=0):
+    """Random inputs shaped like a ``ConvFlow`` of the stochastic duration predictor, with
+    some values in the linear tails."""
+    generator = torch.Generator().manual_seed(seed)
+    inputs = torch.randn(batch, 1, length, generator=generator) * tail_bound / 2
+    widths = torch.randn(batch, 1, length, num_bins, generator=generator)
+    heights = torch.randn(batch, 1, length, num_bins, generator=generator)
+    derivatives = torch.randn(batch, 1, length, num_bins - 1, generator=generator)
+    return inputs, widths, heights, derivatives
+
+
+def reference_inverse(inputs, widths, heights, derivatives, tail_bound=5.0):
+    return piecewise_rational_quadratic_transform(
+        inputs, widths, heights, derivatives, inverse=True, tails="linear", tail_bound=tail_bound
+    )[0]
+
+
+def fast_inverse(inputs, widths, heights, derivatives, tail_bound=5.0):
+    return unconstrained_rational_quadratic_spline_inverse(
+        inputs, widths, heights, derivatives, tail_bound=tail_bound
+    )
+
+
+def time_per_call(fn, args, runs):
+    fn(*args)
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(*args)
+    return (time.perf_counter() - start) / runs
+
+
+@click.command()
+@click.option('--batch', '-b', type=int, default=1, help="Sentences per batch")
+@click.option('--lengths', '-l', type=str, default="32,128,512", help="Comma separated phone counts")
+@click.option('--runs', '-n', type=int, default=200, help="Timed calls per implementation")
+@click.option('--threads', type=int, default=None, help="torch CPU threads")
+def main(batch, lengths, runs, threads):
+    """Compare the inverse rational-quadratic spline used by the stochastic duration predictor
+    at inference against the general transform it replaces."""
+    if threads is not None:
+        torch.set_num_threads(threads)
+
+    print(f"{'phones':<8}{'reference (ms)':>16}{'fast (ms)':>12}{'speedup':>9}{'max diff':>11}")
+    with torch.no_grad():
+        for length in [int(n) for n in lengths.split(',')]:
+            args = spline_inputs(batch, length)
+            reference = time_per_call(reference_inverse, args, runs)
+            fast = time_per_call(fast_inverse, args, runs)
+            diff = (reference_inverse(*args) - fast_inverse(*args)).abs().max().item()
+            print(f"{length:<8}{reference * 1e3:>16.3f}{fast * 1e3:>12.3f}{reference / fast:>8.2f}x{diff:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
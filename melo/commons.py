@@ -125,6 +125,21 @@ def sequence_mask(length, max_length=None):
     return x.unsqueeze(0) < length.unsqueeze(1)
 
 
+def randn_per_item(size, lengths, generators, device=None, dtype=None):
+    """
+    size: [b, c, t]
+    Noise for item i is drawn from generators[i] over its first lengths[i] steps only,
+    so it does not depend on how much the batch is padded.
+    """
+    noise = torch.zeros(size, device=device, dtype=dtype)
+    for i, generator in enumerate(generators):
+        length = int(lengths[i])
+        noise[i, :, :length] = torch.randn(
+            size[1], length, generator=generator, device=device, dtype=dtype
+        )
+    return noise
+
+
 def generate_path(duration, mask):
     """
     duration: [b, 1, t_x]
@@ -142,6 +157,23 @@ def generate_path(duration, mask):
     return path
 
 
+def duration_to_indices(duration, t_y):
+    """
+    duration: [b, 1, t_x] integer frame counts
+    t_y: number of output frames
+    Returns the [b, t_y] input step each output frame repeats and a [b, t_y] mask of the frames
+    the durations cover; the gather equivalent of ``generate_path``.
+    """
+    b, _, t_x = duration.shape
+    cum_duration = torch.cumsum(duration.squeeze(1), -1).long()
+    # a step starts where the previous ones end; zero durations stack their increments
+    starts = torch.zeros(b, t_y + 1, dtype=torch.long, device=duration.device)
+    starts.scatter_add_(1, cum_duration[:, :-1], torch.ones_like(cum_duration[:, :-1]))
+    indices = torch.cumsum(starts, -1)[:, :t_y]
+    frames = torch.arange(t_y, device=duration.device).unsqueeze(0)
+    return indices, frames < cum_duration[:, -1:]
+
+
 def clip_grad_value_(parameters, clip_value, norm_type=2):
     if isinstance(parameters, torch.Tensor):
         parameters = [parameters]
@@ -0,0 +1,87 @@
+import os
+import logging
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# The parts of SynthesizerTrn that dominate per-sentence latency
+COMPILED_SUBMODULES = ('flow', 'dec')
+# Phone counts exercised by warm-up; dynamic shapes cover lengths in between
+WARMUP_LENGTHS = (16, 64, 192)
+
+
+class _CompiledForward:
+    """Replacement ``forward`` of a compiled submodule.
+
+    Runs the ``torch.compile`` version and switches back to the eager ``forward`` for good the
+    first time compilation or the compiled graph fails. Assigned on the instance, so the
+    module's parameters and ``state_dict`` keys are untouched.
+    """
+
+    def __init__(self, name, eager, compiled):
+        self.name = name
+        self.eager = eager
+        self.compiled = compiled
+
+    def __call__(self, *args, **kwargs):
+        if self.compiled is not None:
+            try:
+                return self.compiled(*args, **kwargs)
+            except Exception:
+                logger.warning('Compiled %s failed, falling back to eager mode', self.name, exc_info=True)
+                self.compiled = None
+        return self.eager(*args, **kwargs)
+
+
+def compile_synthesizer(model, mode=None):
+    """``torch.compile`` the ``COMPILED_SUBMODULES`` of a ``SynthesizerTrn`` with dynamic
+    sequence lengths, in place. Compilation happens on the first call of each module; see
+    ``_CompiledForward`` for the fallback. Returns the names of the modules set up."""
+    compiled = []
+    for name in COMPILED_SUBMODULES:
+        module = getattr(model, name, None)
+        if module is None or isinstance(module.forward, _CompiledForward):
+            continue
+        try:
+            compiled_forward = torch.compile(module.forward, dynamic=True, mode=mode)
+        except Exception:
+            logger.warning('torch.compile is unavailable for %s', name, exc_info=True)
+            continue
+        module.forward = _CompiledForward(name, module.forward, compiled_forward)
+        compiled.append(name)
+    return compiled
+
+
+def compile_cache_path(cache_dir, key):
+    """File holding the compiled artifacts for ``key``; compiled code is only valid for the
+    torch build that produced it."""
+    return os.path.join(cache_dir, f'{key}-torch{torch.__version__}.bin')
+
+
+def load_compile_cache(path):
+    """Preload compiled artifacts saved by ``save_compile_cache`` so ``torch.compile`` reuses
+    them instead of recompiling. Returns whether anything was loaded."""
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(path, 'rb') as f:
+            torch.compiler.load_cache_artifacts(f.read())
+    except Exception:
+        logger.warning('Ignoring unreadable compile cache %s', path, exc_info=True)
+        return False
+    return True
+
+
+def save_compile_cache(path):
+    """Write every artifact compiled by this process so far to ``path``."""
+    artifacts = torch.compiler.save_cache_artifacts()
+    if artifacts is None:
+        return False
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Write then rename so concurrent workers never load a partial file
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(artifacts[0])
+    os.replace(tmp_path, path)
+    return True
@@ -52,7 +52,8 @@ def load_or_download_config(locale, use_hf=True, config_path=None):
             config_path = cached_path(DOWNLOAD_CONFIG_URLS[language])
     return utils.get_hparams_from_file(config_path)
 
-def load_or_download_model(locale, device, use_hf=True, ckpt_path=None):
+def get_model_path(locale, use_hf=True, ckpt_path=None):
+    """Local path of the checkpoint ``load_or_download_model`` loads, downloading it if needed."""
     if ckpt_path is None:
         language = locale.split('-')[0].upper()
         if use_hf:
@@ -61,7 +62,10 @@ def load_or_download_model(locale, device, use_hf=True, ckpt_path=None):
         else:
             assert language in DOWNLOAD_CKPT_URLS
             ckpt_path = cached_path(DOWNLOAD_CKPT_URLS[language])
-    return torch.load(ckpt_path, map_location=device)
+    return ckpt_path
+
+def load_or_download_model(locale, device, use_hf=True, ckpt_path=None):
+    return torch.load(get_model_path(locale, use_hf=use_hf, ckpt_path=ckpt_path), map_location=device)
 
 def load_pretrain_model():
     return [cached_path(url) for url in PRETRAINED_MODELS.values()]
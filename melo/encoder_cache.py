@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+
+import torch
+
+
+def _nbytes(value):
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+class EncoderCache:
+    """Per-sentence cache of the parts of synthesis that do not depend on the sampling arguments.
+
+    ``TTS`` stores two kinds of entries: the text frontend output of a sentence (phones, tones
+    and BERT features), keyed by language and sentence, and the text encoder output for it
+    (``x``, ``m_p``, ``logs_p``, the deterministic duration predictor's ``logw`` and the speaker
+    embedding ``g``), keyed by language, speaker and normalized sentence. Re-synthesizing a
+    sentence at another speed or noise scale then starts from the duration predictors.
+
+    Entries are tensors on the model device, kept in an LRU bounded by their total size
+    (``max_bytes``).
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = _nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,118 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    __slots__ = ('item', 'speaker_id', 'params', 'generator', 'future', 'enqueued')
+
+    def __init__(self, item, speaker_id, params, generator):
+        self.item = item
+        self.speaker_id = speaker_id
+        self.params = params
+        self.generator = generator
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class InferenceScheduler:
+    """Dynamic micro-batching in front of one ``TTS`` model.
+
+    Sentence-level jobs from any number of caller threads are queued and a single worker
+    thread forms padded batches from them. A batch is closed when it reaches
+    ``max_batch_size`` sentences or ``max_batch_tokens`` padded phones, or when the oldest
+    queued job has waited ``max_wait_ms``. Only jobs with the same sampling parameters
+    (sdp_ratio, noise scales, speed) share a batch; speakers and seeds may differ.
+
+    Attach it with ``tts.scheduler = InferenceScheduler(tts)`` and every synthesis call on that
+    ``TTS`` goes through the scheduler.
+    """
+
+    def __init__(self, tts, max_batch_size=8, max_batch_tokens=None, max_wait_ms=20):
+        self.tts = tts
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_wait = max_wait_ms / 1000.
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f'tts-scheduler-{tts.language}', daemon=True)
+        self._thread.start()
+
+    def submit(self, item, speaker_id, sdp_ratio, noise_scale, noise_scale_w, speed, generator=None):
+        """Queue one sentence (``utils.get_text_for_tts_infer`` output) for synthesis.
+
+        Returns a ``Future`` resolving to ``(audio, word_timings)``.
+        """
+        if self._closed:
+            raise RuntimeError('InferenceScheduler is closed')
+        job = _Job(item, speaker_id, (sdp_ratio, noise_scale, noise_scale_w, speed), generator)
+        self._queue.put(job)
+        return job.future
+
+    def close(self):
+        """Finish the queued jobs and stop the worker thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _take_batch(self, pending):
+        """Split ``pending`` into the next batch and the jobs left for later, keeping order."""
+        params = pending[0].params
+        batch, rest = [], []
+        for job in pending:
+            if job.params == params and not self.tts._batch_is_full(
+                [j.item for j in batch], job.item[2].size(0), self.max_batch_size, self.max_batch_tokens
+            ):
+                batch.append(job)
+            else:
+                rest.append(job)
+        return batch, rest
+
+    def _run(self):
+        pending = []
+        stopping = False
+        while pending or not stopping:
+            if not pending:
+                job = self._queue.get()
+                if job is None:
+                    break
+                pending.append(job)
+
+            # Collect more jobs until the oldest one has waited for the whole window
+            deadline = pending[0].enqueued + self.max_wait
+            while not stopping and (self.max_batch_size is None or len(pending) < self.max_batch_size):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                else:
+                    pending.append(job)
+
+            batch, pending = self._take_batch(pending)
+            self._infer(batch)
+
+    def _infer(self, batch):
+        try:
+            results = self.tts._infer_batch(
+                [job.item for job in batch],
+                [job.speaker_id for job in batch],
+                *batch[0].params,
+                generators=[job.generator for job in batch],
+            )
+        except Exception as e:
+            logger.exception('Batched inference failed')
+            for job in batch:
+                job.future.set_exception(e)
+            return
+        for job, result in zip(batch, results):
+            job.future.set_result(result)
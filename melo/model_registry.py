@@ -0,0 +1,205 @@
+import gc
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ('language', 'model', 'last_used', 'leases', 'evicted')
+
+    def __init__(self, language, model):
+        self.language = language
+        self.model = model
+        self.last_used = time.monotonic()
+        self.leases = 0
+        self.evicted = False
+
+
+class ModelRegistry:
+    """Per-language ``TTS`` models loaded on first use.
+
+    At most ``max_resident`` unpinned models are kept; loading another one evicts the least
+    recently used. A background thread also evicts unpinned models that have not been used
+    for ``idle_timeout`` seconds (``None`` disables idle eviction). Languages in ``pinned``
+    are never evicted. Evicting a model calls its ``close()``, which for ``TTS`` stops its
+    scheduler and releases its share of the BERT extractor.
+
+    Use ``lease`` to run inference: a model evicted while leased stays usable and is only
+    closed when its last lease ends. ``get`` takes no lease and suits quick lookups such as
+    the speaker table.
+
+    ``factory(language)`` builds the model and defaults to ``TTS(language, device=device)``;
+    ``on_load(language, model)`` runs after a model is loaded, e.g. to attach a scheduler.
+    """
+
+    def __init__(self, factory=None, max_resident=2, idle_timeout=600, pinned=(), device='auto', on_load=None):
+        if factory is None:
+            from .api import TTS
+
+            def factory(language):
+                return TTS(language=language, device=device)
+
+        self.factory = factory
+        self.on_load = on_load
+        self.max_resident = max_resident
+        self.idle_timeout = idle_timeout
+        self.pinned = set(pinned)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._closed = threading.Event()
+        self._reaper = None
+        if idle_timeout is not None:
+            self._reaper = threading.Thread(target=self._reap, name='tts-model-reaper', daemon=True)
+            self._reaper.start()
+
+    def __contains__(self, language):
+        with self._lock:
+            return language in self._entries
+
+    def loaded(self):
+        """Resident models by language, least recently used first."""
+        with self._lock:
+            return OrderedDict((language, entry.model) for language, entry in self._entries.items())
+
+    def get(self, language):
+        """Return the model for ``language``, loading it if necessary."""
+        return self._acquire(language, lease=False).model
+
+    @contextmanager
+    def lease(self, language):
+        """Context manager yielding the model for ``language``, loading it if necessary.
+
+        The model is not closed before the ``with`` block exits, even if it is evicted
+        meanwhile.
+        """
+        entry = self._acquire(language, lease=True)
+        try:
+            yield entry.model
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+                closing = [entry] if entry.evicted and entry.leases == 0 else []
+            self._release(closing)
+
+    def _acquire(self, language, lease):
+        with self._lock:
+            entry = self._touch(language, lease)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(language, threading.Lock())
+
+        # Load outside the registry lock so other languages stay available meanwhile
+        with load_lock:
+            with self._lock:
+                entry = self._touch(language, lease)
+                if entry is not None:
+                    return entry
+            logger.info('Loading TTS model for %s', language)
+            model = self.factory(language)
+            if self.on_load is not None:
+                self.on_load(language, model)
+            with self._lock:
+                entry = self._entries[language] = _Entry(language, model)
+                if lease:
+                    entry.leases += 1
+                evicted = self._evict(self._over_capacity())
+        self._release(evicted)
+        return entry
+
+    def preload(self, languages):
+        for language in languages:
+            self.get(language)
+
+    def pin(self, language, load=True):
+        """Never evict ``language``; load it right away unless ``load`` is False."""
+        with self._lock:
+            self.pinned.add(language)
+        if load:
+            self.get(language)
+
+    def unpin(self, language):
+        with self._lock:
+            self.pinned.discard(language)
+            evicted = self._evict(self._over_capacity())
+        self._release(evicted)
+
+    def evict(self, language):
+        with self._lock:
+            entry = self._entries.pop(language, None)
+            evicted = self._evict([entry] if entry is not None else [])
+        self._release(evicted)
+
+    def evict_idle(self):
+        """Evict every unpinned, unleased model unused for ``idle_timeout`` seconds."""
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                language for language, entry in self._entries.items()
+                if language not in self.pinned and entry.leases == 0
+                and now - entry.last_used >= self.idle_timeout
+            ]
+            evicted = self._evict([self._entries.pop(language) for language in idle])
+        self._release(evicted)
+
+    def close(self):
+        """Stop the idle reaper and unload every model; leased ones when their lease ends."""
+        self._closed.set()
+        if self._reaper is not None:
+            self._reaper.join()
+        with self._lock:
+            evicted = self._evict(list(self._entries.values()))
+            self._entries.clear()
+        self._release(evicted)
+
+    def _touch(self, language, lease=False):
+        entry = self._entries.get(language)
+        if entry is not None:
+            entry.last_used = time.monotonic()
+            if lease:
+                entry.leases += 1
+            self._entries.move_to_end(language)
+        return entry
+
+    def _over_capacity(self):
+        """Pop least recently used unpinned models beyond ``max_resident``."""
+        if self.max_resident is None:
+            return []
+        unpinned = [language for language in self._entries if language not in self.pinned]
+        excess = len(unpinned) - self.max_resident
+        return [self._entries.pop(language) for language in unpinned[:max(excess, 0)]]
+
+    @staticmethod
+    def _evict(entries):
+        """Mark entries removed from the registry as evicted and return the unleased ones,
+        which can be closed now. Called with the lock held."""
+        for entry in entries:
+            entry.evicted = True
+        return [entry for entry in entries if entry.leases == 0]
+
+    def _release(self, evicted):
+        if not evicted:
+            return
+        for entry in evicted:
+            logger.info('Unloading TTS model for %s', entry.language)
+            entry.model.close()
+            # Drop the last references before collecting so the weights are actually freed
+            entry.model = None
+        evicted.clear()
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def _reap(self):
+        interval = min(max(self.idle_timeout / 4, 1), 60)
+        while not self._closed.wait(interval):
+            self.evict_idle()
@@ -203,7 +203,7 @@ class StochasticDurationPredictor(nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, filter_channels, 1)
 
-    def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0):
+    def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0, generator=None, noise=None):
         x = torch.detach(x)
         x = self.pre(x)
         if g is not None:
@@ -254,10 +254,22 @@ class StochasticDurationPredictor(nn.Module):
         else:
             flows = list(reversed(self.flows))
             flows = flows[:-2] + [flows[-1]]  # remove a useless vflow
-            z = (
-                torch.randn(x.size(0), 2, x.size(2)).to(device=x.device, dtype=x.dtype)
-                * noise_scale
-            )
+            if noise is not None:
+                # [b, 2, t] standard normal noise drawn by the caller
+                z = noise.to(dtype=x.dtype)
+            elif isinstance(generator, (list, tuple)):
+                z = commons.randn_per_item(
+                    (x.size(0), 2, x.size(2)),
+                    x_mask.sum([1, 2]),
+                    generator,
+                    device=x.device,
+                    dtype=x.dtype,
+                )
+            else:
+                z = torch.randn(
+                    x.size(0), 2, x.size(2), generator=generator, device=x.device
+                ).to(dtype=x.dtype)
+            z = z * noise_scale
             for flow in flows:
                 z = flow(z, x_mask, g=x, reverse=reverse)
             z0, z1 = torch.split(z, [1, 1], 1)
@@ -516,20 +528,28 @@ class Generator(torch.nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, upsample_initial_channel, 1)
 
-    def forward(self, x, g=None):
+    def forward(self, x, g=None, x_mask=None):
+        """``x_mask`` [b, 1, t] marks the valid frames of a padded batch. Every convolution
+        then sees zeros past the end of each item, as it would decoding that item alone, so
+        the audio within an item's length does not depend on the rest of the batch."""
+        if x_mask is not None:
+            x = x * x_mask
         x = self.conv_pre(x)
         if g is not None:
             x = x + self.cond(g)
 
         for i in range(self.num_upsamples):
             x = F.leaky_relu(x, modules.LRELU_SLOPE)
+            if x_mask is not None:
+                x = x * x_mask
+                x_mask = torch.repeat_interleave(x_mask, self.ups[i].stride[0], dim=2)
             x = self.ups[i](x)
             xs = None
             for j in range(self.num_kernels):
                 if xs is None:
-                    xs = self.resblocks[i * self.num_kernels + j](x)
+                    xs = self.resblocks[i * self.num_kernels + j](x, x_mask)
                 else:
-                    xs += self.resblocks[i * self.num_kernels + j](x)
+                    xs += self.resblocks[i * self.num_kernels + j](x, x_mask)
             x = xs / self.num_kernels
         x = F.leaky_relu(x)
         x = self.conv_post(x)
@@ -537,6 +557,62 @@ class Generator(torch.nn.Module):
 
         return x
 
+    def hop_length(self):
+        """Output samples per input frame."""
+        return math.prod(up.stride[0] for up in self.ups)
+
+    def context_frames(self):
+        """Input frames on either side of a frame that its output samples depend on, i.e. half
+        the receptive field, rounded up."""
+        context = (self.conv_pre.kernel_size[0] - 1) / 2
+        scale = 1  # samples per input frame at the current stage
+        for i, up in enumerate(self.ups):
+            context += math.ceil(up.kernel_size[0] / up.stride[0]) / scale
+            scale *= up.stride[0]
+            # resblocks of a stage run in parallel, the convolutions inside one in sequence
+            resblocks = self.resblocks[i * self.num_kernels:(i + 1) * self.num_kernels]
+            context += max(
+                sum(
+                    (conv.kernel_size[0] - 1) * conv.dilation[0] / 2
+                    for conv in resblock.modules() if isinstance(conv, nn.Conv1d)
+                )
+                for resblock in resblocks
+            ) / scale
+        context += (self.conv_post.kernel_size[0] - 1) / 2 / scale
+        return math.ceil(context)
+
+    def iter_chunks(self, x, g=None, chunk_frames=32, context_frames=None, fade_frames=2):
+        """Decode ``x`` [b, c, t] window by window and yield the audio [b, 1, samples] of each
+        window as soon as it is ready.
+
+        Every window of ``chunk_frames`` frames is decoded with ``context_frames`` extra frames
+        on both sides, by default ``context_frames()``, which makes the windows agree with
+        ``forward`` on the whole sequence up to float error. Consecutive windows are crossfaded
+        over ``fade_frames`` frames. The chunks concatenate to ``t * hop_length()`` samples.
+        """
+        assert chunk_frames > fade_frames
+        if context_frames is None:
+            context_frames = self.context_frames()
+        hop = self.hop_length()
+        length = x.size(2)
+        tail = None
+        for start in range(0, length, chunk_frames):
+            end = min(start + chunk_frames, length)
+            # decode one window plus the next window's fade-in region
+            keep_end = min(end + fade_frames, length)
+            left = max(start - context_frames, 0)
+            right = min(keep_end + context_frames, length)
+            audio = self(x[:, :, left:right], g=g)
+            audio = audio[:, :, (start - left) * hop:(keep_end - left) * hop]
+            if tail is not None:
+                n = tail.size(2)
+                fade_in = torch.linspace(0, 1, n + 2, device=x.device, dtype=x.dtype)[1:-1]
+                head = audio[:, :, :n] * fade_in + tail * (1 - fade_in)
+                audio = torch.cat([head, audio[:, :, n:]], 2)
+            split = (end - start) * hop
+            tail = audio[:, :, split:]
+            yield audio[:, :, :split]
+
     def remove_weight_norm(self):
         print("Removing weight norm...")
         for layer in self.ups:
@@ -979,7 +1055,116 @@ class SynthesizerTrn(nn.Module):
         sdp_ratio=0,
         y=None,
         g=None,
+        return_durations=False,
+        generator=None,
+    ):
+        z, y_mask, w_ceil, g, (attn, z_p, m_p, logs_p) = self.infer_latent(
+            x, x_lengths, sid, tone, language, bert, ja_bert,
+            noise_scale=noise_scale, length_scale=length_scale, noise_scale_w=noise_scale_w,
+            sdp_ratio=sdp_ratio, y=y, g=g, generator=generator, return_attn=not return_durations,
+        )
+        o = self.dec((z * y_mask)[:, :, :max_len], g=g, x_mask=y_mask[:, :, :max_len])
+        # print('max/min of o:', o.max(), o.min())
+        if return_durations:
+            # per-phone frame durations [b, t_x] instead of the dense path
+            return o, w_ceil.squeeze(1), y_mask, (z, z_p, m_p, logs_p)
+        return o, attn, y_mask, (z, z_p, m_p, logs_p)
+
+    def infer_latent(
+        self,
+        x,
+        x_lengths,
+        sid,
+        tone,
+        language,
+        bert,
+        ja_bert,
+        noise_scale=0.667,
+        length_scale=1,
+        noise_scale_w=0.8,
+        sdp_ratio=0,
+        y=None,
+        g=None,
+        generator=None,
+        return_attn=False,
+    ):
+        """``infer`` up to the vocoder input.
+
+        Returns ``(z, y_mask, w_ceil, g, (attn, z_p, m_p, logs_p))``;
+        ``self.dec(z * y_mask, g=g, x_mask=y_mask)`` is the audio, or ``self.dec.iter_chunks``
+        to decode it incrementally. The dense alignment ``attn`` is only built with
+        ``return_attn``.
+        """
+        w_ceil, m_p, logs_p, x_mask, g = self.infer_durations(
+            x, x_lengths, sid, tone, language, bert, ja_bert,
+            length_scale=length_scale, noise_scale_w=noise_scale_w, sdp_ratio=sdp_ratio,
+            y=y, g=g, generator=generator,
+        )
+        return self.sample_latent(
+            w_ceil, m_p, logs_p, x_mask, g,
+            noise_scale=noise_scale, generator=generator, return_attn=return_attn,
+        )
+
+    def sample_latent(self, w_ceil, m_p, logs_p, x_mask, g, noise_scale=0.667, generator=None, return_attn=False):
+        """Second stage of ``infer_latent``: expand the prior by the durations ``w_ceil``, sample
+        it and run the flow. Takes the outputs of ``infer_durations``."""
+        y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
+        y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(
+            x_mask.dtype
+        )
+        attn, m_p, logs_p = self.expand_prior(w_ceil, x_mask, y_mask, m_p, logs_p, return_attn)
+
+        # a list holds one generator per batch item
+        if isinstance(generator, (list, tuple)):
+            eps = commons.randn_per_item(
+                m_p.size(), y_lengths, generator, device=m_p.device, dtype=m_p.dtype
+            )
+        else:
+            eps = torch.randn(
+                m_p.size(), generator=generator, device=m_p.device, dtype=m_p.dtype
+            )
+        z_p = m_p + eps * torch.exp(logs_p) * noise_scale
+        z = self.flow(z_p, y_mask, g=g, reverse=True)
+        return z, y_mask, w_ceil, g, (attn, z_p, m_p, logs_p)
+
+    def infer_durations(
+        self,
+        x,
+        x_lengths,
+        sid,
+        tone,
+        language,
+        bert,
+        ja_bert,
+        length_scale=1,
+        noise_scale_w=0.8,
+        sdp_ratio=0,
+        y=None,
+        g=None,
+        generator=None,
+        sdp_noise=None,
     ):
+        """First stage of ``infer``: text encoder and duration predictors.
+
+        Returns ``(w_ceil, m_p, logs_p, x_mask, g)`` with the integer frame count of every
+        phone in ``w_ceil`` [b, 1, t_x]. ``sdp_noise`` [b, 2, t_x] replaces the noise the
+        stochastic duration predictor would otherwise draw from ``generator``.
+        """
+        x, m_p, logs_p, x_mask, g = self.encode_text(
+            x, x_lengths, sid, tone, language, bert, ja_bert, y=y, g=g
+        )
+        logw = self.log_durations(
+            x, x_mask, g, noise_scale_w=noise_scale_w, sdp_ratio=sdp_ratio,
+            generator=generator, sdp_noise=sdp_noise,
+        )
+        w = torch.exp(logw) * x_mask * length_scale
+        
+        w_ceil = torch.ceil(w)
+        return w_ceil, m_p, logs_p, x_mask, g
+
+    def encode_text(self, x, x_lengths, sid, tone, language, bert, ja_bert, y=None, g=None):
+        """Speaker embedding and text encoder, the part of ``infer`` that no sampling argument
+        affects. Returns ``(x, m_p, logs_p, x_mask, g)``."""
         # x, m_p, logs_p, x_mask = self.enc_p(x, x_lengths, tone, language, bert)
         # g = self.gst(y)
         if g is None:
@@ -994,31 +1179,84 @@ class SynthesizerTrn(nn.Module):
         x, m_p, logs_p, x_mask = self.enc_p(
             x, x_lengths, tone, language, bert, ja_bert, g=g_p
         )
-        logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w) * (
-            sdp_ratio
-        ) + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
-        w = torch.exp(logw) * x_mask * length_scale
-        
-        w_ceil = torch.ceil(w)
-        y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
-        y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(
-            x_mask.dtype
-        )
-        attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
-        attn = commons.generate_path(w_ceil, attn_mask)
-
-        m_p = torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(
-            1, 2
-        )  # [b, t', t], [b, t, d] -> [b, d, t']
-        logs_p = torch.matmul(attn.squeeze(1), logs_p.transpose(1, 2)).transpose(
-            1, 2
-        )  # [b, t', t], [b, t, d] -> [b, d, t']
+        return x, m_p, logs_p, x_mask, g
 
-        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
-        z = self.flow(z_p, y_mask, g=g, reverse=True)
-        o = self.dec((z * y_mask)[:, :, :max_len], g=g)
-        # print('max/min of o:', o.max(), o.min())
-        return o, attn, y_mask, (z, z_p, m_p, logs_p)
+    def log_durations(
+        self,
+        x,
+        x_mask,
+        g,
+        noise_scale_w=0.8,
+        sdp_ratio=0,
+        generator=None,
+        sdp_noise=None,
+        dp_logw=None,
+    ):
+        """Log frame counts [b, 1, t_x] of the phones encoded by ``encode_text``.
+
+        ``dp_logw`` is an earlier output of the deterministic predictor ``self.dp`` for the same
+        ``x``; it does not depend on the sampling arguments and is used instead of running it.
+        """
+        if self.sdp is None:
+            # optimize_for_inference kept only the deterministic predictor; still consume
+            # the noise the stochastic one would draw so seeded outputs are unchanged
+            if isinstance(generator, (list, tuple)):
+                commons.randn_per_item(
+                    (x.size(0), 2, x.size(2)), x_mask.sum([1, 2]), generator, device=x.device
+                )
+            return self.dp(x, x_mask, g=g) if dp_logw is None else dp_logw
+        logw_sdp = self.sdp(
+            x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w, generator=generator,
+            noise=sdp_noise,
+        )
+        if self.dp is None:
+            return logw_sdp
+        if dp_logw is None:
+            dp_logw = self.dp(x, x_mask, g=g)
+        return logw_sdp * (sdp_ratio) + dp_logw * (1 - sdp_ratio)
+
+    def expand_prior(self, w_ceil, x_mask, y_mask, m_p, logs_p, return_attn=False):
+        """Repeat the per-phone prior ``m_p``/``logs_p`` [b, d, t_x] to frame level [b, d, t_y]
+        following the durations ``w_ceil``. Returns ``(attn, m_p, logs_p)``.
+
+        The prior is gathered by frame index; the dense [b, 1, t_y, t_x] path ``attn`` is only
+        built with ``return_attn`` and is None otherwise.
+        """
+        indices, covered = commons.duration_to_indices(w_ceil, y_mask.size(2))
+        frame_mask = covered.unsqueeze(1).to(m_p.dtype) * y_mask
+        indices = indices.unsqueeze(1).expand(-1, m_p.size(1), -1)
+        m_p = torch.gather(m_p, 2, indices) * frame_mask  # [b, d, t']
+        logs_p = torch.gather(logs_p, 2, indices) * frame_mask  # [b, d, t']
+
+        attn = None
+        if return_attn:
+            attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+            attn = commons.generate_path(w_ceil, attn_mask)
+        return attn, m_p, logs_p
+
+    def optimize_for_inference(self, duration_predictor=None):
+        """Strip the model down for ``infer``, in place.
+
+        Weight norm is folded into the convolution weights and the posterior encoder, only
+        used for training and voice conversion, is dropped. With ``duration_predictor`` set
+        to ``"dp"`` or ``"sdp"`` only that duration predictor is kept, which is what
+        ``sdp_ratio`` 0 or 1 would use; ``infer`` then ignores ``sdp_ratio``.
+
+        This can only be applied once, as folded weights and dropped modules are not restored;
+        ``TTS.optimize_for_inference`` keeps track of the options a model was optimized with.
+        """
+        if duration_predictor not in (None, "dp", "sdp"):
+            raise ValueError(f"Unknown duration predictor: {duration_predictor}")
+        for module in self.modules():
+            if isinstance(module, modules.WN):
+                module.remove_weight_norm()
+        self.dec.remove_weight_norm()
+        self.enc_q = None
+        if duration_predictor == "dp":
+            self.sdp = None
+        elif duration_predictor == "sdp":
+            self.dp = None
+        return self
 
     def voice_conversion(self, y, y_lengths, sid_src, sid_tgt, tau=1.0):        
         g_src = sid_src
@@ -8,7 +8,7 @@ from torch.nn.utils import weight_norm, remove_weight_norm
 
 from . import commons
 from .commons import init_weights, get_padding
-from .transforms import piecewise_rational_quadratic_transform
+from .transforms import piecewise_rational_quadratic_transform, unconstrained_rational_quadratic_spline_inverse
 from .attentions import Encoder
 
 LRELU_SLOPE = 0.1
@@ -498,22 +498,30 @@ class ConvFlow(nn.Module):
         )
         unnormalized_derivatives = h[..., 2 * self.num_bins :]
 
+        if reverse:
+            # inference only needs the inverse values, not the log-determinant
+            x1 = unconstrained_rational_quadratic_spline_inverse(
+                x1,
+                unnormalized_widths,
+                unnormalized_heights,
+                unnormalized_derivatives,
+                tail_bound=self.tail_bound,
+            )
+            return torch.cat([x0, x1], 1) * x_mask
+
         x1, logabsdet = piecewise_rational_quadratic_transform(
             x1,
             unnormalized_widths,
             unnormalized_heights,
             unnormalized_derivatives,
-            inverse=reverse,
+            inverse=False,
             tails="linear",
             tail_bound=self.tail_bound,
         )
 
         x = torch.cat([x0, x1], 1) * x_mask
         logdet = torch.sum(logabsdet * x_mask, [1, 2])
-        if not reverse:
-            return x, logdet
-        else:
-            return x
+        return x, logdet
 
 
 class TransformerCouplingLayer(nn.Module):
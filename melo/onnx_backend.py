@@ -0,0 +1,129 @@
+import os
+import numpy as np
+import torch
+
+from . import commons
+from .onnx_export import ENCODER_FILE, FLOW_FILE, DECODER_FILE
+
+
+def _session(path, providers, sess_options=None):
+    import onnxruntime as ort
+    return ort.InferenceSession(path, sess_options=sess_options, providers=providers)
+
+
+def _run(session, feed):
+    """Run ``session`` on the entries of ``feed`` that are graph inputs. The exporter drops
+    inputs a graph does not read, e.g. ``x_mask`` of the flow graph since the prior is
+    expanded by index, so graphs from different exports take different subsets."""
+    names = {i.name for i in session.get_inputs()}
+    return session.run(None, {name: value for name, value in feed.items() if name in names})
+
+
+def _numpy(t):
+    return t.detach().cpu().numpy()
+
+
+def _noise(size, lengths, generator):
+    """The standard normal noise ``SynthesizerTrn.infer`` would draw, so both backends give
+    the same audio for the same seeds."""
+    if isinstance(generator, (list, tuple)):
+        return commons.randn_per_item(size, lengths, generator, dtype=torch.float32)
+    return torch.randn(size, generator=generator, dtype=torch.float32)
+
+
+class OnnxSynthesizer:
+    """Runs the graphs written by ``onnx_export`` with onnxruntime.
+
+    ``infer`` takes and returns the same tensors as ``SynthesizerTrn.infer``, so ``TTS`` uses
+    either interchangeably. Inputs are moved to CPU numpy arrays; noise is drawn with torch
+    generators on CPU.
+    """
+
+    def __init__(self, onnx_dir, providers=None, sess_options=None):
+        providers = providers or ['CPUExecutionProvider']
+        self.encoder = _session(os.path.join(onnx_dir, ENCODER_FILE), providers, sess_options)
+        self.flow = _session(os.path.join(onnx_dir, FLOW_FILE), providers, sess_options)
+        self.decoder = _session(os.path.join(onnx_dir, DECODER_FILE), providers, sess_options)
+
+    def infer_durations(
+        self,
+        x,
+        x_lengths,
+        sid,
+        tone,
+        language,
+        bert,
+        ja_bert,
+        length_scale=1,
+        noise_scale_w=0.8,
+        sdp_ratio=0,
+        generator=None,
+    ):
+        """Run the encoder graph; returns ``(w_ceil, m_p, logs_p, x_mask, g)`` as torch tensors
+        like ``SynthesizerTrn.infer_durations``."""
+        x_lengths = x_lengths.cpu()
+        sdp_noise = _noise((x.size(0), 2, x.size(1)), x_lengths, generator)
+        outputs = _run(self.encoder, {
+            'x': _numpy(x),
+            'x_lengths': _numpy(x_lengths),
+            'sid': _numpy(sid),
+            'tone': _numpy(tone),
+            'language': _numpy(language),
+            'bert': _numpy(bert).astype(np.float32),
+            'ja_bert': _numpy(ja_bert).astype(np.float32),
+            'sdp_noise': _numpy(sdp_noise),
+            'noise_scale_w': np.array(noise_scale_w, dtype=np.float32),
+            'length_scale': np.array(length_scale, dtype=np.float32),
+            'sdp_ratio': np.array(sdp_ratio, dtype=np.float32),
+        })
+        return tuple(torch.from_numpy(output) for output in outputs)
+
+    def infer(
+        self,
+        x,
+        x_lengths,
+        sid,
+        tone,
+        language,
+        bert,
+        ja_bert,
+        noise_scale=0.667,
+        length_scale=1,
+        noise_scale_w=0.8,
+        max_len=None,
+        sdp_ratio=0,
+        return_durations=False,
+        generator=None,
+    ):
+        w_ceil, m_p, logs_p, x_mask, g = self.infer_durations(
+            x, x_lengths, sid, tone, language, bert, ja_bert,
+            length_scale=length_scale, noise_scale_w=noise_scale_w, sdp_ratio=sdp_ratio,
+            generator=generator,
+        )
+        y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
+        y_mask = commons.sequence_mask(y_lengths, None).unsqueeze(1).float()
+        eps = _noise((m_p.size(0), m_p.size(1), y_mask.size(2)), y_lengths, generator)
+        z, = _run(self.flow, {
+            'w_ceil': _numpy(w_ceil),
+            'm_p': _numpy(m_p),
+            'logs_p': _numpy(logs_p),
+            'x_mask': _numpy(x_mask),
+            'y_mask': _numpy(y_mask),
+            'g': _numpy(g),
+            'eps': _numpy(eps),
+            'noise_scale': np.array(noise_scale, dtype=np.float32),
+        })
+        audio, = _run(self.decoder, {
+            'z': z[:, :, :max_len],
+            'y_mask': _numpy(y_mask[:, :, :max_len]),
+            'g': _numpy(g),
+        })
+
+        o = torch.from_numpy(audio)
+        if return_durations:
+            return o, w_ceil.squeeze(1), y_mask, None
+        # the dense path is only built when asked for
+        attn = commons.generate_path(
+            w_ceil, torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+        )
+        return o, attn, y_mask, None
@@ -0,0 +1,168 @@
+import os
+import shutil
+import click
+import torch
+import torch.nn as nn
+
+from . import commons
+from .api import TTS
+
+# File names of the three graphs inside an export directory, in pipeline order
+ENCODER_FILE = 'encoder.onnx'
+FLOW_FILE = 'flow.onnx'
+DECODER_FILE = 'decoder.onnx'
+OPSET = 17
+
+
+class EncoderGraph(nn.Module):
+    """Text encoder and duration predictors (``SynthesizerTrn.infer_durations``).
+
+    The stochastic duration predictor's noise is an input so the graph holds no random ops,
+    and the sampling scalars are 0-d tensors so they stay inputs rather than constants.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x, x_lengths, sid, tone, language, bert, ja_bert, sdp_noise, noise_scale_w, length_scale, sdp_ratio):
+        w_ceil, m_p, logs_p, x_mask, g = self.model.infer_durations(
+            x, x_lengths, sid, tone, language, bert, ja_bert,
+            length_scale=length_scale, noise_scale_w=noise_scale_w, sdp_ratio=sdp_ratio,
+            sdp_noise=sdp_noise,
+        )
+        return w_ceil, m_p, logs_p, x_mask, g
+
+
+class FlowGraph(nn.Module):
+    """Path expansion of the prior to frame level and the reverse flow.
+
+    ``y_mask`` is computed by the caller from ``w_ceil`` so the output length is an input
+    dimension instead of a data-dependent shape; ``eps`` is the standard normal prior noise.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, w_ceil, m_p, logs_p, x_mask, y_mask, g, eps, noise_scale):
+        _, m_p, logs_p = self.model.expand_prior(w_ceil, x_mask, y_mask, m_p, logs_p)
+        z_p = m_p + eps * torch.exp(logs_p) * noise_scale
+        z = self.model.flow(z_p, y_mask, g=g, reverse=True)
+        return z * y_mask
+
+
+class DecoderGraph(nn.Module):
+    """The ``Generator`` vocoder, masked to each item's frames."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, z, y_mask, g):
+        return self.model.dec(z, g=g, x_mask=y_mask)
+
+
+def sample_inputs(model, n_phones=48, n_frames=192):
+    """Dummy inputs for tracing. Lengths must exceed the attention window so the relative
+    position padding is traced as a function of the length rather than as a constant."""
+    bert_channels = model.enc_p.bert_proj.in_channels
+    ja_bert_channels = model.enc_p.ja_bert_proj.in_channels
+    x = torch.randint(1, model.n_vocab, (1, n_phones))
+    x_lengths = torch.LongTensor([n_phones])
+    encoder = (
+        x, x_lengths, torch.LongTensor([0]), torch.zeros_like(x), torch.zeros_like(x),
+        torch.randn(1, bert_channels, n_phones), torch.randn(1, ja_bert_channels, n_phones),
+        torch.randn(1, 2, n_phones),
+        torch.tensor(0.8), torch.tensor(1.0), torch.tensor(0.2),
+    )
+    with torch.no_grad():
+        _, m_p, logs_p, x_mask, g = EncoderGraph(model)(*encoder)
+    # spread the frames evenly over the phones
+    w_ceil = torch.full((1, 1, n_phones), float(n_frames // n_phones))
+    y_lengths = w_ceil.sum([1, 2]).long()
+    y_mask = commons.sequence_mask(y_lengths, None).unsqueeze(1).float()
+    eps = torch.randn(1, m_p.size(1), y_mask.size(2))
+    flow = (w_ceil, m_p, logs_p, x_mask, y_mask, g, eps, torch.tensor(0.6))
+    decoder = (torch.randn(1, m_p.size(1), y_mask.size(2)), y_mask, g)
+    return encoder, flow, decoder
+
+
+def export_onnx(model, output_dir, opset=OPSET):
+    """Export ``model`` (an eval-mode ``SynthesizerTrn``) as ``ENCODER_FILE``, ``FLOW_FILE`` and
+    ``DECODER_FILE`` under ``output_dir``, with dynamic batch and length axes."""
+    os.makedirs(output_dir, exist_ok=True)
+    encoder_inputs, flow_inputs, decoder_inputs = sample_inputs(model)
+    phones = {0: 'batch', 1: 'phones'}
+    features = {0: 'batch', 2: 'phones'}
+    frames = {0: 'batch', 2: 'frames'}
+    graphs = [
+        (
+            EncoderGraph(model), encoder_inputs, ENCODER_FILE,
+            ['x', 'x_lengths', 'sid', 'tone', 'language', 'bert', 'ja_bert', 'sdp_noise',
+             'noise_scale_w', 'length_scale', 'sdp_ratio'],
+            ['w_ceil', 'm_p', 'logs_p', 'x_mask', 'g'],
+            {
+                'x': phones, 'x_lengths': {0: 'batch'}, 'sid': {0: 'batch'}, 'tone': phones,
+                'language': phones, 'bert': features, 'ja_bert': features, 'sdp_noise': features,
+                'w_ceil': features, 'm_p': features, 'logs_p': features, 'x_mask': features,
+                'g': {0: 'batch'},
+            },
+        ),
+        (
+            FlowGraph(model), flow_inputs, FLOW_FILE,
+            ['w_ceil', 'm_p', 'logs_p', 'x_mask', 'y_mask', 'g', 'eps', 'noise_scale'],
+            ['z'],
+            {
+                'w_ceil': features, 'm_p': features, 'logs_p': features, 'x_mask': features,
+                'y_mask': frames, 'g': {0: 'batch'}, 'eps': frames, 'z': frames,
+            },
+        ),
+        (
+            DecoderGraph(model), decoder_inputs, DECODER_FILE,
+            ['z', 'y_mask', 'g'],
+            ['audio'],
+            {'z': frames, 'y_mask': frames, 'g': {0: 'batch'}, 'audio': {0: 'batch', 2: 'samples'}},
+        ),
+    ]
+    paths = []
+    with torch.no_grad():
+        for graph, inputs, filename, input_names, output_names, dynamic_axes in graphs:
+            path = os.path.join(output_dir, filename)
+            torch.onnx.export(
+                graph.eval(), inputs, path,
+                input_names=input_names, output_names=output_names,
+                dynamic_axes=dynamic_axes, opset_version=opset, dynamo=False,
+            )
+            paths.append(path)
+    return paths
+
+
+@click.command()
+@click.option('--language', '-l', type=str, default='EN', help="Language of the model")
+@click.option('--ckpt_path', '-m', type=str, default=None, help="Checkpoint to export instead of the released one")
+@click.option('--output_dir', '-o', type=str, required=True, help="Directory for the .onnx graphs and config.json")
+@click.option('--opset', type=int, default=OPSET, help="ONNX opset version")
+def main(language, ckpt_path, output_dir, opset):
+    """Export a TTS model for ``TTS(backend="onnxruntime", onnx_dir=output_dir)``."""
+    config_path = None
+    if ckpt_path is not None:
+        config_path = os.path.join(os.path.dirname(ckpt_path), 'config.json')
+    model = TTS(language=language, device='cpu', config_path=config_path, ckpt_path=ckpt_path)
+    # an inference checkpoint is already optimized, possibly with a single duration predictor
+    if model.inference_options is None:
+        model.optimize_for_inference()
+    for path in export_onnx(model.model, output_dir, opset):
+        print(f" > Exported {path}")
+
+    # the ORT backend still needs the hyper-parameters and symbol table
+    if config_path is None:
+        from .download_utils import LANG_TO_HF_REPO_ID
+        from huggingface_hub import hf_hub_download
+        config_path = hf_hub_download(repo_id=LANG_TO_HF_REPO_ID[language.upper()], filename="config.json")
+    shutil.copy(config_path, os.path.join(output_dir, 'config.json'))
+    model.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import torch
+from torch import nn
+
+# Parts of SynthesizerTrn that tolerate int8 weights; the vocoder stays in float
+QUANTIZED_SUBMODULES = ('enc_p', 'sdp', 'dp', 'flow')
+# Projections producing distribution parameters (means, log-scales, spline knots) stay in float
+FLOAT_LAYERS = ('proj', 'post')
+
+
+class PointwiseLinear(nn.Module):
+    """A kernel-size-1 ``nn.Conv1d`` computed as an ``nn.Linear`` over channels.
+
+    Eager-mode dynamic quantization only handles ``nn.Linear``, and most of the synthesizer's
+    projections are pointwise convolutions.
+    """
+
+    def __init__(self, conv):
+        super().__init__()
+        self.linear = nn.Linear(conv.in_channels, conv.out_channels, bias=conv.bias is not None)
+        with torch.no_grad():
+            self.linear.weight.copy_(conv.weight.squeeze(-1))
+            if conv.bias is not None:
+                self.linear.bias.copy_(conv.bias)
+
+    def forward(self, x):
+        return self.linear(x.transpose(1, 2)).transpose(1, 2)
+
+
+def _is_pointwise(module):
+    return (
+        type(module) is nn.Conv1d
+        and module.kernel_size == (1,)
+        and module.stride == (1,)
+        and module.padding == (0,)
+        and module.groups == 1
+        # weight-normed layers are left alone
+        and 'weight' in module._parameters
+    )
+
+
+def pointwise_convs_to_linear(module):
+    """Replace pointwise convolutions under ``module`` by ``PointwiseLinear``, except ``FLOAT_LAYERS``."""
+    for name, child in module.named_children():
+        if _is_pointwise(child) and name not in FLOAT_LAYERS:
+            setattr(module, name, PointwiseLinear(child))
+        else:
+            pointwise_convs_to_linear(child)
+    return module
+
+
+def quantize_dynamic_int8(module):
+    """Dynamically quantize the ``nn.Linear`` layers of ``module`` to int8 in place (CPU only)."""
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def quantize_synthesizer(model):
+    """Apply int8 dynamic quantization to the ``QUANTIZED_SUBMODULES`` of a ``SynthesizerTrn``."""
+    for name in QUANTIZED_SUBMODULES:
+        submodule = getattr(model, name, None)
+        if submodule is not None:
+            quantize_dynamic_int8(pointwise_convs_to_linear(submodule))
+    return model
@@ -6,6 +6,12 @@ import soundfile as sf
 import torchaudio
 import re
 
+_WHITESPACE = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'([,.?!])')
+_SPLIT_EVENTS = re.compile(r'[!?.,\n"]')
+_EMPTY_CHUNK = re.compile(r'^[\s\.,;:!?]*$')
+
+
 def split_sentence(text, min_len=10, language_str='EN'):
     if language_str in ['EN', 'FR', 'ES', 'SP']:
         sentences = split_sentences_latin(text, min_len=min_len)
@@ -102,64 +108,235 @@ def merge_short_sentences_zh(sens):
 
 
 
-def txtsplit(text, desired_length=100, max_length=200):
-    """Split text it into chunks of a desired length trying to keep sentences intact."""
-    text = re.sub(r'\n\n+', '\n', text)
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[""]', '"', text)
-    text = re.sub(r'([,.?!])', r'\1 ', text)
-    text = re.sub(r'\s+', ' ', text)
-    
-    rv = []
-    in_quote = False
-    current = ""
-    split_pos = []
-    pos = -1
+# Phones per letter of the language's own script, before blank interspersing
+_LETTER_PHONES = {'EN': 0.8, 'FR': 0.8, 'ES': 0.95, 'SP': 0.95, 'KR': 2.5, 'JP': 1.7}
+_HAN = re.compile('[\u3400-\u4dbf\u4e00-\u9fff]')
+_KANA = re.compile('[\u3040-\u30ff]')
+_HANGUL = re.compile('[\uac00-\ud7a3]')
+_LETTER = re.compile(r'[^\W\d_]')
+_DIGIT = re.compile(r'\d')
+_SYMBOL = re.compile(r'[^\w\s]')
+# Where a chunk may end, from the most to the least preferred; beyond the last level a chunk
+# is cut between characters
+_PHONE_SPLIT_LEVELS = [
+    re.compile(r'(?<=[.!?;。！？；…])(?![.!?;。！？；…])'),
+    re.compile(r'(?<=[,:，、：])(?![,:，、：])'),
+    re.compile(r'(?<=\s)'),
+]
+
+
+def _estimate_phones(text, language_str):
+    han = len(_HAN.findall(text))
+    kana = len(_KANA.findall(text))
+    hangul = len(_HANGUL.findall(text))
+    letters = len(_LETTER.findall(text)) - han - kana - hangul
+    # spelled-out numbers take several phones per digit
+    estimate = (
+        letters * _LETTER_PHONES.get(language_str, 0.8)
+        + han * (3.5 if language_str == 'JP' else 2)
+        + kana * 1.7
+        + hangul * 2.5
+        + len(_DIGIT.findall(text)) * 3
+        + len(_SYMBOL.findall(text))
+    )
+    return estimate
+
+
+def estimate_phones(text, language_str='EN'):
+    """Rough number of phones the frontend of ``language_str`` produces for ``text``, before
+    blank interspersing, from character counts alone."""
+    return int(_estimate_phones(text, language_str) + 2.5)
+
+
+def _split_by_phones(text, language_str, max_phones, level=0):
+    """Greedily pack the pieces of ``text`` between boundaries of ``level`` into chunks of at
+    most ``max_phones`` estimated phones, splitting longer pieces at the next level."""
+    if level < len(_PHONE_SPLIT_LEVELS):
+        pieces = [piece for piece in _PHONE_SPLIT_LEVELS[level].split(text) if piece]
+    else:
+        pieces = list(text)
+    chunks = []
+    current, current_phones = '', 0
+    for piece in pieces:
+        phones = _estimate_phones(piece, language_str)
+        if current_phones + phones + 2 <= max_phones:
+            current += piece
+            current_phones += phones
+            continue
+        if current.strip():
+            chunks.append(current)
+        current, current_phones = piece, phones
+        if phones + 2 > max_phones and level < len(_PHONE_SPLIT_LEVELS):
+            parts = _split_by_phones(piece, language_str, max_phones, level + 1)
+            chunks.extend(parts[:-1])
+            # the remainder can share a chunk with what follows
+            current = parts[-1] if parts else ''
+            current_phones = _estimate_phones(current, language_str)
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def split_sentence_by_phones(text, language_str='EN', max_phones=128, bucket_width=16):
+    """Split text into chunks of about ``max_phones`` phones for batched synthesis.
+
+    Unlike ``split_sentence``, chunks are sized by ``estimate_phones`` rather than characters:
+    consecutive sentences are packed together up to the budget, and longer sentences are split
+    at clause punctuation, then between words. Returns the chunks grouped into buckets of
+    ``bucket_width`` estimated phones, shortest bucket first; each bucket is a list of
+    ``(index, chunk)`` with ``index`` the chunk's position in the text.
+    """
+    if language_str in ['EN', 'FR', 'ES', 'SP']:
+        text = re.sub('[。！？；]', '.', text)
+        text = re.sub('[，]', ',', text)
+        text = re.sub('[“”]', '"', text)
+        text = re.sub('[‘’]', "'", text)
+        text = re.sub(r"[\<\>\(\)\[\]\"\«\»]+", "", text)
+    text = _WHITESPACE.sub(' ', text)
+    chunks = [chunk.strip() for chunk in _split_by_phones(text, language_str, max_phones)]
+    chunks = [chunk for chunk in chunks if not _EMPTY_CHUNK.match(chunk)]
+
+    buckets = {}
+    for index, chunk in enumerate(chunks):
+        buckets.setdefault(estimate_phones(chunk, language_str) // bucket_width, []).append((index, chunk))
+    return [buckets[key] for key in sorted(buckets)]
+
+
+class _NeedMoreText(Exception):
+    pass
+
+
+def _normalize_for_split(text):
+    """Collapse whitespace and put a space after ``,.?!``, as ``txtsplit`` sees its input."""
+    return _WHITESPACE.sub(' ', _PUNCTUATION.sub(r'\1 ', text))
+
+
+def _split_normalized(text, desired_length, max_length, in_quote=False, final=True):
+    """Split normalized ``text`` into raw chunks in one pass over character indices.
+
+    Returns ``(chunks, rest, in_quote)``. With ``final`` the whole text is split and ``rest`` is
+    its length. Otherwise ``text`` is the start of a longer stream: scanning stops before the
+    first decision that depends on what follows, and ``rest`` and ``in_quote`` give where the
+    unsplit text starts and the quote state there.
+    """
     end_pos = len(text) - 1
-    def seek(delta):
-        nonlocal pos, in_quote, current
-        is_neg = delta < 0
-        for _ in range(abs(delta)):
-            if is_neg:
-                pos -= 1
-                current = current[:-1]
-            else:
-                pos += 1
-                current += text[pos]
-            if text[pos] == '"':
+    chunks = []
+    start = 0  # first index of the current chunk
+    pos = -1  # last index consumed into it
+    split_pos = []
+    rest_quote = in_quote
+
+    def peek(p):
+        if p < end_pos:
+            return text[p]
+        if final:
+            return ""
+        raise _NeedMoreText
+
+    try:
+        while pos < end_pos or not final:
+            # jump over characters that cannot end a chunk or change the quote state
+            limit = min(max(start + max_length - 1, pos + 1), end_pos + 1)
+            event = _SPLIT_EVENTS.search(text, pos + 1, limit + 1)
+            target = limit
+            if event is not None:
+                target = event.start()
+                if text[target] == '"' and target - 1 > pos:
+                    # a closing quote is handled from the character before it
+                    target -= 1
+            if target >= end_pos:
+                if not final:
+                    raise _NeedMoreText
+                target = end_pos
+
+            pos = target
+            c = text[pos]
+            if c == '"':
                 in_quote = not in_quote
-        return text[pos]
-    def peek(delta):
-        p = pos + delta
-        return text[p] if p < end_pos and p >= 0 else ""
-    def commit():
-        nonlocal rv, current, split_pos
-        rv.append(current)
-        current = ""
-        split_pos = []
-    while pos < end_pos:
-        c = seek(1)
-        if len(current) >= max_length:
-            if len(split_pos) > 0 and len(current) > (desired_length / 2):
-                d = pos - split_pos[-1]
-                seek(-d)
-            else:
-                while c not in '!?.\n ' and pos > 0 and len(current) > desired_length:
-                    c = seek(-1)
-            commit()
-        elif not in_quote and (c in '!?\n' or (c in '.,' and peek(1) in '\n ')):
-            while pos < len(text) - 1 and len(current) < max_length and peek(1) in '!?.':
-                c = seek(1)
-            split_pos.append(pos)
-            if len(current) >= desired_length:
-                commit()
-        elif in_quote and peek(1) == '"' and peek(2) in '\n ':
-            seek(2)
-            split_pos.append(pos)
-    rv.append(current)
-    rv = [s.strip() for s in rv]
-    rv = [s for s in rv if len(s) > 0 and not re.match(r'^[\s\.,;:!?]*$', s)]
-    return rv
+
+            if pos + 1 - start >= max_length:
+                if len(split_pos) > 0 and pos + 1 - start > (desired_length / 2):
+                    # back to the last sentence end; the quote state follows every step back
+                    for pos in range(pos - 1, split_pos[-1] - 1, -1):
+                        if text[pos] == '"':
+                            in_quote = not in_quote
+                    pos = split_pos[-1]
+                else:
+                    while c not in '!?.\n ' and pos > 0 and pos + 1 - start > desired_length:
+                        pos -= 1
+                        c = text[pos]
+                        if c == '"':
+                            in_quote = not in_quote
+                chunks.append(text[start:pos + 1])
+                start, split_pos, rest_quote = pos + 1, [], in_quote
+            elif not in_quote and (c in '!?\n' or (c in '.,' and peek(pos + 1) in '\n ')):
+                while pos < end_pos and pos + 1 - start < max_length and peek(pos + 1) in '!?.':
+                    pos += 1
+                    if text[pos] == '"':
+                        in_quote = not in_quote
+                split_pos.append(pos)
+                if pos + 1 - start >= desired_length:
+                    chunks.append(text[start:pos + 1])
+                    start, split_pos, rest_quote = pos + 1, [], in_quote
+            elif in_quote and peek(pos + 1) == '"' and peek(pos + 2) in '\n ':
+                for pos in (pos + 1, pos + 2):
+                    if text[pos] == '"':
+                        in_quote = not in_quote
+                split_pos.append(pos)
+    except _NeedMoreText:
+        return chunks, start, rest_quote
+    chunks.append(text[start:])
+    return chunks, len(text), in_quote
+
+
+def iter_txtsplit(text, desired_length=100, max_length=200):
+    """Split text into chunks of a desired length trying to keep sentences intact.
+
+    ``text`` is a string or an iterable of strings (e.g. the lines of a file), which is split as
+    a stream: chunks are yielded as soon as they are complete and only the unsplit tail is kept.
+    Runs in time linear in the length of the text.
+    """
+    if isinstance(text, str):
+        text = (text,)
+    buffer = ''
+    pending = []
+    pending_length = 0
+    in_quote = False
+    ends_with_space = False
+
+    def split(final):
+        nonlocal buffer, pending, pending_length, in_quote
+        buffer = buffer + ''.join(pending)
+        pending, pending_length = [], 0
+        chunks, rest, in_quote = _split_normalized(buffer, desired_length, max_length, in_quote, final)
+        buffer = buffer[rest:]
+        for chunk in chunks:
+            chunk = chunk.strip()
+            if len(chunk) > 0 and not _EMPTY_CHUNK.match(chunk):
+                yield chunk
+
+    for piece in text:
+        piece = _normalize_for_split(piece)
+        if not piece:
+            continue
+        # whitespace runs may span pieces
+        if ends_with_space and piece[0] == ' ':
+            piece = piece[1:]
+            if not piece:
+                continue
+        ends_with_space = piece[-1] == ' '
+        pending.append(piece)
+        pending_length += len(piece)
+        # rescanning the unsplit tail is bounded by max_length, so only do it once that much
+        # new text has arrived
+        if pending_length >= max_length:
+            yield from split(final=False)
+    yield from split(final=True)
+
+
+def txtsplit(text, desired_length=100, max_length=200):
+    """Split text it into chunks of a desired length trying to keep sentences intact."""
+    return list(iter_txtsplit(text, desired_length, max_length))
 
 
 if __name__ == '__main__':
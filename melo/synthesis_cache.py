@@ -0,0 +1,189 @@
+import os
+import json
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def file_fingerprint(paths):
+    """Identify the contents of the files ``paths`` by path, size and modification time,
+    without reading them."""
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append([os.path.realpath(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+class SynthesisCache:
+    """Content-addressed cache of synthesized ``(audio, word_timings)`` results.
+
+    Entries live in an in-memory LRU bounded by the total size of the cached audio
+    (``max_bytes``). When ``cache_dir`` is given, every entry is also written there as raw
+    float32 PCM plus a JSON sidecar, and memory misses are served from those files through
+    ``np.memmap`` so several worker processes can share them.
+
+    With ``max_disk_bytes`` the directory is kept to about that size: once the files this
+    process knows of exceed it, the directory is rescanned and the least recently used entries
+    are deleted. Writes and disk hits refresh an entry's modification time, which is what
+    orders entries across processes.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, cache_dir=None, max_disk_bytes=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            if max_disk_bytes is not None:
+                self._disk_bytes = sum(size for _, size, _ in self._scan())
+
+    @staticmethod
+    def make_key(language, speaker_id, text, speed, sdp_ratio, noise_scale, noise_scale_w, seed, **options):
+        """Hash everything that determines the synthesized audio into a cache key."""
+        params = {
+            'language': language,
+            'speaker_id': int(speaker_id),
+            'text': ' '.join(text.split()),
+            'speed': float(speed),
+            'sdp_ratio': float(sdp_ratio),
+            'noise_scale': float(noise_scale),
+            'noise_scale_w': float(noise_scale_w),
+            'seed': int(seed),
+            **options,
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, key + '.pcm'), os.path.join(self.cache_dir, key + '.json')
+
+    def _insert(self, key, audio, timings):
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[0].nbytes
+        if audio.nbytes > self.max_bytes:
+            return
+        self._entries[key] = (audio, timings)
+        self._bytes += audio.nbytes
+        while self._bytes > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _load(self, key):
+        pcm_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                timings = json.load(f)['word_timings']
+            if os.path.getsize(pcm_path) == 0:
+                audio = np.zeros(0, dtype=np.float32)
+            else:
+                audio = np.memmap(pcm_path, dtype=np.float32, mode='r')
+            # mark as recently used for the disk budget
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            # not written yet, or deleted by another process's eviction
+            return None
+        return audio, timings
+
+    def _scan(self):
+        """``(key, bytes, last_used)`` of every entry in ``cache_dir``."""
+        entries = {}
+        with os.scandir(self.cache_dir) as it:
+            for f in it:
+                key, ext = os.path.splitext(f.name)
+                if ext not in ('.pcm', '.json'):
+                    continue
+                try:
+                    stat = f.stat()
+                except FileNotFoundError:
+                    continue
+                size, last_used = entries.get(key, (0, 0))
+                entries[key] = (size + stat.st_size, max(last_used, stat.st_mtime_ns))
+        return [(key, size, last_used) for key, (size, last_used) in entries.items()]
+
+    def _prune_disk(self):
+        """Delete the least recently used files until ``cache_dir`` fits ``max_disk_bytes``."""
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_disk_bytes:
+                break
+            # the sidecar first, so readers never find metadata without audio
+            for path in reversed(self._paths(key)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            self.disk_evictions += 1
+        self._disk_bytes = total
+
+    def get(self, key):
+        """Return a copy of the cached ``(audio, word_timings)`` for ``key``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            elif self.cache_dir is not None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._insert(key, *entry)
+                    self.disk_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+        audio, timings = entry
+        return np.array(audio, dtype=np.float32), copy.deepcopy(timings)
+
+    def put(self, key, audio, timings):
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        timings = copy.deepcopy(timings)
+        with self._lock:
+            self._insert(key, audio, timings)
+        if self.cache_dir is not None:
+            pcm_path, meta_path = self._paths(key)
+            # Write then rename so concurrent readers never see a partial file; the suffix is
+            # unique per thread so concurrent writers of one key never share a temp file
+            tmp_suffix = '.%d.%d.tmp' % (os.getpid(), threading.get_ident())
+            audio.tofile(pcm_path + tmp_suffix)
+            with open(meta_path + tmp_suffix, 'w') as f:
+                json.dump({'word_timings': timings}, f)
+            os.replace(pcm_path + tmp_suffix, pcm_path)
+            os.replace(meta_path + tmp_suffix, meta_path)
+            if self.max_disk_bytes is not None:
+                with self._lock:
+                    self._disk_bytes += audio.nbytes + os.path.getsize(meta_path)
+                    if self._disk_bytes > self.max_disk_bytes:
+                        self._prune_disk()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_bytes': self._disk_bytes,
+                'disk_evictions': self.disk_evictions,
+            }
@@ -20,16 +20,35 @@ def cleaned_text_to_sequence(cleaned_text, tones, language, symbol_to_id=None):
     return phones, tones, lang_ids
 
 
+# BERT model used for each language, and whether its tokens must line up one to one with word2ph
+bert_models = {
+    "ZH": ("hfl/chinese-roberta-wwm-ext-large", False),
+    "ZH_MIX_EN": ("bert-base-multilingual-uncased", False),
+    "EN": ("bert-base-uncased", True),
+    "JP": ("tohoku-nlp/bert-base-japanese-v3", True),
+    "FR": ("dbmdz/bert-base-french-europeana-cased", True),
+    "SP": ("dccuchile/bert-base-spanish-wwm-uncased", True),
+    "ES": ("dccuchile/bert-base-spanish-wwm-uncased", True),
+    "KR": ("kykim/bert-kor-base", True),
+}
+
+
+def get_bert_extractor(language, device=None, acquire=False, quantize=None):
+    """The pooled ``BertFeatureExtractor`` of ``language``; with ``acquire`` the caller takes a
+    reference and must ``release()`` it."""
+    from .bert_utils import BertFeatureExtractor
+
+    model_id, check_lengths = bert_models[language]
+    if acquire:
+        return BertFeatureExtractor.acquire(model_id, device, check_lengths, quantize)
+    return BertFeatureExtractor.get(model_id, device, check_lengths, quantize)
+
+
 def get_bert(norm_text, word2ph, language, device):
-    from .chinese_bert import get_bert_feature as zh_bert
-    from .english_bert import get_bert_feature as en_bert
-    from .japanese_bert import get_bert_feature as jp_bert
-    from .chinese_mix import get_bert_feature as zh_mix_en_bert
-    from .spanish_bert import get_bert_feature as sp_bert
-    from .french_bert import get_bert_feature as fr_bert
-    from .korean import get_bert_feature as kr_bert
-
-    lang_bert_func_map = {"ZH": zh_bert, "EN": en_bert, "JP": jp_bert, 'ZH_MIX_EN': zh_mix_en_bert, 
-                          'FR': fr_bert, 'SP': sp_bert, 'ES': sp_bert, "KR": kr_bert}
-    bert = lang_bert_func_map[language](norm_text, word2ph, device)
+    bert = get_bert_extractor(language, device).get_feature(norm_text, word2ph)
     return bert
+
+
+def get_bert_batch(norm_texts, word2phs, language, device):
+    """``get_bert`` for several sentences, sharing one padded BERT forward pass."""
+    return get_bert_extractor(language, device).get_features(norm_texts, word2phs)
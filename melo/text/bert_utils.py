@@ -0,0 +1,134 @@
+import sys
+import threading
+
+import torch
+from transformers import AutoConfig, AutoModel, AutoTokenizer
+
+# TTS models were trained on hidden_states[-3] of the masked-LM, i.e. the output of the third to last layer
+FEATURE_LAYER = -3
+
+
+def load_bert_encoder(model_id, device, hidden_layer=FEATURE_LAYER, quantize=None):
+    """Load the base encoder of ``model_id`` truncated so that its last hidden state is
+    ``hidden_states[hidden_layer]`` of the full model.
+
+    The layers above it, the pooler and the masked-LM head are never instantiated. With
+    ``quantize="int8"`` its Linear layers are dynamically quantized (CPU only).
+    """
+    config = AutoConfig.from_pretrained(model_id)
+    config.num_hidden_layers = config.num_hidden_layers + 1 + hidden_layer
+    model = AutoModel.from_pretrained(model_id, config=config, add_pooling_layer=False)
+    model = model.to(device).eval()
+    if quantize == "int8":
+        from ..quantization import quantize_dynamic_int8
+        quantize_dynamic_int8(model)
+    elif quantize is not None:
+        raise ValueError(f"Unsupported quantization: {quantize}")
+    return model
+
+
+def phone_level_features(model, tokenizer, texts, word2phs, device, check_lengths=True):
+    """Run the ``load_bert_encoder`` model once over the padded batch of ``texts`` and expand
+    every sentence's token features to phone level with its ``word2ph``.
+
+    Returns one ``[hidden, n_phones]`` tensor per sentence.
+    """
+    with torch.no_grad():
+        inputs = tokenizer(texts, return_tensors="pt", padding=True)
+        for i in inputs:
+            inputs[i] = inputs[i].to(device)
+        hidden = model(**inputs).last_hidden_state.cpu()
+
+    lengths = inputs["attention_mask"].sum(1).tolist()
+    features = []
+    for i, word2ph in enumerate(word2phs):
+        if check_lengths:
+            assert lengths[i] == len(word2ph), f"{lengths[i]}/{len(word2ph)}"
+        repeats = torch.tensor(word2ph)
+        features.append(hidden[i, :lengths[i]][:len(word2ph)].repeat_interleave(repeats, dim=0).T)
+    return features
+
+
+def resolve_device(device):
+    """Device placement shared by every extractor: CPU requests use MPS when available on macOS,
+    and no device means CUDA when available."""
+    if (
+        sys.platform == "darwin"
+        and torch.backends.mps.is_available()
+        and device == "cpu"
+    ):
+        return "mps"
+    if not device:
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    return device
+
+
+class BertFeatureExtractor:
+    """Phone-level BERT features from a truncated encoder shared process-wide.
+
+    Extractors are pooled per ``(model_id, device, quantize)``. ``acquire`` returns the pooled extractor and
+    takes a reference; ``release`` drops it, and the encoder is unloaded when the last reference
+    goes. ``get`` returns the pooled extractor without taking a reference. The encoder and
+    tokenizer are loaded on first use and can be dropped at any time with ``unload``.
+    """
+
+    _pool = {}
+    _pool_lock = threading.Lock()
+
+    def __init__(self, model_id, device, check_lengths=True, quantize=None):
+        self.model_id = model_id
+        self.device = device
+        self.check_lengths = check_lengths
+        self.quantize = quantize
+        self.model = None
+        self.tokenizer = None
+        self.refcount = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, model_id, device=None, check_lengths=True, quantize=None):
+        key = (model_id, resolve_device(device), quantize)
+        with cls._pool_lock:
+            extractor = cls._pool.get(key)
+            if extractor is None:
+                extractor = cls._pool[key] = cls(model_id, key[1], check_lengths, quantize)
+            return extractor
+
+    @classmethod
+    def acquire(cls, model_id, device=None, check_lengths=True, quantize=None):
+        extractor = cls.get(model_id, device, check_lengths, quantize)
+        with cls._pool_lock:
+            extractor.refcount += 1
+        return extractor
+
+    def release(self):
+        with self._pool_lock:
+            self.refcount -= 1
+            if self.refcount > 0:
+                return
+            key = (self.model_id, self.device, self.quantize)
+            if self._pool.get(key) is self:
+                del self._pool[key]
+        self.unload()
+
+    def load(self):
+        with self._lock:
+            if self.model is None:
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+                self.model = load_bert_encoder(self.model_id, self.device, quantize=self.quantize)
+            return self.model, self.tokenizer
+
+    def unload(self):
+        with self._lock:
+            self.model = None
+            self.tokenizer = None
+        if str(self.device).startswith("cuda"):
+            torch.cuda.empty_cache()
+
+    def get_features(self, texts, word2phs):
+        """Phone-level features for several sentences from one padded forward pass."""
+        model, tokenizer = self.load()
+        return phone_level_features(model, tokenizer, texts, word2phs, self.device, self.check_lengths)
+
+    def get_feature(self, text, word2ph):
+        return self.get_features([text], [word2ph])[0]
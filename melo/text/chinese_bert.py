@@ -1,49 +1,18 @@
-import torch
-import sys
-from transformers import AutoTokenizer, AutoModelForMaskedLM
+from .bert_utils import BertFeatureExtractor
 
 
 # model_id = 'hfl/chinese-roberta-wwm-ext-large'
 local_path = "./bert/chinese-roberta-wwm-ext-large"
 
 
-tokenizers = {}
-models = {}
-
+# word2ph follows characters, which does not always line up with the tokenizer
 def get_bert_feature(text, word2ph, device=None, model_id='hfl/chinese-roberta-wwm-ext-large'):
-    if model_id not in models:
-        models[model_id] = AutoModelForMaskedLM.from_pretrained(
-            model_id
-        ).to(device)
-        tokenizers[model_id] = AutoTokenizer.from_pretrained(model_id)
-    model = models[model_id]
-    tokenizer = tokenizers[model_id]
-
-    if (
-        sys.platform == "darwin"
-        and torch.backends.mps.is_available()
-        and device == "cpu"
-    ):
-        device = "mps"
-    if not device:
-        device = "cuda"
+    return BertFeatureExtractor.get(model_id, device, check_lengths=False).get_feature(text, word2ph)
 
-    with torch.no_grad():
-        inputs = tokenizer(text, return_tensors="pt")
-        for i in inputs:
-            inputs[i] = inputs[i].to(device)
-        res = model(**inputs, output_hidden_states=True)
-        res = torch.cat(res["hidden_states"][-3:-2], -1)[0].cpu()
-    # import pdb; pdb.set_trace()
-    # assert len(word2ph) == len(text) + 2
-    word2phone = word2ph
-    phone_level_feature = []
-    for i in range(len(word2phone)):
-        repeat_feature = res[i].repeat(word2phone[i], 1)
-        phone_level_feature.append(repeat_feature)
 
-    phone_level_feature = torch.cat(phone_level_feature, dim=0)
-    return phone_level_feature.T
+def get_bert_features(texts, word2phs, device=None, model_id='hfl/chinese-roberta-wwm-ext-large'):
+    """Phone-level features for several sentences from one padded forward pass."""
+    return BertFeatureExtractor.get(model_id, device, check_lengths=False).get_features(texts, word2phs)
 
 
 if __name__ == "__main__":
@@ -198,6 +198,10 @@ def get_bert_feature(text, word2ph, device):
     from . import chinese_bert
     return chinese_bert.get_bert_feature(text, word2ph, model_id='bert-base-multilingual-uncased', device=device)
 
+def get_bert_features(texts, word2phs, device):
+    from . import chinese_bert
+    return chinese_bert.get_bert_features(texts, word2phs, model_id='bert-base-multilingual-uncased', device=device)
+
 from .chinese import _g2p as _chinese_g2p
 def _g2p_v2(segments):
     spliter = '#$&^!@'
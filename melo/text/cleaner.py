@@ -1,9 +1,40 @@
-from . import chinese, japanese, english, chinese_mix, korean, french, spanish
 from . import cleaned_text_to_sequence
 import copy
+import importlib
+from collections.abc import Mapping
 
-language_module_map = {"ZH": chinese, "JP": japanese, "EN": english, 'ZH_MIX_EN': chinese_mix, 'KR': korean,
-                    'FR': french, 'SP': spanish, 'ES': spanish}
+# Frontend module of each language, imported on first use
+_language_module_names = {"ZH": "chinese", "JP": "japanese", "EN": "english", 'ZH_MIX_EN': "chinese_mix", 'KR': "korean",
+                          'FR': "french", 'SP': "spanish", 'ES': "spanish"}
+
+
+class _LazyLanguageModules(Mapping):
+    """Language -> frontend module map that imports each module when it is first looked up.
+
+    Frontends load tokenizers, dictionaries and g2p models at import time, so a process only
+    pays for the languages it actually uses.
+    """
+
+    def __init__(self, module_names):
+        self._module_names = module_names
+
+    def __getitem__(self, language):
+        return importlib.import_module(f"{__package__}.{self._module_names[language]}")
+
+    def __iter__(self):
+        return iter(self._module_names)
+
+    def __len__(self):
+        return len(self._module_names)
+
+
+language_module_map = _LazyLanguageModules(_language_module_names)
+
+
+def preload_languages(languages):
+    """Import the frontends of ``languages`` now instead of on first use."""
+    for language in languages:
+        language_module_map[language]
 
 
 def clean_text(text, language):
@@ -0,0 +1,124 @@
+import os
+import json
+import mmap
+import bisect
+import struct
+
+import numpy as np
+
+# File layout (little endian):
+#   header      magic, word count, total phone count, vocab size in bytes
+#   vocab       JSON list of phone strings, padded to 4 bytes
+#   key_offsets uint32[n_words + 1] into the key blob
+#   ph_offsets  uint32[n_words + 1] into the phone/tone tables
+#   keys        sorted UTF-8 words, concatenated and padded to 4 bytes
+#   phones      uint8[n_phones] ids into vocab
+#   tones       uint8[n_phones]
+_MAGIC = b'CMULEX01'
+_HEADER = struct.Struct('<8sIII')
+
+
+def _pad4(n):
+    return (n + 3) & ~3
+
+
+def write_lexicon(path, entries):
+    """Write ``{word: (phones, tones)}`` to ``path`` in the compact lexicon format."""
+    words = sorted(entries, key=lambda w: w.encode('utf-8'))
+    vocab = sorted({ph for phones, _ in entries.values() for ph in phones})
+    vocab_ids = {ph: i for i, ph in enumerate(vocab)}
+    assert len(vocab) < 256
+
+    keys = [w.encode('utf-8') for w in words]
+    key_offsets = np.zeros(len(words) + 1, dtype='<u4')
+    key_offsets[1:] = np.cumsum([len(k) for k in keys])
+    ph_offsets = np.zeros(len(words) + 1, dtype='<u4')
+    ph_offsets[1:] = np.cumsum([len(entries[w][0]) for w in words])
+    phones = np.array([vocab_ids[ph] for w in words for ph in entries[w][0]], dtype=np.uint8)
+    tones = np.array([tn for w in words for tn in entries[w][1]], dtype=np.uint8)
+
+    vocab_bytes = json.dumps(vocab).encode('utf-8')
+    key_blob = b''.join(keys)
+
+    # Write then rename so concurrent workers never map a partial file
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(words), len(phones), len(vocab_bytes)))
+        f.write(vocab_bytes.ljust(_pad4(len(vocab_bytes)), b'\0'))
+        f.write(key_offsets.tobytes())
+        f.write(ph_offsets.tobytes())
+        f.write(key_blob.ljust(_pad4(len(key_blob)), b'\0'))
+        f.write(phones.tobytes())
+        f.write(tones.tobytes())
+    os.replace(tmp_path, path)
+
+
+class _Keys:
+    """Sequence view of the sorted key blob, for ``bisect``."""
+
+    def __init__(self, mm, base, offsets):
+        self.mm = mm
+        self.base = base
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.mm[self.base + int(self.offsets[i]):self.base + int(self.offsets[i + 1])]
+
+
+class CMULexicon:
+    """Read-only CMU pronunciation lexicon queried through ``mmap``.
+
+    Nothing is unpickled or copied at load time; the pages are shared between every process
+    that maps the same file. Entries hold the output of ``english.refine_syllables``.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_words, n_phones, vocab_size = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f'{path} is not a compact CMU lexicon')
+
+        offset = _HEADER.size
+        self.vocab = json.loads(self._mm[offset:offset + vocab_size].decode('utf-8'))
+        offset += _pad4(vocab_size)
+        key_offsets = np.frombuffer(self._mm, dtype='<u4', count=n_words + 1, offset=offset)
+        offset += key_offsets.nbytes
+        self._ph_offsets = np.frombuffer(self._mm, dtype='<u4', count=n_words + 1, offset=offset)
+        offset += self._ph_offsets.nbytes
+        self._keys = _Keys(self._mm, offset, key_offsets)
+        offset += _pad4(int(key_offsets[-1]))
+        self._phones = np.frombuffer(self._mm, dtype=np.uint8, count=n_phones, offset=offset)
+        self._tones = np.frombuffer(self._mm, dtype=np.uint8, count=n_phones, offset=offset + n_phones)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, word):
+        return self._index(word) is not None
+
+    def _index(self, word):
+        key = word.encode('utf-8')
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return None
+
+    def lookup_ids(self, word):
+        """Return ``(phone_ids, tones)`` arrays for ``word``, or None if it is not in the lexicon."""
+        i = self._index(word)
+        if i is None:
+            return None
+        start, end = self._ph_offsets[i], self._ph_offsets[i + 1]
+        return self._phones[start:end], self._tones[start:end]
+
+    def lookup(self, word):
+        """Return ``(phones, tones)`` lists for ``word``, or None if it is not in the lexicon."""
+        entry = self.lookup_ids(word)
+        if entry is None:
+            return None
+        phone_ids, tones = entry
+        return [self.vocab[i] for i in phone_ids], tones.tolist()
@@ -1,21 +1,27 @@
-import pickle
 import os
 import re
+import unicodedata
+import numpy as np
 from g2p_en import G2p
+from g2p_en.g2p import normalize_numbers as g2p_normalize_numbers, pos_tag, word_tokenize
 
 from . import symbols
+from .cmu_lexicon import CMULexicon, write_lexicon
+from .pronunciation_cache import PronunciationCache
 
 from .english_utils.abbreviations import expand_abbreviations
 from .english_utils.time_norm import expand_time_english
 from .english_utils.number_norm import normalize_numbers
-from .japanese import distribute_phone
 
 from transformers import AutoTokenizer
 
 current_file_path = os.path.dirname(__file__)
 CMU_DICT_PATH = os.path.join(current_file_path, "cmudict.rep")
-CACHE_PATH = os.path.join(current_file_path, "cmudict_cache.pickle")
+LEXICON_PATH = os.path.join(current_file_path, "cmudict_lexicon.bin")
 _g2p = G2p()
+# g2p_en output for words missing from the lexicon; oov_cache.open_store(path) shares it
+# between processes
+oov_cache = PronunciationCache()
 
 arpa = {
     "AH0",
@@ -139,25 +145,6 @@ def read_dict():
     return g2p_dict
 
 
-def cache_dict(g2p_dict, file_path):
-    with open(file_path, "wb") as pickle_file:
-        pickle.dump(g2p_dict, pickle_file)
-
-
-def get_dict():
-    if os.path.exists(CACHE_PATH):
-        with open(CACHE_PATH, "rb") as pickle_file:
-            g2p_dict = pickle.load(pickle_file)
-    else:
-        g2p_dict = read_dict()
-        cache_dict(g2p_dict, CACHE_PATH)
-
-    return g2p_dict
-
-
-eng_dict = get_dict()
-
-
 def refine_ph(phn):
     tone = 0
     if re.search(r"\d$", phn):
@@ -178,6 +165,17 @@ def refine_syllables(syllables):
     return phonemes, tones
 
 
+def get_lexicon():
+    """Open the compact lexicon, building it from cmudict.rep on first use."""
+    if not os.path.exists(LEXICON_PATH):
+        g2p_dict = read_dict()
+        write_lexicon(LEXICON_PATH, {word: refine_syllables(syllables) for word, syllables in g2p_dict.items()})
+    return CMULexicon(LEXICON_PATH)
+
+
+eng_lexicon = get_lexicon()
+
+
 def text_normalize(text):
     text = text.lower()
     text = expand_time_english(text)
@@ -185,6 +183,15 @@ def text_normalize(text):
     text = expand_abbreviations(text)
     return text
 
+
+def distribute_phone(n_phone, n_word):
+    phones_per_word = [0] * n_word
+    for task in range(n_phone):
+        min_tasks = min(phones_per_word)
+        min_index = phones_per_word.index(min_tasks)
+        phones_per_word[min_index] += 1
+    return phones_per_word
+
 model_id = 'bert-base-uncased'
 tokenizer = AutoTokenizer.from_pretrained(model_id)
 def g2p_old(text):
@@ -194,8 +201,9 @@ def g2p_old(text):
     tones = []
     words = re.split(r"([,;.\-\?\!\s+])", text)
     for w in words:
-        if w.upper() in eng_dict:
-            phns, tns = refine_syllables(eng_dict[w.upper()])
+        entry = eng_lexicon.lookup(w.upper())
+        if entry is not None:
+            phns, tns = entry
             phones += phns
             tones += tns
         else:
@@ -214,6 +222,92 @@ def g2p_old(text):
     phones = [post_replace_ph(i) for i in phones]
     return phones, tones, word2ph
 
+def _g2p_tokens(word):
+    """Tokens and POS tags of ``word`` after the preprocessing of ``G2p.__call__``."""
+    text = g2p_normalize_numbers(word)
+    text = ''.join(char for char in unicodedata.normalize('NFD', text)
+                   if unicodedata.category(char) != 'Mn')
+    text = text.lower()
+    text = re.sub(r"[^ a-z'.,?!\-]", "", text)
+    text = text.replace("i.e.", "that is")
+    text = text.replace("e.g.", "for example")
+    return pos_tag(word_tokenize(text))
+
+
+def _predict_batch(words):
+    """``_g2p.predict`` for several words at once: the GRU encoder and the greedy decoder run
+    over the padded batch instead of once per word."""
+    n = len(words)
+    lengths = np.array([len(word) + 1 for word in words])
+    x = np.full((n, lengths.max()), _g2p.g2idx["</s>"])
+    for i, word in enumerate(words):
+        x[i, :len(word)] = [_g2p.g2idx.get(char, _g2p.g2idx["<unk>"]) for char in word]
+    enc = _g2p.gru(
+        np.take(_g2p.enc_emb, x, axis=0), x.shape[1], _g2p.enc_w_ih, _g2p.enc_w_hh,
+        _g2p.enc_b_ih, _g2p.enc_b_hh, h0=np.zeros((n, _g2p.enc_w_hh.shape[-1]), np.float32),
+    )
+    # padding steps come after each word's </s>, so its last hidden state is unaffected
+    h = enc[np.arange(n), lengths - 1]
+
+    dec = np.take(_g2p.dec_emb, np.full(n, 2), axis=0)  # 2: <s>
+    preds = [[] for _ in words]
+    done = np.zeros(n, dtype=bool)
+    for _ in range(20):
+        h = _g2p.grucell(dec, h, _g2p.dec_w_ih, _g2p.dec_w_hh, _g2p.dec_b_ih, _g2p.dec_b_hh)
+        pred = (np.matmul(h, _g2p.fc_w.T) + _g2p.fc_b).argmax(-1)
+        for i in np.flatnonzero(~done):
+            if pred[i] == 3:  # 3: </s>
+                done[i] = True
+            else:
+                preds[i].append(pred[i])
+        if done.all():
+            break
+        dec = np.take(_g2p.dec_emb, pred, axis=0)
+    return [[_g2p.idx2p.get(idx, "<unk>") for idx in p] for p in preds]
+
+
+def _g2p_batch(words):
+    """``_g2p(word)`` without the spaces for each of ``words``, predicting every token that
+    needs the seq2seq model in one batch."""
+    prons = []
+    oov = {}
+    for word in words:
+        pron = []
+        for token, pos in _g2p_tokens(word):
+            if re.search("[a-z]", token) is None:
+                pron.append([token])
+            elif token in _g2p.homograph2features:  # Check homograph
+                pron1, pron2, pos1 = _g2p.homograph2features[token]
+                pron.append(pron1 if pos.startswith(pos1) else pron2)
+            elif token in _g2p.cmu:  # lookup CMU dict
+                pron.append(_g2p.cmu[token][0])
+            else:  # predicted below
+                pron.append(token)
+                oov[token] = None
+        prons.append(pron)
+    if oov:
+        oov = dict(zip(oov, _predict_batch(list(oov))))
+    return [
+        [ph for part in pron for ph in (oov[part] if isinstance(part, str) else part) if ph != " "]
+        for pron in prons
+    ]
+
+
+def g2p_oov(words):
+    """Return ``{word: phones}`` from g2p_en for words missing from the lexicon.
+
+    Pronunciations come from ``oov_cache`` when possible; the other words are converted
+    together with a single batched run of the g2p_en model, and cached.
+    """
+    prons = oov_cache.get_many(words)
+    missing = [word for word in dict.fromkeys(words) if word not in prons]
+    if missing:
+        predicted = dict(zip(missing, _g2p_batch(missing)))
+        oov_cache.put_many(predicted)
+        prons.update(predicted)
+    return prons
+
+
 def g2p(text, pad_start_end=True, tokenized=None):
     if tokenized is None:
         tokenized = tokenizer.tokenize(text)
@@ -226,20 +320,24 @@ def g2p(text, pad_start_end=True, tokenized=None):
         else:
             ph_groups[-1].append(t.replace("#", ""))
     
+    words = ["".join(group) for group in ph_groups]
+    entries = [eng_lexicon.lookup(w.upper()) for w in words]
+    # all words of the sentence missing from the lexicon go to g2p_en together
+    oov = g2p_oov([w for w, entry in zip(words, entries) if entry is None])
+
     phones = []
     tones = []
     word2ph = []
-    for group in ph_groups:
-        w = "".join(group)
+    for group, w, entry in zip(ph_groups, words, entries):
         phone_len = 0
         word_len = len(group)
-        if w.upper() in eng_dict:
-            phns, tns = refine_syllables(eng_dict[w.upper()])
+        if entry is not None:
+            phns, tns = entry
             phones += phns
             tones += tns
             phone_len += len(phns)
         else:
-            phone_list = list(filter(lambda p: p != " ", _g2p(w)))
+            phone_list = oov[w]
             for ph in phone_list:
                 if ph in arpa:
                     ph, tn = refine_ph(ph)
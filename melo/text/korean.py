@@ -142,6 +142,10 @@ def get_bert_feature(text, word2ph, device='cuda'):
     from . import japanese_bert
     return japanese_bert.get_bert_feature(text, word2ph, device=device, model_id=model_id)
 
+def get_bert_features(texts, word2phs, device='cuda'):
+    from . import japanese_bert
+    return japanese_bert.get_bert_features(texts, word2phs, device=device, model_id=model_id)
+
 
 if __name__ == "__main__":
     # tokenizer = AutoTokenizer.from_pretrained("./bert/bert-base-japanese-v3")
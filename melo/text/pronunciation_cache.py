@@ -0,0 +1,109 @@
+import os
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class PronunciationCache:
+    """Pronunciations predicted for words missing from the lexicon.
+
+    An in-process LRU of at most ``max_entries`` words sits in front of an optional SQLite
+    file (``path``, see ``open_store``) that every worker process can read and extend, so a
+    word is predicted once per deployment rather than once per process.
+    """
+
+    def __init__(self, max_entries=4096, path=None):
+        self.max_entries = max_entries
+        self.path = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        if path is not None:
+            self.open_store(path)
+
+    def open_store(self, path):
+        """Back the cache with the SQLite file at ``path``, created if missing."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+            self.path = path
+            self._connection = None
+            self._connect()
+
+    def _connect(self):
+        # connections do not survive a fork; every process opens its own
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS pronunciations (word TEXT PRIMARY KEY, phones TEXT NOT NULL)'
+            )
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def _insert(self, word, phones):
+        self._entries[word] = phones
+        self._entries.move_to_end(word)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, words):
+        """Return ``{word: phones}`` for the cached ones among ``words``."""
+        found = {}
+        with self._lock:
+            words = list(dict.fromkeys(words))
+            for word in words:
+                phones = self._entries.get(word)
+                if phones is not None:
+                    self._entries.move_to_end(word)
+                    found[word] = phones
+            self.hits += len(found)
+            missing = [word for word in words if word not in found]
+            if missing and self.path is not None:
+                rows = self._connect().execute(
+                    'SELECT word, phones FROM pronunciations WHERE word IN (%s)' % ','.join('?' * len(missing)),
+                    missing,
+                ).fetchall()
+                for word, phones in rows:
+                    phones = json.loads(phones)
+                    self._insert(word, phones)
+                    found[word] = phones
+                self.store_hits += len(rows)
+            self.misses += len(words) - len(found)
+        return {word: list(phones) for word, phones in found.items()}
+
+    def put_many(self, pronunciations):
+        """Cache ``{word: phones}``, writing them through to the store."""
+        with self._lock:
+            for word, phones in pronunciations.items():
+                self._insert(word, list(phones))
+            if self.path is not None and pronunciations:
+                connection = self._connect()
+                with connection:
+                    connection.executemany(
+                        'INSERT OR REPLACE INTO pronunciations (word, phones) VALUES (?, ?)',
+                        [(word, json.dumps(list(phones))) for word, phones in pronunciations.items()],
+                    )
+
+    def clear(self):
+        """Empty the in-process LRU; the store is kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+            }
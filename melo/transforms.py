@@ -207,3 +207,69 @@ def rational_quadratic_spline(
         logabsdet = torch.log(derivative_numerator) - 2 * torch.log(denominator)
 
         return outputs, logabsdet
+
+
+def unconstrained_rational_quadratic_spline_inverse(
+    inputs,
+    unnormalized_widths,
+    unnormalized_heights,
+    unnormalized_derivatives,
+    tail_bound=1.0,
+    min_bin_width=DEFAULT_MIN_BIN_WIDTH,
+    min_bin_height=DEFAULT_MIN_BIN_HEIGHT,
+    min_derivative=DEFAULT_MIN_DERIVATIVE,
+):
+    """Inverse of the linear-tailed spline for inference, without the log-determinant.
+
+    Returns ``unconstrained_rational_quadratic_spline(..., inverse=True)[0]``. Every element is
+    evaluated densely and the identity tails are selected with ``torch.where``, so there are no
+    boolean-mask gathers or scatters and no host synchronisation for the domain checks.
+    """
+    num_bins = unnormalized_widths.shape[-1]
+    left, right, bottom, top = -tail_bound, tail_bound, -tail_bound, tail_bound
+
+    widths = F.softmax(unnormalized_widths, dim=-1)
+    widths = min_bin_width + (1 - min_bin_width * num_bins) * widths
+    cumwidths = F.pad(torch.cumsum(widths, dim=-1), pad=(1, 0), mode="constant", value=0.0)
+    cumwidths = (right - left) * cumwidths + left
+    cumwidths[..., 0] = left
+    cumwidths[..., -1] = right
+
+    heights = F.softmax(unnormalized_heights, dim=-1)
+    heights = min_bin_height + (1 - min_bin_height * num_bins) * heights
+    cumheights = F.pad(torch.cumsum(heights, dim=-1), pad=(1, 0), mode="constant", value=0.0)
+    cumheights = (top - bottom) * cumheights + bottom
+    cumheights[..., 0] = bottom
+    cumheights[..., -1] = top
+
+    # the linear tails pin the boundary derivatives to 1
+    constant = float(np.log(np.exp(1 - min_derivative) - 1))
+    unnormalized_derivatives = F.pad(unnormalized_derivatives, pad=(1, 1), value=constant)
+    derivatives = min_derivative + F.softplus(unnormalized_derivatives)
+
+    inside = (inputs >= left) & (inputs <= right)
+    y = inputs.clamp(bottom, top)
+    knots = cumheights[..., 1:-1]
+    if torch.onnx.is_in_onnx_export() or torch.jit.is_tracing():
+        # aten::searchsorted has no ONNX symbolic; count the knots at or below y instead
+        bin_idx = torch.sum(y[..., None] >= knots, dim=-1, keepdim=True)
+    else:
+        bin_idx = torch.searchsorted(knots.contiguous(), y[..., None], right=True)
+
+    input_cumwidths = cumwidths.gather(-1, bin_idx)[..., 0]
+    input_bin_widths = cumwidths.gather(-1, bin_idx + 1)[..., 0] - input_cumwidths
+    input_cumheights = cumheights.gather(-1, bin_idx)[..., 0]
+    input_heights = cumheights.gather(-1, bin_idx + 1)[..., 0] - input_cumheights
+    input_delta = input_heights / input_bin_widths
+    input_derivatives = derivatives.gather(-1, bin_idx)[..., 0]
+    input_derivatives_plus_one = derivatives.gather(-1, bin_idx + 1)[..., 0]
+
+    offset = y - input_cumheights
+    slope_sum = input_derivatives + input_derivatives_plus_one - 2 * input_delta
+    a = offset * slope_sum + input_heights * (input_delta - input_derivatives)
+    b = input_heights * input_derivatives - offset * slope_sum
+    c = -input_delta * offset
+    discriminant = (b.pow(2) - 4 * a * c).clamp_min(0)
+    root = (2 * c) / (-b - torch.sqrt(discriminant))
+    outputs = root * input_bin_widths + input_cumwidths
+    return torch.where(inside, outputs, inputs)
@@ -9,7 +9,7 @@ from scipy.io.wavfile import read
 import torch
 import torchaudio
 import librosa
-from melo.text import cleaned_text_to_sequence, get_bert
+from melo.text import cleaned_text_to_sequence, get_bert_batch
 from melo.text.cleaner import clean_text
 from melo import commons
 
@@ -18,41 +18,66 @@ MATPLOTLIB_FLAG = False
 logger = logging.getLogger(__name__)
 
 
-def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None):
-    norm_text, phone, tone, word2ph = clean_text(text, language_str)
-    phone, tone, language = cleaned_text_to_sequence(phone, tone, language_str, symbol_to_id)
+def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None, return_word2ph=False, bert_extractor=None):
+    return get_texts_for_tts_infer([text], language_str, hps, device, symbol_to_id, return_word2ph, bert_extractor)[0]
 
-    if hps.data.add_blank:
-        phone = commons.intersperse(phone, 0)
-        tone = commons.intersperse(tone, 0)
-        language = commons.intersperse(language, 0)
-        for i in range(len(word2ph)):
-            word2ph[i] = word2ph[i] * 2
-        word2ph[0] += 1
 
-    if getattr(hps.data, "disable_bert", False):
-        bert = torch.zeros(1024, len(phone))
-        ja_bert = torch.zeros(768, len(phone))
-    else:
-        bert = get_bert(norm_text, word2ph, language_str, device)
-        del word2ph
-        assert bert.shape[-1] == len(phone), phone
+def get_texts_for_tts_infer(texts, language_str, hps, device, symbol_to_id=None, return_word2ph=False, bert_extractor=None):
+    """``get_text_for_tts_infer`` for several sentences; BERT runs once over the whole batch.
 
-        if language_str == "ZH":
-            bert = bert
-            ja_bert = torch.zeros(768, len(phone))
-        elif language_str in ["JP", "EN", "ZH_MIX_EN", 'KR', 'SP', 'ES', 'FR', 'DE', 'RU']:
-            ja_bert = bert
+    ``bert_extractor`` overrides the language's pooled ``BertFeatureExtractor``.
+    """
+    cleaned = []
+    for text in texts:
+        norm_text, phone, tone, word2ph = clean_text(text, language_str)
+        phone, tone, language = cleaned_text_to_sequence(phone, tone, language_str, symbol_to_id)
+
+        if hps.data.add_blank:
+            phone = commons.intersperse(phone, 0)
+            tone = commons.intersperse(tone, 0)
+            language = commons.intersperse(language, 0)
+            for i in range(len(word2ph)):
+                word2ph[i] = word2ph[i] * 2
+            word2ph[0] += 1
+        cleaned.append((norm_text, phone, tone, language, word2ph))
+
+    disable_bert = getattr(hps.data, "disable_bert", False)
+    if not disable_bert and cleaned:
+        norm_texts, word2phs = [c[0] for c in cleaned], [c[4] for c in cleaned]
+        if bert_extractor is not None:
+            berts = bert_extractor.get_features(norm_texts, word2phs)
+        else:
+            berts = get_bert_batch(norm_texts, word2phs, language_str, device)
+
+    items = []
+    for i, (norm_text, phone, tone, language, word2ph) in enumerate(cleaned):
+        if disable_bert:
             bert = torch.zeros(1024, len(phone))
+            ja_bert = torch.zeros(768, len(phone))
         else:
-            raise NotImplementedError()
+            bert = berts[i]
+            assert bert.shape[-1] == len(phone), phone
+
+            if language_str == "ZH":
+                bert = bert
+                ja_bert = torch.zeros(768, len(phone))
+            elif language_str in ["JP", "EN", "ZH_MIX_EN", 'KR', 'SP', 'ES', 'FR', 'DE', 'RU']:
+                ja_bert = bert
+                bert = torch.zeros(1024, len(phone))
+            else:
+                raise NotImplementedError()
 
-    assert bert.shape[-1] == len(phone), f"Bert seq len {bert.shape[-1]} != {len(phone)}"
+        assert bert.shape[-1] == len(phone), f"Bert seq len {bert.shape[-1]} != {len(phone)}"
 
-    phone = torch.LongTensor(phone)
-    tone = torch.LongTensor(tone)
-    language = torch.LongTensor(language)
-    return bert, ja_bert, phone, tone, language
+        phone = torch.LongTensor(phone)
+        tone = torch.LongTensor(tone)
+        language = torch.LongTensor(language)
+        if return_word2ph:
+            # word2ph is counted in phones after blank interspersing
+            items.append((bert, ja_bert, phone, tone, language, (norm_text, word2ph)))
+        else:
+            items.append((bert, ja_bert, phone, tone, language))
+    return items
 
 def load_checkpoint(checkpoint_path, model, optimizer=None, skip_optimizer=False):
     assert os.path.isfile(checkpoint_path)
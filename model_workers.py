@@ -0,0 +1,390 @@
+"""Host TTS and Whisper models in dedicated worker processes.
+
+Each worker is a separate interpreter started with ``python -m model_workers`` so it has its
+own GIL and a pinned torch thread count (and optionally a pinned CPU set). Requests and
+replies travel over an authenticated ``multiprocessing.connection`` socket, while audio is
+exchanged through ``multiprocessing.shared_memory`` blocks instead of pickled arrays.
+"""
+import os
+import sys
+import time
+import atexit
+import shutil
+import socket
+import tempfile
+import itertools
+import threading
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import AuthenticationError, resource_tracker, shared_memory
+from multiprocessing.connection import Client, Connection, answer_challenge, deliver_challenge
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from config import logger
+
+AUTHKEY_ENV = 'MODEL_WORKER_AUTHKEY'
+# Seconds a new worker has to connect back; model loading comes after and is not limited
+START_TIMEOUT = 60.0
+
+
+class SharedArray(NamedTuple):
+    """Descriptor of an array in a shared memory block created by ``share_array``."""
+    name: str
+    shape: tuple
+    dtype: str
+
+
+def share_array(array: np.ndarray) -> SharedArray:
+    """Copy an array into a new shared memory block; the receiver unlinks it."""
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1), track=False)
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        # Ownership passes to the receiving process, so this process must not clean it up.
+        # The tracker knows POSIX blocks by their name with its leading slash.
+        resource_tracker.unregister('/' + shm.name, 'shared_memory')
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    shm.close()
+    return SharedArray(shm.name, array.shape, array.dtype.str)
+
+
+def take_shared_array(desc: SharedArray) -> np.ndarray:
+    """Copy an array out of a block created by ``share_array`` and release the block."""
+    name, shape, dtype = desc
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def release_shared_array(desc: SharedArray) -> None:
+    """Unlink the block of ``desc`` if its receiver has not taken it yet."""
+    try:
+        shm = shared_memory.SharedMemory(name=desc.name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _shared_arrays(value) -> List[SharedArray]:
+    """The shared arrays among a request's arguments or in a reply's payload."""
+    if isinstance(value, SharedArray):
+        return [value]
+    if isinstance(value, (tuple, list)):
+        return [item for item in value if isinstance(item, SharedArray)]
+    return []
+
+
+def cpu_blocks(sizes: List[int]) -> List[Optional[List[int]]]:
+    """Assign consecutive, non-overlapping CPU sets of the given sizes, if the machine has enough."""
+    if not hasattr(os, 'sched_getaffinity'):
+        return [None] * len(sizes)
+    cpus = sorted(os.sched_getaffinity(0))
+    if sum(sizes) > len(cpus):
+        return [None] * len(sizes)
+    blocks, start = [], 0
+    for size in sizes:
+        blocks.append(cpus[start:start + size])
+        start += size
+    return blocks
+
+
+def whisper_transcribe(processor, model, device: str, audio: np.ndarray, language: str) -> str:
+    """Transcribe 16 kHz audio with a loaded Whisper processor and model."""
+    input_features = processor(
+        audio,
+        sampling_rate=16000,
+        return_tensors="pt"
+    ).input_features.to(device)
+
+    forced_decoder_ids = processor.get_decoder_prompt_ids(
+        language=language,
+        task="transcribe"
+    )
+
+    generated_ids = model.generate(
+        input_features,
+        forced_decoder_ids=forced_decoder_ids
+    )
+
+    return processor.batch_decode(
+        generated_ids,
+        skip_special_tokens=True
+    )[0]
+
+
+class ModelWorker:
+    """Client handle for a model served by a worker process."""
+
+    def __init__(self, kind: str, options: Dict, num_threads: int = 1, cpus: Optional[List[int]] = None):
+        self.kind = kind
+        authkey = os.urandom(16)
+        env = dict(
+            os.environ,
+            OMP_NUM_THREADS=str(num_threads),
+            MKL_NUM_THREADS=str(num_threads),
+            **{AUTHKEY_ENV: authkey.hex()}
+        )
+        socket_dir = tempfile.mkdtemp(prefix='model-worker-')
+        address = os.path.join(socket_dir, 'socket')
+        server = socket.socket(socket.AF_UNIX)
+        self._conn = None
+        try:
+            server.bind(address)
+            server.listen(1)
+            self.process = subprocess.Popen(
+                self._command(address),
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env=env
+            )
+            try:
+                self._conn = self._accept(server, authkey)
+                self._conn.send((kind, options, num_threads, cpus))
+                status, info = self._conn.recv()
+            except (EOFError, OSError, AuthenticationError) as e:
+                status, info = 'error', f"{type(e).__name__}: {e}"
+        finally:
+            server.close()
+            shutil.rmtree(socket_dir, ignore_errors=True)
+
+        if status != 'ready':
+            self.process.kill()
+            self.process.wait()
+            if self._conn is not None:
+                self._conn.close()
+            raise RuntimeError(f"Failed to start {kind} worker: {info}")
+        self.info = info
+
+        self._send_lock = threading.Lock()
+        self._futures: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_replies, name=f'{kind}-worker-reader', daemon=True)
+        self._reader.start()
+        atexit.register(self.close)
+        logger.info(f"Started {kind} worker (pid {self.process.pid}, {num_threads} threads, cpus {cpus})")
+
+    def _command(self, address: str) -> List[str]:
+        return [sys.executable, '-m', 'model_workers', address]
+
+    def _accept(self, server: socket.socket, authkey: bytes) -> Connection:
+        """Accept the worker's connection, unless it exits or misses ``START_TIMEOUT`` first."""
+        server.settimeout(0.1)
+        deadline = time.monotonic() + START_TIMEOUT
+        while True:
+            try:
+                sock, _ = server.accept()
+                break
+            except socket.timeout:
+                if self.process.poll() is not None:
+                    raise EOFError(f"worker exited with code {self.process.returncode} before connecting")
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"worker did not connect within {START_TIMEOUT:g}s")
+        sock.setblocking(True)
+        conn = Connection(sock.detach())
+        # the handshake of multiprocessing.connection.Listener.accept
+        deliver_challenge(conn, authkey)
+        answer_challenge(conn, authkey)
+        return conn
+
+    def _read_replies(self) -> None:
+        while True:
+            try:
+                req_id, ok, payload = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            future = self._futures.pop(req_id)
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+        for future in list(self._futures.values()):
+            future.set_exception(RuntimeError(f"{self.kind} worker exited"))
+        self._futures.clear()
+
+    def call(self, method: str, *args):
+        """Run ``method`` in the worker and wait for its result.
+
+        Shared arrays among ``args`` belong to the worker once sent; if the call fails, the
+        worker may have exited before taking them, so any that are left are released here.
+        """
+        try:
+            if self._closed:
+                raise RuntimeError(f"{self.kind} worker is closed")
+            future = Future()
+            with self._send_lock:
+                req_id = next(self._ids)
+                self._futures[req_id] = future
+                self._conn.send((req_id, method, args))
+            return future.result()
+        except BaseException:
+            for desc in _shared_arrays(args):
+                release_shared_array(desc)
+            raise
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        try:
+            with self._send_lock:
+                self._conn.send(None)
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._conn.close()
+
+
+class TTSWorker(ModelWorker):
+    """A ``melo.TTS`` model in a worker process, exposing the same synthesis call as ``TTS``."""
+
+    def __init__(self, language: str, device: str = 'auto', num_threads: int = 4, cpus: Optional[List[int]] = None,
+                 cache: Optional[Dict] = None, scheduler: Optional[Dict] = None, quantize: Optional[str] = None,
+                 compile_options: Optional[Dict] = None, concurrency: int = 4,
+                 encoder_cache: Optional[Dict] = None, g2p_cache_path: Optional[str] = None):
+        options = {
+            'language': language,
+            'device': device,
+            'cache': cache,
+            'encoder_cache': encoder_cache,
+            'g2p_cache_path': g2p_cache_path,
+            'scheduler': scheduler,
+            'quantize': quantize,
+            'compile': compile_options,
+            'concurrency': concurrency,
+        }
+        super().__init__('tts', options, num_threads, cpus)
+        self.language = language
+        self.hps = self.info['hps']
+
+    def tts_to_file_with_timing(self, text: str, speaker_id: int, output_path: Optional[str] = None,
+                                format: Optional[str] = None, **kwargs):
+        desc, word_timings = self.call('tts', text, speaker_id, kwargs)
+        audio = take_shared_array(desc)
+        if output_path is not None:
+            import soundfile
+            soundfile.write(output_path, audio, self.hps.data.sampling_rate, format=format)
+        return audio, word_timings
+
+    def predict_durations(self, text: str, speaker_id: int, **kwargs) -> Dict:
+        return self.call('predict_durations', text, speaker_id, kwargs)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.call('cache_stats')
+
+
+class WhisperWorker(ModelWorker):
+    """A Whisper model in a worker process."""
+
+    def __init__(self, model_id: str, device: str = 'cpu', num_threads: int = 8, cpus: Optional[List[int]] = None):
+        super().__init__('whisper', {'model_id': model_id, 'device': device, 'concurrency': 1}, num_threads, cpus)
+
+    def transcribe(self, audio: np.ndarray, language: str) -> str:
+        return self.call('transcribe', share_array(np.ascontiguousarray(audio, dtype=np.float32)), language)
+
+
+def _load_tts(options: Dict):
+    from melo import TTS
+    from melo.synthesis_cache import SynthesisCache
+    from melo.encoder_cache import EncoderCache
+    from melo.inference_scheduler import InferenceScheduler
+
+    cache = SynthesisCache(**options['cache']) if options.get('cache') else None
+    encoder_cache = EncoderCache(**options['encoder_cache']) if options.get('encoder_cache') else None
+    tts = TTS(language=options['language'], device=options['device'], cache=cache, quantize=options['quantize'],
+              encoder_cache=encoder_cache)
+    if options.get('g2p_cache_path') and tts.language in ('EN', 'ZH_MIX_EN'):
+        from melo.text import english
+        english.oov_cache.open_store(options['g2p_cache_path'])
+    tts.optimize_for_inference()
+    if options.get('compile') is not None:
+        tts.compile_for_inference(**options['compile'])
+    if options.get('scheduler'):
+        tts.scheduler = InferenceScheduler(tts, **options['scheduler'])
+
+    def synthesize(text, speaker_id, kwargs):
+        audio, word_timings = tts.tts_to_file_with_timing(text, speaker_id, quiet=True, **kwargs)
+        return share_array(np.asarray(audio, dtype=np.float32)), word_timings
+
+    def predict_durations(text, speaker_id, kwargs):
+        return tts.predict_durations(text, speaker_id, **kwargs)
+
+    def cache_stats():
+        return tts.cache.stats() if tts.cache is not None else {}
+
+    handlers = {'tts': synthesize, 'predict_durations': predict_durations, 'cache_stats': cache_stats}
+    return handlers, {'hps': tts.hps}
+
+
+def _load_whisper(options: Dict):
+    from transformers import WhisperProcessor, WhisperForConditionalGeneration
+
+    device = options['device']
+    processor = WhisperProcessor.from_pretrained(options['model_id'])
+    model = WhisperForConditionalGeneration.from_pretrained(options['model_id']).to(device)
+
+    def transcribe(audio_desc, language):
+        return whisper_transcribe(processor, model, device, take_shared_array(audio_desc), language)
+
+    return {'transcribe': transcribe}, {}
+
+
+_LOADERS = {'tts': _load_tts, 'whisper': _load_whisper}
+
+
+def _serve(address: str, authkey: bytes) -> None:
+    conn = Client(address, authkey=authkey)
+    kind, options, num_threads, cpus = conn.recv()
+
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    import torch
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+
+    try:
+        handlers, info = _LOADERS[kind](options)
+    except Exception as e:
+        logger.exception(f"Failed to load {kind} worker")
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+        return
+    conn.send(('ready', info))
+
+    send_lock = threading.Lock()
+
+    def handle(req_id, method, args):
+        try:
+            reply = (req_id, True, handlers[method](*args))
+        except Exception as e:
+            logger.exception(f"{kind} worker request failed")
+            reply = (req_id, False, f"{type(e).__name__}: {e}")
+        try:
+            with send_lock:
+                conn.send(reply)
+        except OSError:
+            # the client is gone and will never take the reply's shared arrays
+            for desc in _shared_arrays(reply[2]):
+                release_shared_array(desc)
+
+    with ThreadPoolExecutor(max_workers=options.get('concurrency', 1)) as pool:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            pool.submit(handle, *message)
+
+
+if __name__ == '__main__':
+    _serve(sys.argv[1], bytes.fromhex(os.environ.pop(AUTHKEY_ENV)))
@@ -2,6 +2,10 @@ from transformers import WhisperProcessor, WhisperForConditionalGeneration
 import argostranslate.package
 import argostranslate.translate
 from melo import TTS
+from melo.synthesis_cache import SynthesisCache
+from melo.encoder_cache import EncoderCache
+from melo.inference_scheduler import InferenceScheduler
+from melo.model_registry import ModelRegistry
 import numpy as np
 from typing import Dict, Optional, List, Tuple
 import torch
@@ -9,7 +13,15 @@ import tempfile
 import os
 import logging
 
-from config import WHISPER_MODEL_ID, SUPPORTED_LANGUAGES, logger
+from config import (
+    WHISPER_MODEL_ID, SUPPORTED_LANGUAGES, TTS_BATCH_SIZE, TTS_MAX_BATCH_TOKENS, TTS_PHONE_BUDGET,
+    TTS_SEED, TTS_CACHE_MAX_BYTES, TTS_CACHE_DIR, TTS_CACHE_MAX_DISK_BYTES, TTS_ENCODER_CACHE_MAX_BYTES, TTS_G2P_CACHE_PATH, TTS_SCHEDULER_ENABLED,
+    TTS_SCHEDULER_WAIT_MS, TTS_MAX_RESIDENT_LANGUAGES, TTS_IDLE_TIMEOUT, TTS_PINNED_LANGUAGES,
+    TTS_QUANTIZE, TTS_COMPILE, TTS_COMPILE_CACHE_DIR,
+    MODEL_WORKERS_ENABLED, TTS_WORKER_THREADS, WHISPER_WORKER_THREADS,
+    MODEL_WORKER_PIN_CPUS, logger
+)
+from model_workers import TTSWorker, WhisperWorker, cpu_blocks, whisper_transcribe
 from utils import get_device, adjust_speed_for_model, log_error
 
 # Define supported translation pairs based on testing results
@@ -50,9 +62,38 @@ def create_word_timings(text: str, duration: float) -> List[Dict]:
     
     return timings
 
+def align_word_timings(text: str, timings: List[Dict], duration: float) -> List[Dict]:
+    """Label model word timings with the words of the original text."""
+    if not timings:
+        return create_word_timings(text, duration)
+
+    # Normalization (numbers, casing) may change the word count; only relabel when it lines up
+    words = text.strip().split()
+    if len(words) == len(timings):
+        timings = [dict(timing, word=word) for timing, word in zip(timings, words)]
+
+    for timing in timings:
+        logger.info(f"Word timing: {timing['word']} [{timing['start']:.3f} - {timing['end']:.3f}]")
+    return timings
+
+# Languages served by TTS, mapped to MeloTTS language names
+TTS_LANGUAGES = {
+    'en': 'EN',
+    'es': 'ES',
+    'fr': 'FR',
+    'zh': 'ZH',
+    'ja': 'JP'
+}
+
 class SpeechServices:
-    def __init__(self):
+    def __init__(self, use_workers: bool = MODEL_WORKERS_ENABLED):
         self.device = get_device()
+        self.use_workers = use_workers
+        if use_workers:
+            # One CPU block for Whisper followed by one per TTS language
+            self._worker_cpus = cpu_blocks([WHISPER_WORKER_THREADS] + [TTS_WORKER_THREADS] * len(TTS_LANGUAGES))
+            if not MODEL_WORKER_PIN_CPUS:
+                self._worker_cpus = [None] * len(self._worker_cpus)
         self._init_whisper()
         self._init_tts()
         self._init_translation()
@@ -60,6 +101,16 @@ class SpeechServices:
     def _init_whisper(self) -> None:
         """Initialize Whisper model for speech recognition."""
         try:
+            if self.use_workers:
+                self.whisper_worker = WhisperWorker(
+                    WHISPER_MODEL_ID,
+                    device=str(self.device),
+                    num_threads=WHISPER_WORKER_THREADS,
+                    cpus=self._worker_cpus[0]
+                )
+                logger.info("Whisper worker initialized successfully")
+                return
+
             self.processor = WhisperProcessor.from_pretrained(WHISPER_MODEL_ID)
             self.whisper_model = WhisperForConditionalGeneration.from_pretrained(WHISPER_MODEL_ID).to(self.device)
             logger.info("Whisper model initialized successfully")
@@ -68,21 +119,84 @@ class SpeechServices:
             raise
 
     def _init_tts(self) -> None:
-        """Initialize TTS models."""
+        """Initialize the TTS model registry; languages are loaded on first use."""
         try:
-            # Initialize TTS instances for each language
-            self.tts_models = {
-                'en': TTS(language="EN"),
-                'es': TTS(language="ES"),
-                'fr': TTS(language="FR"),
-                'zh': TTS(language="ZH"),
-                'ja': TTS(language="JP")
-            }
+            if self.use_workers:
+                factory = self._start_tts_worker
+            else:
+                # Synthesis results are cached across all languages
+                self.synthesis_cache = SynthesisCache(max_bytes=TTS_CACHE_MAX_BYTES, cache_dir=TTS_CACHE_DIR,
+                                                      max_disk_bytes=TTS_CACHE_MAX_DISK_BYTES)
+                factory = self._load_tts
+
+            self.tts_models = ModelRegistry(
+                factory=factory,
+                max_resident=TTS_MAX_RESIDENT_LANGUAGES,
+                idle_timeout=TTS_IDLE_TIMEOUT
+            )
+            for code in TTS_PINNED_LANGUAGES:
+                self.tts_models.pin(code)
             logger.info("TTS models initialized successfully")
         except Exception as e:
             log_error(e, "Failed to initialize TTS models")
             raise
 
+    def _load_tts(self, code: str) -> TTS:
+        """Load the TTS model for a language code."""
+        encoder_cache = EncoderCache(max_bytes=TTS_ENCODER_CACHE_MAX_BYTES) if TTS_ENCODER_CACHE_MAX_BYTES else None
+        tts = TTS(language=TTS_LANGUAGES[code], cache=self.synthesis_cache, quantize=self._tts_quantize(),
+                  encoder_cache=encoder_cache)
+        if TTS_G2P_CACHE_PATH is not None and tts.language in ('EN', 'ZH_MIX_EN'):
+            # the English frontend is loaded by now
+            from melo.text import english
+            english.oov_cache.open_store(TTS_G2P_CACHE_PATH)
+        tts.optimize_for_inference()
+        if TTS_COMPILE:
+            tts.compile_for_inference(**self._tts_compile_options())
+
+        # Route concurrent requests through one micro-batching scheduler per language
+        if TTS_SCHEDULER_ENABLED:
+            tts.scheduler = InferenceScheduler(
+                tts,
+                max_batch_size=TTS_BATCH_SIZE,
+                max_batch_tokens=TTS_MAX_BATCH_TOKENS,
+                max_wait_ms=TTS_SCHEDULER_WAIT_MS
+            )
+        return tts
+
+    def _tts_quantize(self) -> Optional[str]:
+        """Quantization mode for TTS models; quantized kernels only exist on CPU."""
+        return TTS_QUANTIZE if self.device.type == 'cpu' else None
+
+    def _tts_compile_options(self) -> Dict:
+        """Compile cache and warm-up batch sizes matching how requests are batched."""
+        batch_sizes = [1, TTS_BATCH_SIZE] if TTS_SCHEDULER_ENABLED and TTS_BATCH_SIZE > 1 else [1]
+        return {'cache_dir': TTS_COMPILE_CACHE_DIR, 'batch_sizes': batch_sizes}
+
+    def _start_tts_worker(self, code: str) -> TTSWorker:
+        """Start the TTS worker process for a language code."""
+        # Each worker keeps its own memory cache; a cache directory is shared between them
+        per_worker_bytes = TTS_CACHE_MAX_BYTES // len(TTS_LANGUAGES)
+        scheduler = {
+            'max_batch_size': TTS_BATCH_SIZE,
+            'max_batch_tokens': TTS_MAX_BATCH_TOKENS,
+            'max_wait_ms': TTS_SCHEDULER_WAIT_MS
+        } if TTS_SCHEDULER_ENABLED else None
+
+        return TTSWorker(
+            TTS_LANGUAGES[code],
+            device=str(self.device),
+            num_threads=TTS_WORKER_THREADS,
+            cpus=self._worker_cpus[1 + list(TTS_LANGUAGES).index(code)],
+            cache={'max_bytes': per_worker_bytes, 'cache_dir': TTS_CACHE_DIR, 'max_disk_bytes': TTS_CACHE_MAX_DISK_BYTES},
+            encoder_cache={'max_bytes': TTS_ENCODER_CACHE_MAX_BYTES} if TTS_ENCODER_CACHE_MAX_BYTES else None,
+            g2p_cache_path=TTS_G2P_CACHE_PATH,
+            scheduler=scheduler,
+            quantize=self._tts_quantize(),
+            compile_options=self._tts_compile_options() if TTS_COMPILE else None,
+            concurrency=TTS_BATCH_SIZE if TTS_SCHEDULER_ENABLED else 1
+        )
+
     def _init_translation(self) -> None:
         """Initialize translation packages."""
         try:
@@ -127,28 +241,11 @@ class SpeechServices:
             if from_language not in SUPPORTED_LANGUAGES:
                 raise ValueError(f"Unsupported language for transcription: {from_language}")
 
-            input_features = self.processor(
-                audio, 
-                sampling_rate=16000, 
-                return_tensors="pt"
-            ).input_features.to(self.device)
-            
-            forced_decoder_ids = self.processor.get_decoder_prompt_ids(
-                language=SUPPORTED_LANGUAGES[from_language],
-                task="transcribe"
-            )
-            
-            generated_ids = self.whisper_model.generate(
-                input_features,
-                forced_decoder_ids=forced_decoder_ids
-            )
-            
-            transcription = self.processor.batch_decode(
-                generated_ids,
-                skip_special_tokens=True
-            )[0]
-            
-            return transcription
+            language = SUPPORTED_LANGUAGES[from_language]
+            if self.use_workers:
+                return self.whisper_worker.transcribe(audio, language)
+
+            return whisper_transcribe(self.processor, self.whisper_model, self.device, audio, language)
         except Exception as e:
             log_error(e, "Transcription failed")
             raise
@@ -196,26 +293,30 @@ class SpeechServices:
             language = lang_map.get(voice_id, 'en')
             
             # Validate language is supported
-            if language not in self.tts_models:
+            if language not in TTS_LANGUAGES:
                 raise ValueError(f"Unsupported language for speech synthesis: {language}")
             
-            # Get the appropriate TTS model
-            tts = self.tts_models[language]
-            
-            # Generate speech
-            audio_data = tts.tts_to_file(
-                text=text,
-                speaker_id=0,
-                output_path=temp_path,
-                speed=speed
-            )
+            # Lease the TTS model, loading it on first use; eviction waits for the lease
+            with self.tts_models.lease(language) as tts:
+                # Generate speech
+                audio_data, model_timings = tts.tts_to_file_with_timing(
+                    text=text,
+                    speaker_id=0,
+                    output_path=temp_path,
+                    speed=speed,
+                    batch_size=TTS_BATCH_SIZE,
+                    max_batch_tokens=TTS_MAX_BATCH_TOKENS,
+                    seed=TTS_SEED,
+                    phone_budget=TTS_PHONE_BUDGET
+                )
+                sampling_rate = tts.hps.data.sampling_rate
 
             # Calculate audio duration
-            audio_duration = len(audio_data) / tts.hps.data.sampling_rate
+            audio_duration = len(audio_data) / sampling_rate
             logger.info(f"Generated audio duration: {audio_duration:.3f}s")
 
-            # Create word timings
-            word_timings = create_word_timings(text, audio_duration)
+            # Use the word timings predicted by the duration model
+            word_timings = align_word_timings(text, model_timings, audio_duration)
             logger.info(f"Created {len(word_timings)} word timings")
 
             if not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
@@ -237,6 +338,18 @@ class SpeechServices:
             except Exception as e:
                 log_error(e, "Error cleaning up temporary file")
 
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Get synthesis cache hit/miss/eviction counters."""
+        if not self.use_workers:
+            return self.synthesis_cache.stats()
+
+        # Sum the counters of the per-language worker caches
+        totals: Dict[str, int] = {}
+        for tts in self.tts_models.loaded().values():
+            for name, value in tts.cache_stats().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
     def get_available_voices(self) -> List[Dict[str, str]]:
         """Get list of available TTS voices."""
         return [
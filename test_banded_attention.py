@@ -0,0 +1,107 @@
+import math
+
+import torch
+import torch.nn.functional as F
+
+from melo import attentions, commons
+
+
+def reference_attention(attn, query, key, value, mask=None):
+    """``MultiHeadAttention.attention`` as it was with dense relative-position matrices."""
+    b, d, t_s, t_t = (*key.size(), query.size(2))
+    query = query.view(b, attn.n_heads, attn.k_channels, t_t).transpose(2, 3)
+    key = key.view(b, attn.n_heads, attn.k_channels, t_s).transpose(2, 3)
+    value = value.view(b, attn.n_heads, attn.k_channels, t_s).transpose(2, 3)
+
+    def relative_embeddings(embeddings, length):
+        pad_length = max(length - (attn.window_size + 1), 0)
+        start = max((attn.window_size + 1) - length, 0)
+        if pad_length > 0:
+            embeddings = F.pad(embeddings, commons.convert_pad_shape([[0, 0], [pad_length, pad_length], [0, 0]]))
+        return embeddings[:, start:start + 2 * length - 1]
+
+    def relative_to_absolute(x):
+        batch, heads, length, _ = x.size()
+        x = F.pad(x, commons.convert_pad_shape([[0, 0], [0, 0], [0, 0], [0, 1]]))
+        x_flat = x.view([batch, heads, length * 2 * length])
+        x_flat = F.pad(x_flat, commons.convert_pad_shape([[0, 0], [0, 0], [0, length - 1]]))
+        return x_flat.view([batch, heads, length + 1, 2 * length - 1])[:, :, :length, length - 1:]
+
+    def absolute_to_relative(x):
+        batch, heads, length, _ = x.size()
+        x = F.pad(x, commons.convert_pad_shape([[0, 0], [0, 0], [0, 0], [0, length - 1]]))
+        x_flat = x.view([batch, heads, length ** 2 + length * (length - 1)])
+        x_flat = F.pad(x_flat, commons.convert_pad_shape([[0, 0], [0, 0], [length, 0]]))
+        return x_flat.view([batch, heads, length, 2 * length])[:, :, :, 1:]
+
+    scores = torch.matmul(query / math.sqrt(attn.k_channels), key.transpose(-2, -1))
+    if attn.window_size is not None:
+        key_embeddings = relative_embeddings(attn.emb_rel_k, t_s)
+        rel_logits = torch.matmul(query / math.sqrt(attn.k_channels), key_embeddings.unsqueeze(0).transpose(-2, -1))
+        scores = scores + relative_to_absolute(rel_logits)
+    if mask is not None:
+        scores = scores.masked_fill(mask == 0, -1e4)
+    p_attn = F.softmax(scores, dim=-1)
+    output = torch.matmul(p_attn, value)
+    if attn.window_size is not None:
+        value_embeddings = relative_embeddings(attn.emb_rel_v, t_s)
+        output = output + torch.matmul(absolute_to_relative(p_attn), value_embeddings.unsqueeze(0))
+    return output.transpose(2, 3).contiguous().view(b, d, t_t)
+
+
+def padded_inputs(channels, lengths):
+    lengths = torch.LongTensor(lengths)
+    x_mask = commons.sequence_mask(lengths, int(lengths.max())).unsqueeze(1).float()
+    attn_mask = x_mask.unsqueeze(2) * x_mask.unsqueeze(-1)
+    x = torch.randn(len(lengths), channels, int(lengths.max())) * x_mask
+    return x, x_mask, attn_mask
+
+
+def test_banded_attention_matches_dense():
+    torch.manual_seed(0)
+    for window_size, heads_share in [(4, True), (4, False), (None, True)]:
+        attn = attentions.MultiHeadAttention(
+            192, 192, 2, window_size=window_size, heads_share=heads_share
+        ).eval()
+        # lengths below, at and beyond the window, padded in one batch
+        for lengths in [[1], [3, 2], [5], [37, 12, 4], [120]]:
+            x, x_mask, attn_mask = padded_inputs(192, lengths)
+            with torch.no_grad():
+                q, k, v = attn.conv_q(x), attn.conv_k(x), attn.conv_v(x)
+                expected = reference_attention(attn, q, k, v, attn_mask) * x_mask
+                output = attn.attention(q, k, v, attn_mask)[0] * x_mask
+            assert torch.allclose(output, expected, atol=1e-5), (window_size, lengths)
+
+
+def test_attention_probabilities_are_kept_on_request():
+    torch.manual_seed(0)
+    attn = attentions.MultiHeadAttention(192, 192, 2).eval()
+    x, x_mask, attn_mask = padded_inputs(192, [9, 5])
+    with torch.no_grad():
+        fused = attn(x, x, attn_mask)
+        assert attn.attn is None
+        attn.keep_attn = True
+        output = attn(x, x, attn_mask)
+    assert attn.attn.shape == (2, 2, 9, 9)
+    assert torch.allclose(attn.attn.sum(-1), torch.ones(2, 2, 9))
+    assert torch.allclose(output * x_mask, fused * x_mask, atol=1e-5)
+
+
+def test_encoder_matches_dense():
+    torch.manual_seed(0)
+    encoder = attentions.Encoder(192, 768, 2, 6, 3, 0.1, window_size=4).eval()
+    x, x_mask, attn_mask = padded_inputs(192, [64, 30])
+    with torch.no_grad():
+        output = encoder(x, x_mask)
+        # swap in the dense computation for every layer
+        for layer in encoder.attn_layers:
+            layer.attention = lambda q, k, v, mask=None, layer=layer: (reference_attention(layer, q, k, v, mask), None)
+        expected = encoder(x, x_mask)
+    assert torch.allclose(output, expected, atol=1e-4)
+
+
+if __name__ == "__main__":
+    test_banded_attention_matches_dense()
+    test_attention_probabilities_are_kept_on_request()
+    test_encoder_matches_dense()
+    print("Banded relative attention matches the dense computation")
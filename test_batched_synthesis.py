@@ -0,0 +1,139 @@
+import json
+import os
+
+import torch
+
+from melo import utils
+from melo.api import TTS
+from melo.encoder_cache import EncoderCache
+from melo.inference_scheduler import InferenceScheduler
+from melo.models import SynthesizerTrn
+from melo.text.symbols import symbols, num_tones, num_languages
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'melo', 'configs', 'config.json')
+
+
+def make_model():
+    """A random-weight synthesizer with the released models' architecture."""
+    with open(CONFIG_PATH) as f:
+        config = json.load(f)
+    torch.manual_seed(0)
+    return SynthesizerTrn(
+        len(symbols),
+        config['data']['filter_length'] // 2 + 1,
+        config['train']['segment_size'] // config['data']['hop_length'],
+        n_speakers=config['data']['n_speakers'],
+        num_tones=num_tones,
+        num_languages=num_languages,
+        **config['model'],
+    ).eval()
+
+
+def text_inputs(lengths):
+    """Padded ``SynthesizerTrn.infer`` inputs for random sentences of ``lengths`` phones."""
+    n, max_len = len(lengths), max(lengths)
+    x_lengths = torch.LongTensor(lengths)
+    mask = torch.arange(max_len).unsqueeze(0) < x_lengths.unsqueeze(1)
+    phones = torch.randint(1, len(symbols), (n, max_len)) * mask
+    tones = torch.randint(0, num_tones, (n, max_len)) * mask
+    language = torch.full((n, max_len), 2) * mask
+    bert = torch.randn(n, 1024, max_len) * mask.unsqueeze(1)
+    ja_bert = torch.randn(n, 768, max_len) * mask.unsqueeze(1)
+    return phones, x_lengths, torch.zeros(n, dtype=torch.long), tones, language, bert, ja_bert
+
+
+def make_tts(model, encoder_cache=None):
+    """A ``TTS`` around ``model``, without a checkpoint download or text frontend."""
+    tts = TTS.__new__(TTS)
+    torch.nn.Module.__init__(tts)
+    tts.model = model
+    tts.hps = utils.get_hparams_from_file(CONFIG_PATH)
+    tts.device = 'cpu'
+    tts.backend = 'torch'
+    tts.quantize = None
+    tts.inference_options = None
+    tts.language = 'EN'
+    tts.bert_extractor = None
+    tts.cache = None
+    tts.encoder_cache = encoder_cache
+    tts.scheduler = None
+    return tts
+
+
+def sentence(length):
+    """Frontend outputs of a random sentence: ``(bert, ja_bert, phones, tones, lang_ids)``."""
+    return (
+        torch.zeros(1024, length),
+        torch.randn(768, length),
+        torch.randint(1, len(symbols), (length,)),
+        torch.randint(0, num_tones, (length,)),
+        torch.full((length,), 2),
+    )
+
+
+def infer(model, sentences, seeds, speaker_ids=None, sdp_ratio=0.2):
+    """``SynthesizerTrn.infer`` over the padded ``sentences``; returns each one's trimmed audio."""
+    lengths = [s[2].size(0) for s in sentences]
+    max_len = max(lengths)
+
+    def pad(k):
+        return torch.stack([torch.nn.functional.pad(s[k], (0, max_len - n)) for s, n in zip(sentences, lengths)])
+
+    bert, ja_bert, phones, tones, lang_ids = (pad(k) for k in range(5))
+    speaker_ids = speaker_ids or [0] * len(sentences)
+    with torch.no_grad():
+        audio, _, y_mask, _ = model.infer(
+            phones, torch.LongTensor(lengths), torch.LongTensor(speaker_ids), tones, lang_ids, bert, ja_bert,
+            sdp_ratio=sdp_ratio, return_durations=True,
+            generator=[torch.Generator().manual_seed(seed) for seed in seeds],
+        )
+    hop_length = model.dec.hop_length()
+    return [audio[i, 0, :int(y_mask[i].sum()) * hop_length] for i in range(len(sentences))]
+
+
+def test_batched_audio_matches_solo():
+    model = make_model()
+    torch.manual_seed(1)
+    sentences = [sentence(n) for n in [23, 9, 40, 4]]
+    batched = infer(model, sentences, seeds=range(4), speaker_ids=[0, 1, 0, 1])
+    for i, audio in enumerate(batched):
+        solo, = infer(model, sentences[i:i + 1], seeds=[i], speaker_ids=[i % 2])
+        assert audio.shape == solo.shape, i
+        # padding of the vocoder input must not reach the end of shorter items
+        assert torch.allclose(audio, solo, atol=1e-6), (i, (audio - solo).abs().max())
+
+
+def test_scheduled_audio_does_not_depend_on_batch_companions():
+    model = make_model()
+    torch.manual_seed(2)
+    # a single word2ph entry: no word timings, so no tokenizer is needed
+    items = [sentence(n) + (('', [n]),) for n in [17, 41, 6]]
+    for encoder_cache in [None, EncoderCache()]:
+        tts = make_tts(model, encoder_cache)
+        batch_sizes = []
+
+        def infer_batch(batch, *args, infer_batch=tts._infer_batch, **kwargs):
+            batch_sizes.append(len(batch))
+            return infer_batch(batch, *args, **kwargs)
+
+        tts._infer_batch = infer_batch
+        scheduler = InferenceScheduler(tts, max_batch_size=8, max_wait_ms=500)
+
+        def submit(i, speaker_id=0):
+            return scheduler.submit(items[i], speaker_id, 0.2, 0.6, 0.8, 1.0, torch.Generator().manual_seed(i))
+
+        try:
+            alone = submit(0).result()[0]
+            futures = [submit(1, speaker_id=1), submit(0), submit(2)]
+            together = [future.result()[0] for future in futures]
+        finally:
+            scheduler.close()
+        assert batch_sizes == [1, 3]
+        assert alone.shape == together[1].shape
+        assert abs(alone - together[1]).max() < 1e-6
+
+
+if __name__ == "__main__":
+    test_batched_audio_matches_solo()
+    test_scheduled_audio_does_not_depend_on_batch_companions()
+    print("Batched synthesis matches sentence by sentence synthesis")
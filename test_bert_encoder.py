@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+import torch
+from transformers import BertConfig, BertForMaskedLM, BertTokenizer
+
+from melo.text.bert_utils import load_bert_encoder, phone_level_features
+
+WORDS = ['the', 'quick', 'brown', 'fox', 'jump', '##s', 'over', 'lazy', 'dog', 'hello', 'world']
+TEXTS = [
+    'hello world',
+    'the quick brown fox jumps over the lazy dog',
+    'the dog jumps',
+]
+
+
+def make_checkpoint(path):
+    """Save a small random masked-LM and its tokenizer, so no download is needed."""
+    vocab_path = os.path.join(path, 'vocab.txt')
+    with open(vocab_path, 'w') as f:
+        f.write('\n'.join(['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + WORDS))
+    tokenizer = BertTokenizer(vocab_path)
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(tokenizer.vocab),
+        hidden_size=64,
+        num_hidden_layers=6,
+        num_attention_heads=4,
+        intermediate_size=128,
+    )
+    BertForMaskedLM(config).eval().save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return tokenizer
+
+
+def reference_features(model, tokenizer, text, word2ph):
+    """Per-sentence features as the extractors computed them from the full masked-LM."""
+    with torch.no_grad():
+        inputs = tokenizer(text, return_tensors="pt")
+        res = model(**inputs, output_hidden_states=True)
+        res = torch.cat(res["hidden_states"][-3:-2], -1)[0]
+    phone_level_feature = [res[i].repeat(word2ph[i], 1) for i in range(len(word2ph))]
+    return torch.cat(phone_level_feature, dim=0).T
+
+
+def test_truncated_encoder_matches_masked_lm():
+    with tempfile.TemporaryDirectory() as path:
+        tokenizer = make_checkpoint(path)
+        full = BertForMaskedLM.from_pretrained(path).eval()
+        encoder = load_bert_encoder(path, 'cpu')
+
+        assert len(encoder.encoder.layer) == 4
+        assert encoder.pooler is None
+
+        word2phs = [[1 + i % 3 for i in range(len(tokenizer.tokenize(text)) + 2)] for text in TEXTS]
+        features = phone_level_features(encoder, tokenizer, TEXTS, word2phs, 'cpu')
+        for text, word2ph, feature in zip(TEXTS, word2phs, features):
+            expected = reference_features(full, tokenizer, text, word2ph)
+            assert feature.shape == expected.shape
+            assert torch.allclose(feature, expected, atol=1e-5)
+
+
+if __name__ == "__main__":
+    test_truncated_encoder_matches_masked_lm()
+    print("Truncated encoder matches the masked-LM hidden_states[-3]")
@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+from melo.text.cmu_lexicon import CMULexicon, write_lexicon
+
+# refine_syllables output for a few cmudict.rep entries; variant pronunciations are keyed
+# 'WORD(2)' and sort between 'WORD' and longer words sharing its prefix
+ENTRIES = {
+    'A': (['ah'], [1]),
+    'READ': (['r', 'eh', 'd'], [0, 2, 0]),
+    "READ'S": (['r', 'iy', 'd', 'z'], [0, 2, 0, 0]),
+    'READ(2)': (['r', 'iy', 'd'], [0, 2, 0]),
+    'READABLE': (['r', 'iy', 'd', 'ah', 'b', 'ah', 'l'], [0, 2, 0, 1, 0, 1, 0]),
+    'ZYWICKI': (['z', 'ih', 'w', 'ih', 'k', 'iy'], [0, 2, 0, 1, 0, 1]),
+    'ÉCOLE': (['ey', 'k', 'ow', 'l'], [3, 0, 2, 0]),
+}
+
+
+def test_lexicon_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cmudict.bin')
+        write_lexicon(path, ENTRIES)
+        assert os.listdir(tmp) == ['cmudict.bin']
+        lexicon = CMULexicon(path)
+        assert len(lexicon) == len(ENTRIES)
+        assert lexicon.vocab == sorted({ph for phones, _ in ENTRIES.values() for ph in phones})
+        # every entry, including the first and last keys in byte order
+        for word, entry in ENTRIES.items():
+            assert word in lexicon
+            assert lexicon.lookup(word) == entry, word
+        phone_ids, tones = lexicon.lookup_ids('READ(2)')
+        assert [lexicon.vocab[i] for i in phone_ids] == ['r', 'iy', 'd'] and tones.tolist() == [0, 2, 0]
+        # missing words before the first key, between keys, sharing a prefix and after the last key
+        for word in ['', '0', 'AA', 'READ(1)', 'READS', 'REA', 'ZZZ', 'read']:
+            assert word not in lexicon
+            assert lexicon.lookup(word) is None and lexicon.lookup_ids(word) is None
+
+
+def test_other_files_are_rejected():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cmudict.rep')
+        with open(path, 'wb') as f:
+            f.write(b'READ  R EH1 D\n' * 4)
+        try:
+            CMULexicon(path)
+        except ValueError as e:
+            assert 'not a compact CMU lexicon' in str(e)
+        else:
+            assert False, 'a text dictionary should be rejected'
+
+
+if __name__ == "__main__":
+    test_lexicon_round_trip()
+    test_other_files_are_rejected()
+    print("The compact CMU lexicon round-trips through write_lexicon")
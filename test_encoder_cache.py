@@ -0,0 +1,43 @@
+import torch
+
+from melo.encoder_cache import EncoderCache
+from test_batched_synthesis import make_model, text_inputs
+
+
+def test_cached_encoder_outputs_give_same_durations():
+    model = make_model()
+    inputs = text_inputs([23, 9])
+    with torch.no_grad():
+        x, m_p, logs_p, x_mask, g = model.encode_text(*inputs)
+        dp_logw = model.dp(x, x_mask, g=g)
+        for length_scale, sdp_ratio in [(1.0, 0.2), (0.7, 0.0), (1.4, 1.0)]:
+            expected = model.infer_durations(
+                *inputs, length_scale=length_scale, sdp_ratio=sdp_ratio,
+                generator=[torch.Generator().manual_seed(i) for i in range(2)],
+            )[0]
+            logw = model.log_durations(
+                x, x_mask, g, sdp_ratio=sdp_ratio, dp_logw=dp_logw,
+                generator=[torch.Generator().manual_seed(i) for i in range(2)],
+            )
+            assert torch.equal(torch.ceil(torch.exp(logw) * x_mask * length_scale), expected)
+
+
+def test_cache_is_bounded():
+    cache = EncoderCache(max_bytes=3 * 4 * 100)
+    for i in range(5):
+        cache.put(i, (torch.zeros(100), None))
+    stats = cache.stats()
+    assert stats['entries'] == 3 and stats['bytes'] <= cache.max_bytes and stats['evictions'] == 2
+    assert cache.get(0) is None and cache.get(4) is not None
+    cache.get(2)
+    cache.put(5, (torch.zeros(100),))
+    # 2 was used more recently than 3
+    assert cache.get(2) is not None and cache.get(3) is None
+    cache.put('large', torch.zeros(1000))
+    assert cache.get('large') is None
+
+
+if __name__ == "__main__":
+    test_cached_encoder_outputs_give_same_durations()
+    test_cache_is_bounded()
+    print("Cached encoder outputs give the same durations")
@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+import torch
+
+from test_batched_synthesis import infer, make_model, make_tts, sentence
+
+
+def assert_same_audio(audio, expected):
+    for a, e in zip(audio, expected):
+        assert a.shape == e.shape
+        # folding weight norm only reorders floating point operations
+        assert torch.allclose(a, e, atol=1e-5), (a - e).abs().max()
+
+
+def test_optimized_model_and_checkpoint_give_the_same_audio():
+    torch.manual_seed(1)
+    sentences = [sentence(n) for n in [23, 9]]
+    # the duration predictor that sdp_ratio 0 and 1 use is all that is kept
+    for duration_predictor, sdp_ratio in [(None, 0.2), ('dp', 0.0), ('sdp', 1.0)]:
+        expected = infer(make_model(), sentences, seeds=[0, 1], sdp_ratio=sdp_ratio)
+        tts = make_tts(make_model()).optimize_for_inference(duration_predictor)
+        assert tts.model.enc_q is None
+        assert_same_audio(infer(tts.model, sentences, seeds=[0, 1], sdp_ratio=sdp_ratio), expected)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'inference.pth')
+            tts.save_inference_checkpoint(path)
+            loaded = make_tts(make_model())
+            loaded._load_checkpoint(torch.load(path))
+        assert loaded.inference_options == {'duration_predictor': duration_predictor}
+        assert_same_audio(infer(loaded.model, sentences, seeds=[0, 1], sdp_ratio=sdp_ratio), expected)
+
+
+def test_optimizing_again_needs_the_same_options():
+    tts = make_tts(make_model()).optimize_for_inference('dp')
+    assert tts.optimize_for_inference('dp') is tts
+    try:
+        tts.optimize_for_inference()
+    except ValueError as e:
+        assert 'already optimized' in str(e)
+    else:
+        assert False, 'optimizing with other options should fail'
+    assert tts.model.sdp is None and tts.model.dp is not None
+
+
+if __name__ == "__main__":
+    test_optimized_model_and_checkpoint_give_the_same_audio()
+    test_optimizing_again_needs_the_same_options()
+    print("Optimized models and inference checkpoints give the same audio")
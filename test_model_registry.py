@@ -0,0 +1,46 @@
+from melo.model_registry import ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, language):
+        self.language = language
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_leased_model_is_closed_after_its_last_lease():
+    registry = ModelRegistry(factory=FakeModel, max_resident=1, idle_timeout=None)
+    with registry.lease('EN') as en:
+        with registry.lease('EN') as again:
+            assert again is en
+            # loading a second language evicts EN, which is still serving
+            fr = registry.get('FR')
+            assert 'EN' not in registry and not en.closed
+        assert not en.closed
+    assert en.closed and not fr.closed
+    # a new lease loads a fresh model
+    with registry.lease('EN') as en_again:
+        assert en_again is not en and fr.closed
+    registry.close()
+    assert en_again.closed
+
+
+def test_idle_eviction_skips_leased_models():
+    registry = ModelRegistry(factory=FakeModel, max_resident=None, idle_timeout=None)
+    registry.idle_timeout = 0
+    with registry.lease('EN') as en:
+        fr = registry.get('FR')
+        registry.evict_idle()
+        assert 'EN' in registry and 'FR' not in registry
+        assert fr.closed and not en.closed
+        registry.close()
+        assert not en.closed
+    assert en.closed
+
+
+if __name__ == "__main__":
+    test_leased_model_is_closed_after_its_last_lease()
+    test_idle_eviction_skips_leased_models()
+    print("Leased models are only closed once released")
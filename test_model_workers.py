@@ -0,0 +1,96 @@
+import os
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from model_workers import ModelWorker, share_array, take_shared_array
+
+# a worker process serving the loaders below instead of TTS or Whisper
+SERVE_TEST_LOADERS = (
+    "import os, sys, model_workers, test_model_workers; "
+    "model_workers._LOADERS['echo'] = test_model_workers.load_echo; "
+    "model_workers._serve(sys.argv[1], bytes.fromhex(os.environ.pop(model_workers.AUTHKEY_ENV)))"
+)
+
+
+def load_echo(options):
+    def echo(desc):
+        return share_array(take_shared_array(desc) * 2)
+
+    def crash(desc):
+        os._exit(1)
+
+    return {'echo': echo, 'crash': crash}, {'pid': os.getpid()}
+
+
+class EchoWorker(ModelWorker):
+    def __init__(self, command=None):
+        self.command = command
+        super().__init__('echo', {'concurrency': 2})
+
+    def _command(self, address):
+        return (self.command or [sys.executable, '-c', SERVE_TEST_LOADERS]) + [address]
+
+
+def block_exists(desc):
+    try:
+        shm = shared_memory.SharedMemory(name=desc.name)
+    except FileNotFoundError:
+        return False
+    shm.close()
+    return True
+
+
+def test_arrays_round_trip_through_a_worker():
+    worker = EchoWorker()
+    try:
+        assert worker.info['pid'] == worker.process.pid
+        audio = np.random.randn(16000).astype(np.float32)
+        desc = share_array(audio)
+        reply = worker.call('echo', desc)
+        assert np.array_equal(take_shared_array(reply), audio * 2)
+        assert not block_exists(desc) and not block_exists(reply)
+    finally:
+        worker.close()
+    assert worker.process.returncode == 0
+
+
+def test_blocks_of_a_failed_call_are_released():
+    worker = EchoWorker()
+    desc = share_array(np.ones(100, dtype=np.float32))
+    try:
+        worker.call('crash', desc)
+    except RuntimeError as e:
+        assert 'exited' in str(e), e
+    else:
+        assert False, 'the call should fail when the worker dies'
+    finally:
+        worker.close()
+    # the worker died before taking the block
+    assert not block_exists(desc)
+
+    desc = share_array(np.ones(100, dtype=np.float32))
+    try:
+        worker.call('echo', desc)
+    except RuntimeError as e:
+        assert 'closed' in str(e), e
+    else:
+        assert False, 'a closed worker should take no requests'
+    assert not block_exists(desc)
+
+
+def test_worker_exiting_before_connecting_does_not_hang():
+    try:
+        EchoWorker(command=[sys.executable, '-c', 'raise SystemExit(3)'])
+    except RuntimeError as e:
+        assert 'code 3' in str(e), e
+    else:
+        assert False, 'starting the worker should fail'
+
+
+if __name__ == "__main__":
+    test_arrays_round_trip_through_a_worker()
+    test_blocks_of_a_failed_call_are_released()
+    test_worker_exiting_before_connecting_does_not_hang()
+    print("Model workers exchange arrays and release the blocks of failed calls")
@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+import onnx
+import torch
+
+from melo.onnx_backend import OnnxSynthesizer
+from melo.onnx_export import ENCODER_FILE, FLOW_FILE, DECODER_FILE, export_onnx
+from test_batched_synthesis import make_model, text_inputs
+
+
+def assert_backends_agree(model, session, lengths, atol=1e-5):
+    inputs = text_inputs(lengths)
+    outputs = []
+    for backend in [model, session]:
+        generator = [torch.Generator().manual_seed(i) for i in range(len(lengths))]
+        with torch.no_grad():
+            outputs.append(backend.infer(
+                *inputs, sdp_ratio=0.2, return_durations=True, generator=generator
+            ))
+    (audio, durations, y_mask, _), (ort_audio, ort_durations, ort_y_mask, _) = outputs
+    assert torch.equal(durations, ort_durations), lengths
+    assert torch.equal(y_mask, ort_y_mask), lengths
+    assert audio.shape == ort_audio.shape, lengths
+    assert torch.allclose(audio, ort_audio, atol=atol), (lengths, (audio - ort_audio).abs().max())
+
+
+def test_export_writes_valid_graphs():
+    model = make_model()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = export_onnx(model, tmp)
+        assert [os.path.basename(path) for path in paths] == [ENCODER_FILE, FLOW_FILE, DECODER_FILE]
+        for path in paths:
+            onnx.checker.check_model(onnx.load(path))
+
+
+def test_onnxruntime_matches_torch():
+    model = make_model()
+    with tempfile.TemporaryDirectory() as tmp:
+        export_onnx(model, tmp)
+        session = OnnxSynthesizer(tmp)
+        torch.manual_seed(1)
+        for lengths in [[40], [23, 9]]:
+            assert_backends_agree(model, session, lengths)
+        # shorter than the attention window (4) the relative band is partly out of range
+        for lengths in [[3], [2], [1], [5, 2]]:
+            assert_backends_agree(model, session, lengths)
+
+
+if __name__ == "__main__":
+    test_export_writes_valid_graphs()
+    test_onnxruntime_matches_torch()
+    print("SynthesizerTrn exports to ONNX and onnxruntime matches torch")
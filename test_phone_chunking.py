@@ -0,0 +1,39 @@
+from melo.split_utils import estimate_phones, split_sentence_by_phones
+
+EN_TEXT = (
+    "I didn't know what to do. I said please kill her because it would be better than being kidnapped, "
+    "Ben, whose surname CNN is not using for security concerns, said on Wednesday. It's a nightmare. "
+) * 5
+ZH_TEXT = "好的，我来给你讲一个故事吧。从前有一个小姑娘，她叫做小红。小红非常喜欢在森林里玩耍，她经常会和她的小伙伴们一起去探险。" * 3
+
+
+def test_chunks_fit_phone_budget():
+    for text, language, max_phones in [(EN_TEXT, 'EN', 48), (EN_TEXT, 'EN', 200), (ZH_TEXT, 'ZH', 40)]:
+        buckets = split_sentence_by_phones(text, language, max_phones, bucket_width=8)
+        chunks = sorted(item for bucket in buckets for item in bucket)
+        assert [index for index, _ in chunks] == list(range(len(chunks)))
+        assert all(estimate_phones(chunk, language) <= max_phones for _, chunk in chunks)
+        # nothing is dropped, only whitespace at the cuts
+        joined = ''.join(chunk for _, chunk in chunks)
+        assert joined.replace(' ', '') == text.replace(' ', '')
+        # buckets hold chunks of similar length, shortest first
+        keys = [[estimate_phones(chunk, language) // 8 for _, chunk in bucket] for bucket in buckets]
+        assert all(len(set(k)) == 1 for k in keys)
+        assert [k[0] for k in keys] == sorted(k[0] for k in keys)
+
+
+def test_chunks_end_at_sentence_or_word_boundaries():
+    buckets = split_sentence_by_phones(EN_TEXT, 'EN', 48)
+    words = set(EN_TEXT.split())
+    for bucket in buckets:
+        for _, chunk in bucket:
+            assert chunk.split()[0] in words and chunk.split()[-1] in words
+    # sentences that fit are not cut
+    short = split_sentence_by_phones("One sentence. Another one here.", 'EN', 16)
+    assert sorted(chunk for bucket in short for _, chunk in bucket) == ["Another one here.", "One sentence."]
+
+
+if __name__ == "__main__":
+    test_chunks_fit_phone_budget()
+    test_chunks_end_at_sentence_or_word_boundaries()
+    print("Phone budget chunks fit and end at boundaries")
@@ -0,0 +1,59 @@
+import os
+import tempfile
+
+from melo.text.pronunciation_cache import PronunciationCache
+
+# out-of-lexicon words, with repeats; hyphenated and apostrophe words split into several tokens
+OOV_WORDS = ['melotts', 'dspgan', "o'neil", 'melotts', 'zzyzx', 'x-ray', 'dspgan', 'brexit']
+
+
+def test_lru_is_bounded():
+    cache = PronunciationCache(max_entries=2)
+    cache.put_many({'melotts': ['M', 'EH1', 'L'], 'dspgan': ['D', 'IY1']})
+    cache.get_many(['melotts'])
+    cache.put_many({'zzyzx': ['Z', 'IH1']})
+    # dspgan was the least recently used
+    assert cache.get_many(['melotts', 'dspgan', 'zzyzx']) == {'melotts': ['M', 'EH1', 'L'], 'zzyzx': ['Z', 'IH1']}
+    assert cache.stats()['entries'] == 2
+
+
+def test_store_is_shared():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'g2p', 'oov.sqlite')
+        writer = PronunciationCache(path=path)
+        writer.put_many({"o'neil": ['OW0', 'N', 'IY1', 'L']})
+        # another worker's cache starts empty and reads the store
+        reader = PronunciationCache(path=path)
+        assert reader.get_many(["o'neil", 'unknown']) == {"o'neil": ['OW0', 'N', 'IY1', 'L']}
+        reader.get_many(["o'neil"])
+        assert reader.stats() == {'entries': 1, 'max_entries': 4096, 'hits': 1, 'store_hits': 1, 'misses': 1}
+
+
+def test_batched_prediction_matches_per_word():
+    # imported here: the English frontend needs the NLTK data g2p_en uses
+    from melo.text import english
+
+    def per_word(word):
+        return [ph for ph in english._g2p(word) if ph != ' ']
+
+    words = ['melotts', 'dspgan', 'zzyzx', 'melotts', 'qwxj', 'dspgan']
+    assert english._predict_batch(words) == [english._g2p.predict(word) for word in words]
+    assert english._g2p_batch(OOV_WORDS) == [per_word(word) for word in OOV_WORDS]
+
+    cache = english.oov_cache
+    english.oov_cache = PronunciationCache()
+    try:
+        expected = {word: per_word(word) for word in OOV_WORDS}
+        assert english.g2p_oov(OOV_WORDS) == expected
+        # the second time every word comes from the cache, whatever the order
+        assert english.g2p_oov(OOV_WORDS[::-1]) == expected
+        assert english.oov_cache.stats()['hits'] == len(expected)
+    finally:
+        english.oov_cache = cache
+
+
+if __name__ == "__main__":
+    test_lru_is_bounded()
+    test_store_is_shared()
+    test_batched_prediction_matches_per_word()
+    print("Pronunciation cache is bounded and shared, and batched g2p matches per-word g2p")
@@ -0,0 +1,43 @@
+import torch
+
+from melo.benchmark_spline import spline_inputs, reference_inverse, fast_inverse
+from melo.transforms import piecewise_rational_quadratic_transform
+
+
+def test_inverse_spline_matches_transform():
+    for batch, length in [(1, 3), (1, 37), (4, 200)]:
+        inputs, widths, heights, derivatives = spline_inputs(batch, length, seed=length)
+        # exact tail bounds and far outside values
+        inputs[..., 0] = 5.0
+        inputs[..., -1] = -7.5
+        with torch.no_grad():
+            expected = reference_inverse(inputs, widths, heights, derivatives)
+            output = fast_inverse(inputs, widths, heights, derivatives)
+        assert output.shape == expected.shape
+        assert torch.allclose(output, expected, atol=1e-5), (output - expected).abs().max()
+
+
+def test_inverse_spline_inverts_forward():
+    inputs, widths, heights, derivatives = spline_inputs(2, 64)
+    with torch.no_grad():
+        forward = piecewise_rational_quadratic_transform(
+            inputs, widths, heights, derivatives, inverse=False, tails="linear", tail_bound=5.0
+        )[0]
+        roundtrip = fast_inverse(forward, widths, heights, derivatives)
+    assert torch.allclose(roundtrip, inputs, atol=1e-4)
+
+
+def test_traced_inverse_spline_matches():
+    # tracing, as for ONNX export, takes the comparison-sum bin search
+    inputs, widths, heights, derivatives = spline_inputs(1, 50, seed=3)
+    with torch.no_grad():
+        traced = torch.jit.trace(fast_inverse, (inputs, widths, heights, derivatives))
+        args = spline_inputs(2, 80, seed=4)
+        assert torch.allclose(traced(*args), fast_inverse(*args), atol=1e-6)
+
+
+if __name__ == "__main__":
+    test_inverse_spline_matches_transform()
+    test_inverse_spline_inverts_forward()
+    test_traced_inverse_spline_matches()
+    print("Inverse spline matches the general transform")
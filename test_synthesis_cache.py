@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from melo.synthesis_cache import SynthesisCache, file_fingerprint
+
+
+def test_key_changes_with_model_identity():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'checkpoint.pth')
+        with open(path, 'wb') as f:
+            f.write(b'weights')
+        request = ('EN', 0, 'Hello there.', 1.0, 0.2, 0.6, 0.8, 0)
+        identity = {'weights': file_fingerprint([path]), 'backend': 'torch', 'quantize': None}
+        key = SynthesisCache.make_key(*request, **identity)
+        assert SynthesisCache.make_key(*request, **identity) == key
+        assert SynthesisCache.make_key(*request, **{**identity, 'quantize': 'int8'}) != key
+        assert SynthesisCache.make_key(*request, **{**identity, 'backend': 'onnxruntime'}) != key
+        # a checkpoint swapped in place
+        with open(path, 'wb') as f:
+            f.write(b'new weights')
+        assert SynthesisCache.make_key(*request, **{**identity, 'weights': file_fingerprint([path])}) != key
+
+
+def test_disk_tier_is_bounded():
+    audio = np.zeros(1000, dtype=np.float32)
+    timings = [{'word': 'hello', 'start': 0.0, 'end': 0.1, 'index': 0}]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SynthesisCache(max_bytes=0, cache_dir=tmp, max_disk_bytes=3 * 4100)
+        for key in 'abc':
+            cache.put(key, audio, timings)
+            time.sleep(0.01)
+        # a disk hit in another process makes 'a' the most recently used
+        assert SynthesisCache(max_bytes=0, cache_dir=tmp).get('a') is not None
+        time.sleep(0.01)
+        cache.put('d', audio, timings)
+        stats = cache.stats()
+        assert stats['disk_evictions'] == 1 and stats['disk_bytes'] <= cache.max_disk_bytes
+        assert sorted(os.listdir(tmp)) == ['a.json', 'a.pcm', 'c.json', 'c.pcm', 'd.json', 'd.pcm']
+        assert cache.get('b') is None and cache.get('a') is not None
+        # a restarted process counts what is already on disk
+        assert SynthesisCache(cache_dir=tmp, max_disk_bytes=1).stats()['disk_bytes'] == stats['disk_bytes']
+
+
+def test_concurrent_writes_of_one_key():
+    timings = [{'word': 'hello', 'start': 0.0, 'end': 0.1, 'index': 0}]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SynthesisCache(max_bytes=0, cache_dir=tmp)
+        audios = [np.full(50000, i, dtype=np.float32) for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for _ in range(5):
+                # raises if one writer's rename takes another's temp file
+                list(pool.map(lambda audio: cache.put('a', audio, timings), audios))
+        assert sorted(os.listdir(tmp)) == ['a.json', 'a.pcm']
+        audio, _ = SynthesisCache(max_bytes=0, cache_dir=tmp).get('a')
+        # whichever write landed last, its file is complete
+        assert audio.shape == (50000,) and (audio == audio[0]).all()
+
+
+if __name__ == "__main__":
+    test_key_changes_with_model_identity()
+    test_disk_tier_is_bounded()
+    test_concurrent_writes_of_one_key()
+    print("Synthesis cache keys include the model and the disk tier stays bounded")
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from melo.encoder_cache import EncoderCache
+from test_batched_synthesis import make_model, make_tts, sentence
+
+
+def test_chunked_streaming_leaves_grad_mode_alone():
+    torch.manual_seed(0)
+    tts = make_tts(make_model(), EncoderCache())
+    texts = ['first', 'second']
+    # frontend outputs come from the cache, so no text frontend is needed
+    for text, n in zip(texts, [12, 7]):
+        tts.encoder_cache.put(('frontend', 'EN', text), sentence(n) + ((text, [n]),))
+    chunks = tts._iter_segment_chunks(texts, 0, 0.2, 0.6, 0.8, 1.0, chunk_frames=8, seed=0)
+
+    def step():
+        # like atts_iter, every window is produced on whichever executor thread is free
+        chunk = next(chunks, None)
+        return chunk, torch.is_grad_enabled()
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        results = []
+        while True:
+            chunk, grad_enabled = pool.submit(step).result()
+            assert grad_enabled
+            if chunk is None:
+                break
+            results.append(chunk)
+    assert torch.is_grad_enabled()
+    assert [last for _, _, last in results].count(True) == len(texts)
+
+
+if __name__ == "__main__":
+    test_chunked_streaming_leaves_grad_mode_alone()
+    print("Chunked streaming does not leak grad mode across threads")
@@ -0,0 +1,115 @@
+import random
+import re
+
+from melo.split_utils import iter_txtsplit, txtsplit
+
+
+def reference_txtsplit(text, desired_length=100, max_length=200):
+    """``txtsplit`` as it was before the index-based rewrite."""
+    text = re.sub(r'\n\n+', '\n', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[""]', '"', text)
+    text = re.sub(r'([,.?!])', r'\1 ', text)
+    text = re.sub(r'\s+', ' ', text)
+    
+    rv = []
+    in_quote = False
+    current = ""
+    split_pos = []
+    pos = -1
+    end_pos = len(text) - 1
+    def seek(delta):
+        nonlocal pos, in_quote, current
+        is_neg = delta < 0
+        for _ in range(abs(delta)):
+            if is_neg:
+                pos -= 1
+                current = current[:-1]
+            else:
+                pos += 1
+                current += text[pos]
+            if text[pos] == '"':
+                in_quote = not in_quote
+        return text[pos]
+    def peek(delta):
+        p = pos + delta
+        return text[p] if p < end_pos and p >= 0 else ""
+    def commit():
+        nonlocal rv, current, split_pos
+        rv.append(current)
+        current = ""
+        split_pos = []
+    while pos < end_pos:
+        c = seek(1)
+        if len(current) >= max_length:
+            if len(split_pos) > 0 and len(current) > (desired_length / 2):
+                d = pos - split_pos[-1]
+                seek(-d)
+            else:
+                while c not in '!?.\n ' and pos > 0 and len(current) > desired_length:
+                    c = seek(-1)
+            commit()
+        elif not in_quote and (c in '!?\n' or (c in '.,' and peek(1) in '\n ')):
+            while pos < len(text) - 1 and len(current) < max_length and peek(1) in '!?.':
+                c = seek(1)
+            split_pos.append(pos)
+            if len(current) >= desired_length:
+                commit()
+        elif in_quote and peek(1) == '"' and peek(2) in '\n ':
+            seek(2)
+            split_pos.append(pos)
+    rv.append(current)
+    rv = [s.strip() for s in rv]
+    rv = [s for s in rv if len(s) > 0 and not re.match(r'^[\s\.,;:!?]*$', s)]
+    return rv
+
+
+SAMPLES = [
+    "I didn't know what to do. I said please kill her because it would be better than being kidnapped, Ben said on Wednesday. It's a nightmare!",
+    "Bien sûr ! En quelle matière voudriez-vous que je vous parle en français ? Je peux vous fournir des informations.",
+    'He said "stop. wait here." and left... Then?! Nothing, really.\n\nA new paragraph\tstarts here.',
+    "",
+    "   ",
+    "...",
+    "no punctuation at all " * 40,
+]
+
+
+def random_text(rng, length):
+    alphabet = ['a', 'b', 'c', 'é', ' ', ' ', ' ', '.', ',', '!', '?', '"', '\n', '\t', ';']
+    words = ['lesson', 'students', 'the', 'of', '"Hello."', 'Wait...', 'ok!?', 'e.g.', '\n\n']
+    parts = []
+    while sum(len(p) for p in parts) < length:
+        parts.append(rng.choice(words) if rng.random() < 0.3 else ''.join(rng.choices(alphabet, k=rng.randint(1, 12))))
+    return ''.join(parts)
+
+
+def random_pieces(rng, text):
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 20))))
+    return [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+
+
+def test_txtsplit_matches_reference():
+    rng = random.Random(0)
+    corpus = SAMPLES + [random_text(rng, rng.randint(1, 1500)) for _ in range(300)]
+    for text in corpus:
+        for desired_length, max_length in [(100, 200), (256, 512), (10, 20), (7, 8), (3, 30)]:
+            expected = reference_txtsplit(text, desired_length, max_length)
+            assert txtsplit(text, desired_length, max_length) == expected, (text, desired_length, max_length)
+            # the same chunks when the text arrives in pieces
+            pieces = random_pieces(rng, text)
+            assert list(iter_txtsplit(iter(pieces), desired_length, max_length)) == expected, (pieces, desired_length)
+
+
+def test_txtsplit_streams_long_text():
+    lines = ("Line %d of a long transcript, with a clause. And a second sentence!\n" % i for i in range(20000))
+    chunks = iter_txtsplit(lines, 256, 512)
+    first = next(chunks)
+    assert first.startswith("Line 0 of") and len(first) <= 512
+    assert all(len(chunk) <= 512 for chunk in chunks)
+
+
+if __name__ == "__main__":
+    test_txtsplit_matches_reference()
+    test_txtsplit_streams_long_text()
+    print("txtsplit matches the reference implementation")
@@ -0,0 +1,88 @@
+import numpy as np
+import torch
+
+from test_batched_synthesis import make_model, make_tts, sentence
+
+
+def interspersed(word2ph):
+    """``word2ph`` after the frontend intersperses blanks: two phones per phone, and the
+    leading blank in the start pad's entry."""
+    word2ph = [n * 2 for n in word2ph]
+    word2ph[0] += 1
+    return word2ph
+
+
+def tts_with_tokens(tokens, language='EN', model=None):
+    """A ``TTS`` whose language frontend tokenizes any text into ``tokens``."""
+    tts = make_tts(model)
+    tts.language = language
+    tts._tokenize = lambda norm_text: tokens
+    return tts
+
+
+def test_word_spans_follow_word2ph():
+    # pads, 'hello', ',', 'world', '!'
+    word2ph = interspersed([1, 4, 1, 4, 1, 1])
+    tts = tts_with_tokens(['hello', ',', 'world', '!'])
+    # blanks around each phone belong to its token; punctuation joins the word's text but
+    # not its phones
+    assert tts.get_word_spans('Hello, world!', word2ph) == [('hello,', 3, 11), ('world!', 13, 21)]
+
+
+def test_word_spans_merge_pieces_and_skip_edge_punctuation():
+    # '"', 'un', '##believ', '##able', '"', 'news', '.'
+    word2ph = interspersed([1, 1, 2, 3, 2, 1, 3, 1, 1])
+    tts = tts_with_tokens(['"', 'un', '##believ', '##able', '"', 'news', '.'])
+    spans = tts.get_word_spans('"Unbelievable" news.', word2ph)
+    bounds = np.cumsum([0] + word2ph).tolist()
+    # the quotes stay in the word's text but outside its phones
+    assert spans == [('"unbelievable"', bounds[2], bounds[5]), ('news.', bounds[6], bounds[7])]
+
+    # a punctuation-only word is dropped
+    word2ph = interspersed([1, 2, 1, 3, 1])
+    tts = tts_with_tokens(['oh', '-', 'well'])
+    assert tts.get_word_spans('oh - well', word2ph) == [('oh', 3, 7), ('well', 9, 15)]
+
+
+def test_word_spans_without_tokens():
+    word2ph = interspersed([1, 2, 3, 1])
+    # without a tokenizer, or when it disagrees with word2ph, the sentence is one span
+    assert tts_with_tokens(None).get_word_spans('ab cd', word2ph) == [('ab cd', 3, 13)]
+    assert tts_with_tokens(['ab']).get_word_spans('ab cd', word2ph) == [('ab cd', 3, 13)]
+    assert tts_with_tokens([]).get_word_spans('', interspersed([1, 1])) == []
+    # languages without spaces only join word pieces
+    tts = tts_with_tokens(['今日', 'は', '##い'], language='JP')
+    assert [word for word, _, _ in tts.get_word_spans('今日はい', word2ph + [2])] == ['今日', 'はい']
+
+
+def test_word_timings_follow_predicted_durations():
+    model = make_model()
+    tts = tts_with_tokens(['hello', ',', 'world', '!'], model=model)
+    word2ph = interspersed([1, 4, 1, 4, 1, 1])
+    torch.manual_seed(1)
+    item = sentence(sum(word2ph)) + (('Hello, world!', word2ph),)
+    (audio, timings), = tts._infer_batch([item], 0, 0.2, 0.6, 0.8, 1.0, generators=[torch.Generator().manual_seed(0)])
+
+    bert, ja_bert, phones, tones, lang_ids = (tensor.unsqueeze(0) for tensor in item[:5])
+    with torch.no_grad():
+        _, durations, _, _ = model.infer(
+            phones, torch.LongTensor([phones.size(1)]), torch.LongTensor([0]), tones, lang_ids, bert, ja_bert,
+            sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, length_scale=1.0, return_durations=True,
+            generator=[torch.Generator().manual_seed(0)],
+        )
+    frame_ends = np.concatenate([[0], np.cumsum(durations[0].numpy())])
+    frame_time = tts.hps.data.hop_length / tts.hps.data.sampling_rate
+    assert [t['word'] for t in timings] == ['hello,', 'world!']
+    for timing, (start, end) in zip(timings, [(3, 11), (13, 21)]):
+        assert np.isclose(timing['start'], frame_ends[start] * frame_time)
+        assert np.isclose(timing['end'], frame_ends[end] * frame_time)
+    assert timings[0]['end'] <= timings[1]['start'] <= timings[1]['end']
+    assert len(audio) == frame_ends[-1] * tts.hps.data.hop_length
+
+
+if __name__ == "__main__":
+    test_word_spans_follow_word2ph()
+    test_word_spans_merge_pieces_and_skip_edge_punctuation()
+    test_word_spans_without_tokens()
+    test_word_timings_follow_predicted_durations()
+    print("Word timings follow word2ph and the predicted durations")